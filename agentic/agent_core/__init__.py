@@ -0,0 +1 @@
+"""Shared helpers for the libEnsemble agent scripts in agentic/."""
@@ -0,0 +1,163 @@
+"""
+Bulk rendering of CreateLibEnsembleScripts bundles.
+
+Takes a list of parameter sets and/or a Cartesian sweep over a base set,
+renders every bundle with one shared set of compiled templates per worker
+process, and writes each bundle to its own directory with a params.json.
+A manifest.json in the output directory lists all bundles.
+
+Usage (from agentic/):
+    python -m agent_core.batch sweep.json --output-dir bundles/ [--workers 8]
+
+where sweep.json holds any of "parameter_sets" (list of tool arguments),
+"base" (arguments shared by all bundles) and "sweep" (argument -> list of
+values, expanded as a Cartesian product over base and each parameter set).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .renderer import ScriptRenderer
+
+BATCH_TOOL_NAME = "CreateLibEnsembleScriptsBatch"
+BATCH_TOOL_DESCRIPTION = (
+    "Render many script bundles in one call from a list of parameter sets and/or "
+    "a Cartesian sweep. Each bundle is written to its own directory."
+)
+
+BATCH_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "parameter_sets": {
+            "type": "array",
+            "items": {"type": "object"},
+            "description": "List of CreateLibEnsembleScripts arguments, one per bundle",
+        },
+        "base": {"type": "object", "description": "Arguments shared by every bundle"},
+        "sweep": {
+            "type": "object",
+            "description": "Argument name -> list of values; bundles are the Cartesian product",
+        },
+        "output_dir": {"type": "string", "description": "Directory to write bundle directories into"},
+        "workers": {"type": "integer", "description": "Number of worker processes (default: CPU count)"},
+    },
+    "required": ["output_dir"],
+}
+
+# Bundles per task sent to a worker process
+CHUNK_SIZE = 64
+
+# Below this many bundles, render in the calling process
+PARALLEL_THRESHOLD = 256
+
+_worker_renderer = None
+
+
+def expand_parameter_sets(parameter_sets=None, base=None, sweep=None):
+    """Combine base, explicit parameter sets and a Cartesian sweep into a flat list"""
+    base = base or {}
+    sets = [{**base, **params} for params in parameter_sets] if parameter_sets else [dict(base)]
+    if not sweep:
+        return sets
+    names = list(sweep)
+    for name in names:
+        if not isinstance(sweep[name], list):
+            raise ValueError(f"sweep values for '{name}' must be a list")
+    combos = list(itertools.product(*(sweep[name] for name in names)))
+    return [{**params, **dict(zip(names, combo))} for params in sets for combo in combos]
+
+
+def bundle_dir_name(index, params, width=4):
+    """Directory name for a bundle, e.g. 0007_six_hump_camel (app_ref reduced to a single safe path component)"""
+    app_ref = re.sub(r"[^\w.-]", "_", str(params.get("app_ref") or ""))
+    return f"{index:0{width}d}_{app_ref}" if app_ref else f"{index:0{width}d}"
+
+
+def _render_chunk(renderer, output_dir, chunk, width):
+    entries = []
+    for index, params in chunk:
+        bundle_dir = output_dir / bundle_dir_name(index, params, width)
+        entry = {"index": index, "directory": bundle_dir.name}
+        if bundle_dir.resolve().parent != output_dir.resolve():
+            entry["error"] = f"Bundle directory {bundle_dir} is outside {output_dir}"
+            entries.append(entry)
+            continue
+        try:
+            files = renderer.render_files(params)
+        except Exception as e:
+            entry["error"] = f"Error rendering templates: {e}"
+            entries.append(entry)
+            continue
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+        for filename, content in files:
+            (bundle_dir / filename).write_text(content)
+        (bundle_dir / "params.json").write_text(json.dumps(params, indent=2) + "\n")
+        entry["files"] = [filename for filename, _ in files]
+        entries.append(entry)
+    return entries
+
+
+def _init_worker(root):
+    global _worker_renderer
+    _worker_renderer = ScriptRenderer(root)
+
+
+def _render_chunk_in_worker(output_dir, chunk, width):
+    return _render_chunk(_worker_renderer, output_dir, chunk, width)
+
+
+def render_batch(parameter_sets, output_dir, workers=None, renderer=None, root=None):
+    """Render and write every bundle. Returns the manifest (list of entries, in input order)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    width = max(4, len(str(len(parameter_sets) - 1)))
+    jobs = list(enumerate(parameter_sets))
+    chunks = [jobs[i:i + CHUNK_SIZE] for i in range(0, len(jobs), CHUNK_SIZE)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < PARALLEL_THRESHOLD:
+        renderer = renderer or ScriptRenderer(root)
+        results = [_render_chunk(renderer, output_dir, chunk, width) for chunk in chunks]
+    else:
+        root = root or (renderer.root if renderer else None)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(root,)) as pool:
+            results = list(pool.map(_render_chunk_in_worker,
+                                    itertools.repeat(output_dir), chunks, itertools.repeat(width)))
+
+    manifest = [entry for entries in results for entry in entries]
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n")
+    return manifest
+
+
+def summarize(manifest, output_dir):
+    """One-line summary of a batch run"""
+    failed = [entry["index"] for entry in manifest if "error" in entry]
+    text = f"Rendered {len(manifest) - len(failed)}/{len(manifest)} bundles to {output_dir}"
+    if failed:
+        text += f" (failed: {failed})"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many libEnsemble script bundles")
+    parser.add_argument("spec", help="JSON file with parameter_sets, base and/or sweep")
+    parser.add_argument("--output-dir", required=True, help="Directory to write bundles into")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    spec = json.loads(Path(args.spec).read_text())
+    parameter_sets = expand_parameter_sets(spec.get("parameter_sets"), spec.get("base"), spec.get("sweep"))
+    manifest = render_batch(parameter_sets, args.output_dir, workers=args.workers)
+    print(summarize(manifest, args.output_dir))
+    if any("error" in entry for entry in manifest):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Structured multi-file script bundles.
+
+A bundle is a list of {"filename", "content", "sha256"} dicts. The
+CreateLibEnsembleScripts tool returns one as structuredContent {"files": [...]}
+(both mcp_server.mjs and the in-process renderer), so agents can verify and
+write files directly instead of regex-splitting the tool's text output.
+
+The "=== filename ===" text form is still used to show scripts to the LLM and
+to read its replies; parse_bundle_text does that in one line-oriented pass and
+only treats whole "=== name.ext ===" lines as file headers, so a script
+containing "===" is not truncated.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+_HEADER = re.compile(r"^=== ([\w./-]+\.\w+) ===\s*$")
+_FENCE = re.compile(r"^\s*```[\w+-]*\s*$")
+
+
+def sha256_text(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def make_file(filename, content):
+    return {"filename": filename, "content": content, "sha256": sha256_text(content)}
+
+
+def make_bundle(files):
+    """Bundle from (filename, content) pairs"""
+    return [make_file(filename, content) for filename, content in files]
+
+
+def verify_file(entry):
+    """Raise ValueError if a bundle entry's content does not match its sha256"""
+    expected = entry.get("sha256")
+    if expected and sha256_text(entry["content"]) != expected:
+        raise ValueError(f"Checksum mismatch for {entry['filename']}")
+    return entry
+
+
+def bundle_to_json(bundle):
+    return json.dumps(bundle)
+
+
+def bundle_from_json(text):
+    """Load and verify a JSON bundle (a list, or {"files": [...]})"""
+    data = json.loads(text)
+    files = data["files"] if isinstance(data, dict) else data
+    return [verify_file(entry) for entry in files]
+
+
+def bundle_from_tool_result(result):
+    """Bundle from a CreateLibEnsembleScripts call result (None on error or no scripts)"""
+    if getattr(result, "isError", False):
+        return None
+    structured = getattr(result, "structuredContent", None)
+    if structured and structured.get("files"):
+        return [verify_file(entry) for entry in structured["files"]]
+    text = result.content[0].text if result.content else ""
+    return parse_bundle_text(text) or None
+
+
+def parse_bundle_text(text):
+    """Parse "=== filename ===" text (e.g. an LLM reply) into a bundle.
+
+    Text before the first header and markdown fence lines are dropped.
+    Each file's content is stripped and given a single trailing newline.
+    """
+    files = []
+    filename = None
+    lines = []
+
+    def flush():
+        if filename is not None:
+            files.append(make_file(filename, "\n".join(lines).strip() + "\n"))
+
+    for line in text.splitlines():
+        match = _HEADER.match(line)
+        if match:
+            flush()
+            filename = match.group(1)
+            lines = []
+        elif filename is not None and not _FENCE.match(line):
+            lines.append(line)
+    flush()
+    return files
+
+
+def format_bundle_text(bundle):
+    """Bundle as "=== filename ===" text for prompts"""
+    return "".join(f"=== {entry['filename']} ===\n{entry['content']}\n\n" for entry in bundle)
+
+
+def write_bundle(bundle, output_dir, verbose=True):
+    """Verify and write each file of a bundle into output_dir. Returns the written paths."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for entry in bundle:
+        verify_file(entry)
+        path = output_dir / entry["filename"]
+        if path.exists() and path.stat().st_nlink > 1:
+            path.unlink()  # Hardlinked from another workspace: write a file of our own
+        path.write_text(entry["content"])
+        paths.append(path)
+        if verbose:
+            print(f"- Saved: {path}", flush=True)
+    return paths
+
+
+def read_bundle(directory, pattern="*.py"):
+    """Bundle from the files in a directory (sorted by name)"""
+    return make_bundle((path.name, path.read_text()) for path in sorted(Path(directory).glob(pattern)))
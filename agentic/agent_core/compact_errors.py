@@ -0,0 +1,206 @@
+"""
+Compact run errors before they go into a fix prompt.
+
+A failed ensemble's stderr/stdout can be tens of thousands of characters:
+the same traceback from every worker, deep libEnsemble and site-packages
+frames, and progress output. compact_error keeps what the LLM needs:
+
+- the exception chains, most recent last, with duplicates (e.g. one per
+  worker) collapsed to a count
+- only frames in the user's scripts, plus the innermost frame
+- the relevant source lines from the user's scripts
+- the last few other stderr lines (e.g. a sys.exit message)
+
+and reports the size before and after.
+"""
+
+import re
+from pathlib import Path
+
+# Unique exception chains kept (most recent last)
+MAX_CHAINS = 3
+
+# Source lines shown before/after each user frame
+CONTEXT_LINES = 2
+
+# Other stderr lines kept (e.g. "Application not found: ...")
+OTHER_LINES = 10
+
+# Longest other line kept, in characters
+MAX_LINE = 300
+
+_TRACEBACK = "Traceback (most recent call last):"
+_CHAIN_MARKERS = (
+    "During handling of the above exception, another exception occurred:",
+    "The above exception was the direct cause of the following exception:",
+)
+_SECTIONS = ("Stderr:", "Stdout:", "ensemble.log (last lines):")
+_FRAME = re.compile(r'^\s*File "(?P<path>[^"]+)", line (?P<line>\d+)(?:, in (?P<func>.+))?$')
+_CARETS = re.compile(r"^\s*[\^~]+\s*$")
+
+
+class _Traceback:
+    def __init__(self):
+        self.frames = []  # [path, line, func, code_lines]
+        self.exception = []
+
+
+def _parse(text):
+    """Split text into exception chains (lists of _Traceback) and other (section, line)s"""
+    chains = []
+    other = []
+    current = None
+    chained = False
+    in_exception = False
+    section = ""
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        for prefix in _SECTIONS:
+            if line.startswith(prefix):
+                # A new section of the error message ends any open traceback
+                line = line[len(prefix):].lstrip()
+                section = prefix
+                current = None
+                chained = False
+                break
+        stripped = line.strip()
+        if _TRACEBACK in line:
+            current = _Traceback()
+            if chained and chains:
+                chains[-1].append(current)
+            else:
+                chains.append([current])
+            chained = False
+            in_exception = False
+            continue
+        if stripped in _CHAIN_MARKERS:
+            chained = True
+            current = None
+            continue
+        if current is None:
+            if stripped:
+                other.append((section, line))
+            continue
+        match = _FRAME.match(line)
+        if match and not in_exception:
+            current.frames.append([match["path"], int(match["line"]), match["func"] or "", []])
+        elif not in_exception and line.startswith((" ", "\t")) and current.frames:
+            current.frames[-1][3].append(line)
+        elif stripped:
+            in_exception = True
+            current.exception.append(line)
+            if len(current.exception) >= 5:
+                current = None
+        else:
+            current = None
+    return chains, other
+
+
+def _is_user_frame(path, sources):
+    return Path(path).name in sources and "site-packages" not in path
+
+
+def _render_traceback(tb, sources):
+    lines = [_TRACEBACK]
+    omitted = 0
+    last = len(tb.frames) - 1
+    for i, (path, lineno, func, code) in enumerate(tb.frames):
+        if not _is_user_frame(path, sources) and i != last:
+            omitted += 1
+            continue
+        if omitted:
+            lines.append(f"  [... {omitted} library frame(s) omitted ...]")
+            omitted = 0
+        name = Path(path).name if _is_user_frame(path, sources) else path
+        lines.append(f'  File "{name}", line {lineno}, in {func}')
+        lines.extend(c for c in code if not _CARETS.match(c))
+    if omitted:
+        lines.append(f"  [... {omitted} library frame(s) omitted ...]")
+    lines.extend(tb.exception)
+    return "\n".join(lines)
+
+
+def _render_chain(chain, sources):
+    return f"\n\n{_CHAIN_MARKERS[0]}\n\n".join(_render_traceback(tb, sources) for tb in chain)
+
+
+def _source_excerpts(chains, sources):
+    """Source lines around each user frame, one block per file"""
+    wanted = {}
+    for chain in chains:
+        for tb in chain:
+            for path, lineno, _, _ in tb.frames:
+                if _is_user_frame(path, sources):
+                    wanted.setdefault(Path(path).name, set()).add(lineno)
+    blocks = []
+    for filename in sorted(wanted):
+        file_lines = sources[filename].splitlines()
+        shown = set()
+        for lineno in wanted[filename]:
+            shown.update(range(max(1, lineno - CONTEXT_LINES), min(len(file_lines), lineno + CONTEXT_LINES) + 1))
+        block = [f"{filename}:"]
+        previous = None
+        for n in sorted(shown):
+            if previous is not None and n != previous + 1:
+                block.append("     ...")
+            marker = ">" if n in wanted[filename] else " "
+            block.append(f"{marker}{n:4d} | {file_lines[n - 1]}")
+            previous = n
+        blocks.append("\n".join(block))
+    return "\n\n".join(blocks)
+
+
+def sources_from_bundle(bundle):
+    return {entry["filename"]: entry["content"] for entry in bundle}
+
+
+def sources_from_dir(directory, pattern="*.py"):
+    return {p.name: p.read_text() for p in sorted(Path(directory).glob(pattern))}
+
+
+def compact_error(error_msg, sources):
+    """Compacted error text. sources maps script filename -> content."""
+    if not error_msg or error_msg.startswith("Pre-flight check failed"):
+        return error_msg
+    head = error_msg.splitlines()[0]
+    chains, other = _parse(error_msg)
+
+    parts = [head]
+    if chains:
+        rendered = [_render_chain(chain, sources) for chain in chains]
+        counts = {}
+        for text in rendered:
+            counts[text] = counts.get(text, 0) + 1
+        # Unique chains in order of last appearance, most recent last
+        unique = list(dict.fromkeys(reversed(rendered)))[:MAX_CHAINS][::-1]
+        skipped = len(counts) - len(unique)
+        label = "Exception" if len(unique) == 1 else f"Exceptions ({len(unique)} distinct, most recent last)"
+        parts.append(f"{label}, library frames omitted:")
+        if skipped:
+            parts.append(f"[... {skipped} older distinct traceback(s) omitted ...]")
+        for text in unique:
+            parts.append(text)
+            if counts[text] > 1:
+                parts.append(f"(this traceback occurred {counts[text]} times, e.g. once per worker)")
+        excerpts = _source_excerpts(chains, sources)
+        if excerpts:
+            parts.append(f"Relevant source lines:\n{excerpts}")
+
+    # Other stderr/log lines; stdout only if there is nothing else to go on
+    lines = [line for section, line in other if section != "Stdout:" and line != head]
+    if not lines and not chains:
+        lines = [line for section, line in other if section == "Stdout:"]
+    other = [line[:MAX_LINE] for line in dict.fromkeys(lines)][-OTHER_LINES:]
+    if other:
+        parts.append("Other output (last lines):\n" + "\n".join(other))
+    compacted = "\n\n".join(parts)
+    return compacted if len(compacted) < len(error_msg) else error_msg
+
+
+def compact_for_prompt(error_msg, sources):
+    """compact_error plus a printed before/after size report"""
+    compacted = compact_error(error_msg, sources)
+    before, after = len(error_msg or ""), len(compacted or "")
+    if before and after < before:
+        print(f"Error compacted: {before:,} -> {after:,} chars ({100 * (before - after) / before:.0f}% smaller)")
+    return compacted
@@ -0,0 +1,254 @@
+"""
+Local extraction of the configuration shown in interactive review.
+
+The review steps only need what is already in the scripts' structure: the
+generator import, the GenSpecs/SimSpecs/ExitCriteria arguments (or the
+equivalent gen_specs/sim_specs/exit_criteria dicts), the bounds, and the
+function that sets the objective value. This module finds them with ast, so
+a review step needs no model call. Values are shown as their source text.
+
+Usage (from agentic/):
+    python -m agent_core.config_extract tests/scripts_with_exe_with_errors/
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+# Spec classes and the dict variable names used for them in older scripts
+SPEC_NAMES = {
+    "GenSpecs": "gen_specs",
+    "SimSpecs": "sim_specs",
+    "ExitCriteria": "exit_criteria",
+    "LibeSpecs": "libE_specs",
+}
+
+# Functions that set the objective, in priority order
+OBJECTIVE_FUNCTIONS = ("set_objective_value", "set_objective")
+
+# Longest value shown on one line
+MAX_VALUE = 120
+
+
+def _segment(source, node):
+    """Source text of node on one line (whitespace collapsed)"""
+    text = ast.get_source_segment(source, node) or ast.unparse(node)
+    text = " ".join(text.split())
+    return text if len(text) <= MAX_VALUE else text[:MAX_VALUE - 3] + "..."
+
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+class Spec:
+    """Arguments of one spec (GenSpecs(...) call or gen_specs = {...} dict)"""
+
+    def __init__(self, kind, filename, line):
+        self.kind = kind
+        self.filename = filename
+        self.line = line
+        self.items = []  # (key, value node)
+
+    def get(self, key):
+        for k, value in self.items:
+            if k == key:
+                return value
+        return None
+
+
+class Script:
+    """A parsed bundle file"""
+
+    def __init__(self, filename, source):
+        self.filename = filename
+        self.source = source
+        self.tree = ast.parse(source, filename)
+
+
+def parse_scripts(bundle):
+    """Parsed .py files of a bundle (files with syntax errors are skipped)"""
+    scripts = []
+    for entry in bundle:
+        if not entry["filename"].endswith(".py"):
+            continue
+        try:
+            scripts.append(Script(entry["filename"], entry["content"]))
+        except SyntaxError:
+            continue
+    return scripts
+
+
+def find_specs(scripts):
+    """kind -> first Spec found"""
+    dict_names = {v: k for k, v in SPEC_NAMES.items()}
+    specs = {}
+    for script in scripts:
+        for node in ast.walk(script.tree):
+            if isinstance(node, ast.Call) and _call_name(node) in SPEC_NAMES:
+                kind = _call_name(node)
+                if kind in specs:
+                    continue
+                spec = Spec(kind, script.filename, node.lineno)
+                spec.items = [(kw.arg, kw.value) for kw in node.keywords if kw.arg]
+                specs[kind] = spec
+            elif (isinstance(node, ast.Assign) and len(node.targets) == 1
+                  and isinstance(node.targets[0], ast.Name) and node.targets[0].id in dict_names
+                  and isinstance(node.value, ast.Dict)):
+                kind = dict_names[node.targets[0].id]
+                if kind in specs:
+                    continue
+                spec = Spec(kind, script.filename, node.lineno)
+                spec.items = [(k.value, v) for k, v in zip(node.value.keys, node.value.values)
+                              if isinstance(k, ast.Constant) and isinstance(k.value, str)]
+                specs[kind] = spec
+    return specs
+
+
+def _script(scripts, filename):
+    return next(s for s in scripts if s.filename == filename)
+
+
+def find_imports(scripts):
+    """local name -> (module, imported name, filename, line) for `from m import x [as y]`"""
+    found = {}
+    for script in scripts:
+        for node in ast.walk(script.tree):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                for alias in node.names:
+                    found.setdefault(alias.asname or alias.name,
+                                     (node.module, alias.name, script.filename, node.lineno))
+    return found
+
+
+def _format_dict(source, node, indent="    "):
+    if not isinstance(node, ast.Dict):
+        return [f"{indent}{_segment(source, node)}"]
+    lines = []
+    for key, value in zip(node.keys, node.values):
+        if key is None:  # {**defaults}
+            lines.append(f"{indent}**{_segment(source, value)}")
+        else:
+            name = key.value if isinstance(key, ast.Constant) else _segment(source, key)
+            lines.append(f"{indent}{name}: {_segment(source, value)}")
+    return lines
+
+
+def _format_spec(scripts, spec, expand_user=True):
+    source = _script(scripts, spec.filename).source
+    lines = [f"{spec.kind} ({spec.filename}:{spec.line}):"]
+    for key, value in spec.items:
+        if key == "user" and expand_user:
+            lines.append("  user:")
+            lines += _format_dict(source, value)
+        else:
+            lines.append(f"  {key}={_segment(source, value)}")
+    return lines
+
+
+def user_value(spec, key):
+    user = spec.get("user") if spec else None
+    if isinstance(user, ast.Dict):
+        for k, v in zip(user.keys, user.values):
+            if isinstance(k, ast.Constant) and k.value == key:
+                return v
+    return None
+
+
+def extract_generator(bundle):
+    """Generator name/import, GenSpecs (with user options), bounds, SimSpecs and ExitCriteria.
+
+    Returns the text to show, or None if no gen_specs were found.
+    """
+    scripts = parse_scripts(bundle)
+    specs = find_specs(scripts)
+    gen = specs.get("GenSpecs")
+    if gen is None:
+        return None
+    source = _script(scripts, gen.filename).source
+    imports = find_imports(scripts)
+    lines = []
+
+    gen_f = gen.get("gen_f")
+    if isinstance(gen_f, ast.Name) and gen_f.id in imports:
+        module, name, filename, line = imports[gen_f.id]
+        lines.append(f"Generator: {name} (from {module}, {filename}:{line})")
+    elif gen_f is not None:
+        lines.append(f"Generator: {_segment(source, gen_f)}")
+    else:
+        lines.append("Generator: (no gen_f set)")
+
+    lb, ub = user_value(gen, "lb"), user_value(gen, "ub")
+    if lb is not None or ub is not None:
+        shown = [f"{k}={_segment(source, v)}" for k, v in (("lb", lb), ("ub", ub)) if v is not None]
+        lines.append(f"Bounds: {', '.join(shown)}")
+
+    lines.append("")
+    lines += _format_spec(scripts, gen)
+    for kind in ("SimSpecs", "ExitCriteria"):
+        if kind in specs:
+            lines.append("")
+            lines += _format_spec(scripts, specs[kind])
+    return "\n".join(lines)
+
+
+def _function_source(script, name):
+    for node in script.tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name:
+            start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+            body = "\n".join(script.source.splitlines()[start - 1:node.end_lineno])
+            return f"# {script.filename}:{start}\n{body}"
+    return None
+
+
+def extract_objective(bundle):
+    """Source of set_objective_value() (or set_objective()), else of the sim function.
+
+    Returns the text to show, or None if neither was found.
+    """
+    scripts = parse_scripts(bundle)
+    for name in OBJECTIVE_FUNCTIONS:
+        for script in scripts:
+            found = _function_source(script, name)
+            if found:
+                return found
+
+    # No objective setter: show the simulation function that computes it
+    sim = find_specs(scripts).get("SimSpecs")
+    sim_f = sim.get("sim_f") if sim else None
+    if not isinstance(sim_f, ast.Name):
+        return None
+    name = sim_f.id
+    target = None
+    imported = find_imports(scripts).get(name)
+    if imported:
+        module, name, _, _ = imported
+        target = next((s for s in scripts if Path(s.filename).stem == module.split(".")[-1]), None)
+    if target is None:
+        target = _script(scripts, sim.filename)
+    return _function_source(target, name)
+
+
+def main():
+    import argparse
+
+    from .bundle import read_bundle
+
+    parser = argparse.ArgumentParser(description="Show the review sections of a script directory")
+    parser.add_argument("directory", help="Directory containing the scripts")
+    args = parser.parse_args()
+    bundle = read_bundle(args.directory)
+    print("--- Generator Configuration ---")
+    print(extract_generator(bundle) or "(not found)")
+    print("\n--- Set Objective Function ---")
+    print(extract_objective(bundle) or "(not found)")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
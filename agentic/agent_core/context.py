@@ -0,0 +1,221 @@
+"""
+Keeps a chat agent's conversation within a token budget.
+
+Every agent invocation resends the whole message history, so script bodies
+from read_file, stderr from run_script and the generator output pile up with
+each turn. When the history is over budget, compact_history shrinks it in
+steps, stopping as soon as it fits:
+
+1. read_file results and write_file contents that a later read, write or
+   generation superseded become short references to the current version.
+2. Run logs and generator output, except the latest of each, are collapsed to
+   their status line and last error line.
+3. The turns before the last KEEP_TURNS are replaced by one summary message:
+   what the user asked, which tools ran, what the assistant answered, plus
+   the current scripts read from the work dir, so the model always sees them.
+
+Compacted messages keep their ids, so the debug log does not log them again,
+and the compacted list becomes the history for later turns.
+"""
+
+import json
+from pathlib import Path
+
+# Default history budget (estimated tokens; 0 disables compaction)
+CONTEXT_TOKENS = 30000
+
+# Turns (a user message and everything after it) never summarized
+KEEP_TURNS = 2
+
+READ_TOOLS = ("read_file",)
+WRITE_TOOLS = ("write_file",)
+RUN_TOOLS = ("run_script",)
+GENERATE_TOOLS = ("CreateLibEnsembleScripts",)
+
+SUMMARY_CHARS = 300
+
+
+def _text(content):
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, default=str)
+
+
+def _plain(content):
+    """Just the text of a message content (no tool_use blocks)"""
+    if isinstance(content, str):
+        return content
+    return " ".join(b.get("text", "") if isinstance(b, dict) else str(b) for b in content)
+
+
+def estimate_tokens(messages):
+    """Rough token count of messages (about 4 characters per token)"""
+    chars = 0
+    for msg in messages:
+        chars += len(_text(msg.content))
+        for tc in getattr(msg, "tool_calls", None) or []:
+            chars += len(json.dumps(tc.get("args", {}), default=str))
+    return chars // 4
+
+
+def _short(text, limit=SUMMARY_CHARS):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _tool_calls(messages):
+    """tool_call_id -> (tool name, args, index of the AI message) for all tool calls"""
+    calls = {}
+    for i, msg in enumerate(messages):
+        for tc in getattr(msg, "tool_calls", None) or []:
+            calls[tc.get("id")] = (tc.get("name", ""), tc.get("args", {}), i)
+    return calls
+
+
+def _events(messages, calls):
+    """(index, kind, path) of file reads/writes and generations, in order"""
+    events = []
+    for i, msg in enumerate(messages):
+        if msg.type == "tool" and msg.tool_call_id in calls:
+            name, args, _ = calls[msg.tool_call_id]
+            if name in READ_TOOLS:
+                events.append((i, "read", args.get("filepath")))
+            elif name in GENERATE_TOOLS:
+                events.append((i, "generate", None))
+        for tc in getattr(msg, "tool_calls", None) or []:
+            if tc.get("name") in WRITE_TOOLS:
+                events.append((i, "write", tc.get("args", {}).get("filepath")))
+    return events
+
+
+def _superseded(events, index, path):
+    return any(i > index and (kind == "generate" or p == path) for i, kind, p in events)
+
+
+def _with_args(msg, call_id, args):
+    """Copy of an AI message with the args of one tool call replaced"""
+    tool_calls = [{**tc, "args": args} if tc.get("id") == call_id else tc for tc in msg.tool_calls]
+    content = msg.content
+    if isinstance(content, list):  # Anthropic keeps tool_use blocks (with their input) in the content
+        content = [{**block, "input": args}
+                   if isinstance(block, dict) and block.get("type") == "tool_use" and block.get("id") == call_id
+                   else block for block in content]
+    return msg.model_copy(update={"tool_calls": tool_calls, "content": content})
+
+
+def _drop_superseded_files(messages, version):
+    calls = _tool_calls(messages)
+    events = _events(messages, calls)
+    ref = f" (current version: {version})" if version else ""
+    out = list(messages)
+    for i, msg in enumerate(messages):
+        if msg.type == "tool" and msg.tool_call_id in calls:
+            name, args, _ = calls[msg.tool_call_id]
+            path = args.get("filepath")
+            if name in READ_TOOLS and not _text(msg.content).startswith("[") and _superseded(events, i, path):
+                out[i] = msg.model_copy(update={
+                    "content": f"[Earlier contents of {path} omitted: superseded{ref}. Use read_file to see it.]"})
+        for tc in getattr(msg, "tool_calls", None) or []:
+            args = tc.get("args", {})
+            path = args.get("filepath")
+            if tc.get("name") in WRITE_TOOLS and not args.get("content", "").startswith("[") \
+                    and _superseded(events, i, path):
+                size = len(args.get("content", ""))
+                out[i] = _with_args(out[i], tc.get("id"), {
+                    **args, "content": f"[{size} chars written to {path}; superseded{ref}]"})
+    return out
+
+
+def _collapse_run_log(text):
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) <= 2:
+        return text
+    return f"{lines[0]}\n[log collapsed] ... {_short(lines[-1], 200)}"
+
+
+def _collapse_old_outputs(messages):
+    calls = _tool_calls(messages)
+    latest = {}
+    for i, msg in enumerate(messages):
+        if msg.type == "tool" and msg.tool_call_id in calls:
+            latest[calls[msg.tool_call_id][0]] = i
+    out = list(messages)
+    for i, msg in enumerate(messages):
+        if msg.type != "tool" or msg.tool_call_id not in calls or latest.get(calls[msg.tool_call_id][0]) == i:
+            continue
+        name = calls[msg.tool_call_id][0]
+        if name in RUN_TOOLS:
+            out[i] = msg.model_copy(update={"content": _collapse_run_log(_text(msg.content))})
+        elif name in GENERATE_TOOLS and not _text(msg.content).startswith("["):
+            out[i] = msg.model_copy(update={
+                "content": "[Generated scripts omitted: the current scripts are in the work dir.]"})
+    return out
+
+
+def _turns(messages):
+    """messages split at each user message (anything before the first one is its own group)"""
+    turns = [[]]
+    for msg in messages:
+        if msg.type == "human" and turns[-1]:
+            turns.append([])
+        turns[-1].append(msg)
+    return [t for t in turns if t]
+
+
+def _summarize_turn(turn):
+    lines = []
+    calls = {}
+    for msg in turn:
+        if msg.type == "human":
+            lines.append(f"User: {_short(_plain(msg.content))}")
+        for tc in getattr(msg, "tool_calls", None) or []:
+            calls[tc.get("id")] = tc
+        if msg.type == "tool" and msg.tool_call_id in calls:
+            tc = calls[msg.tool_call_id]
+            target = tc.get("args", {}).get("filepath") or tc.get("args", {}).get("script_name") or ""
+            status = _text(msg.content).split("\n", 1)[0]
+            lines.append(f"  {tc.get('name')}({target}) -> {_short(status, 120)}")
+    final = next((m for m in reversed(turn) if m.type == "ai" and _plain(m.content).strip()), None)
+    if final is not None:
+        lines.append(f"Assistant: {_short(_plain(final.content))}")
+    return "\n".join(lines)
+
+
+def current_scripts(work_dir, pattern="*.py"):
+    """Text block with the scripts currently in work_dir"""
+    parts = [f"=== {f.name} ===\n{f.read_text()}" for f in sorted(Path(work_dir).glob(pattern))]
+    return "\n\n".join(parts)
+
+
+def _summarize_old_turns(messages, work_dir, keep_turns):
+    from langchain_core.messages import HumanMessage
+
+    turns = _turns(messages)
+    if len(turns) <= keep_turns:
+        return messages
+    old, recent = turns[:-keep_turns], turns[-keep_turns:]
+    summary = "\n\n".join(_summarize_turn(t) for t in old if t[0].type != "system")
+    text = f"[Summary of the earlier conversation]\n{summary}"
+    scripts = current_scripts(work_dir)
+    if scripts:
+        text += f"\n\n[Current scripts in the work dir]\n{scripts}"
+    system = [m for m in turns[0] if m.type == "system"]
+    return system + [HumanMessage(content=text)] + [m for t in recent for m in t]
+
+
+def compact_history(messages, work_dir, budget=CONTEXT_TOKENS, version=None, keep_turns=KEEP_TURNS):
+    """messages shrunk (in the steps above) until they fit budget tokens; unchanged if they already fit"""
+    if not budget:
+        return messages
+    before = estimate_tokens(messages)
+    if before <= budget:
+        return messages
+    compacted = messages
+    for step in (lambda m: _drop_superseded_files(m, version),
+                 _collapse_old_outputs,
+                 lambda m: _summarize_old_turns(m, work_dir, keep_turns)):
+        compacted = step(compacted)
+        if estimate_tokens(compacted) <= budget:
+            break
+    print(f"Context compacted: ~{before} -> ~{estimate_tokens(compacted)} tokens (budget {budget})", flush=True)
+    return compacted
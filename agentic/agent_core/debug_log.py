@@ -0,0 +1,129 @@
+"""
+Append-only debug log of an agent conversation.
+
+Each message is written once, when first seen, as a JSON line in
+debug_log.jsonl, and in readable form in debug_log.txt. Logging the
+conversation after every turn therefore costs only the new messages, and
+both files grow linearly with the session.
+
+Every JSONL entry carries its byte offset in the file ("offset"), so a reader
+can ask for everything since offset N (read_since), as the web UI's
+/debug-log?since=N does.
+"""
+
+import json
+import time
+from pathlib import Path
+
+DEBUG_LOG_FILE = "debug_log.txt"
+
+# Message content longer than this is shortened in the readable view
+TEXT_MAX_CHARS = 2000
+
+_RULE = "=" * 80
+
+
+def jsonl_path(text_path):
+    return Path(text_path).with_suffix(".jsonl")
+
+
+def format_entry(entry):
+    """Readable text of one log entry"""
+    kind = entry["kind"]
+    if kind == "turn":
+        return f"\n{_RULE}\n  {entry['label']}\n{_RULE}\n"
+    if kind == "section":
+        return f"{entry['label']}\n{_RULE}\n{entry['text']}\n\n"
+    if kind == "note":
+        return f"{entry['text']}\n"
+    lines = [f"\n--- {entry['role']} ---"]
+    if entry.get("tool_calls"):
+        lines.append("[Tool calls]")
+        lines += [f"  {tc['name']}({tc['args']})" for tc in entry["tool_calls"]]
+    content = entry.get("content", "")
+    if len(content) > TEXT_MAX_CHARS:
+        content = content[:1000] + f"\n... [{len(content)} chars total] ...\n" + content[-500:]
+    if content:
+        lines.append(content)
+    return "\n".join(lines) + "\n"
+
+
+class DebugLog:
+    """Writer for debug_log.jsonl and its readable view debug_log.txt (started fresh)"""
+
+    def __init__(self, path=DEBUG_LOG_FILE):
+        self.text_path = Path(path)
+        self.jsonl_path = jsonl_path(path)
+        self.text_path.write_text("")
+        self.jsonl_path.write_bytes(b"")
+        self._offset = 0
+        self._seq = 0
+        self._seen = set()  # ids (or positions) of messages already written
+
+    def _append(self, entries):
+        lines, texts = [], []
+        for entry in entries:
+            entry = {"offset": self._offset, "seq": self._seq, "time": round(time.time(), 3), **entry}
+            line = (json.dumps(entry) + "\n").encode("utf-8")
+            lines.append(line)
+            texts.append(format_entry(entry))
+            self._offset += len(line)
+            self._seq += 1
+        with open(self.jsonl_path, "ab") as f:
+            f.write(b"".join(lines))
+        with open(self.text_path, "a") as f:
+            f.write("".join(texts))
+
+    def note(self, text):
+        self._append([{"kind": "note", "text": text}])
+
+    def section(self, label, text):
+        self._append([{"kind": "section", "label": label, "text": text}])
+
+    def messages(self, messages, label=""):
+        """Append the messages not logged yet (under a turn header if there are any)"""
+        entries = []
+        for position, msg in enumerate(messages):
+            key = getattr(msg, "id", None) or f"#{position}"
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            content = msg.content if isinstance(msg.content, str) else str(msg.content)
+            entries.append({
+                "kind": "message",
+                "role": type(msg).__name__,
+                "tool_calls": [{"name": tc.get("name", "?"), "args": tc.get("args", {})}
+                               for tc in getattr(msg, "tool_calls", None) or []],
+                "content": content,
+            })
+        if entries:
+            self._append(([{"kind": "turn", "label": label}] if label else []) + entries)
+
+
+def _read_from(path, offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    return [json.loads(line) for line in data[:end].splitlines() if line], offset + end
+
+
+def read_since(text_path, offset=0):
+    """Entries of debug_log.jsonl from byte offset on, as (entries, next offset, reset).
+
+    reset is True when offset no longer starts an entry of this log (a new
+    session restarted it), in which case reading restarts from 0. A partly
+    written last line is left for the next call.
+    """
+    path = jsonl_path(text_path)
+    if not path.exists():
+        return [], 0, offset > 0
+    if offset > path.stat().st_size:
+        return (*_read_from(path, 0), True)
+    try:
+        entries, next_offset = _read_from(path, offset)
+    except ValueError:  # offset falls inside a line of a newer log
+        entries, next_offset = None, 0
+    if entries is None or (entries and entries[0].get("offset") != offset):
+        return (*_read_from(path, 0), True)
+    return entries, next_offset, False
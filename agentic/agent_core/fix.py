@@ -0,0 +1,40 @@
+"""
+Fix prompt for scripts whose run failed, shared by the loop agents.
+
+The stable part (scripts, reply format) comes first and the error after
+PROMPT_BREAK, so providers can cache the prefix across fix attempts and
+raced candidates (see prompt_cache).
+"""
+
+from .bundle import format_bundle_text
+from .compact_errors import compact_for_prompt, sources_from_bundle
+from .patches import FULL_REPLY_FORMAT, PATCH_REPLY_FORMAT
+from .prompt_cache import PROMPT_BREAK
+
+# Template for fixing failed scripts (the stable part first, so providers can cache it)
+FIX_PROMPT_TEMPLATE = """Here are the current scripts (main run script is {run_script_name}):
+
+{scripts_text}
+
+{reply_format}
+
+""" + PROMPT_BREAK + """These scripts failed with the following error:
+
+{error_msg}
+
+Fix the scripts to resolve this error.
+DO NOT make any other changes or improvements."""
+
+
+def fix_prompt(bundle, error_msg, run_script_name, compact_errors=True, patch_edits=True, max_error_chars=None):
+    """Prompt asking for a fix of bundle for error_msg (compacted unless compact_errors is False)"""
+    if compact_errors:
+        error_msg = compact_for_prompt(error_msg, sources_from_bundle(bundle))
+    if max_error_chars:
+        error_msg = error_msg[:max_error_chars]
+    return FIX_PROMPT_TEMPLATE.format(
+        error_msg=error_msg,
+        scripts_text=format_bundle_text(bundle),
+        run_script_name=run_script_name,
+        reply_format=PATCH_REPLY_FORMAT if patch_edits else FULL_REPLY_FORMAT,
+    )
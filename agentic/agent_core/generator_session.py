@@ -0,0 +1,85 @@
+"""
+Open a session providing the CreateLibEnsembleScripts tool.
+
+"python" renders in-process with agent_core.renderer (no Node.js needed).
+"node" starts mcp_server.mjs over stdio, as the agents originally did.
+"daemon" uses the long-lived renderer service (agent_core.renderer_daemon),
+shared between agent runs, started on first use.
+"""
+
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from .renderer import RendererSession
+
+RENDERERS = ("python", "node", "daemon")
+
+# Renderer when --renderer is not given (e.g. LIBE_AGENT_RENDERER=daemon for the web UI's agents)
+DEFAULT_RENDERER = os.environ.get("LIBE_AGENT_RENDERER", "python")
+
+# Environment variables naming mcp_server.mjs (after --mcp-server)
+MCP_SERVER_ENV = ("GENERATOR_MCP_SERVER", "MCP_SERVER")
+
+
+def needs_mcp_server(renderer):
+    """Whether renderer runs mcp_server.mjs (node, or a daemon with the node backend)"""
+    if renderer == "daemon":
+        from .renderer_daemon import DEFAULT_BACKEND
+        return DEFAULT_BACKEND == "node"
+    return renderer == "node"
+
+
+def find_mcp_server(user_provided_path=None):
+    """Find mcp_server.mjs file.
+    Search order:
+    1) --mcp-server CLI argument (if provided)
+    2) GENERATOR_MCP_SERVER or MCP_SERVER environment variable (if set)
+    3) Repository root (next to agentic/)
+    4) Current directory (./mcp_server.mjs)
+    """
+    search_locations = []
+    if user_provided_path:
+        search_locations.append(Path(user_provided_path))
+    search_locations += [Path(os.environ[name]) for name in MCP_SERVER_ENV if os.environ.get(name)]
+    search_locations += [Path(__file__).resolve().parents[2] / "mcp_server.mjs", Path.cwd() / "mcp_server.mjs"]
+
+    for location in search_locations:
+        if location.exists():
+            return location
+
+    print("Error: Cannot find mcp_server.mjs")
+    print(f"Searched: {', '.join(str(loc) for loc in search_locations)}")
+    print("Specify location via --mcp-server flag or GENERATOR_MCP_SERVER environment variable")
+    sys.exit(1)
+
+
+@asynccontextmanager
+async def open_generator_session(renderer="python", mcp_server=None):
+    """Yield an initialized session with list_tools() and call_tool()"""
+    if renderer == "python":
+        session = RendererSession()
+        await session.initialize()
+        yield session
+        return
+
+    if renderer == "daemon":
+        from .renderer_daemon import DEFAULT_BACKEND, DaemonSession, daemon_client
+
+        session = DaemonSession(daemon_client(DEFAULT_BACKEND, mcp_server))
+        await session.initialize()
+        yield session
+        return
+
+    if renderer != "node":
+        raise ValueError(f"Unknown renderer: {renderer} (choose from {', '.join(RENDERERS)})")
+
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    server_params = StdioServerParameters(command="node", args=[str(mcp_server)])
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
@@ -0,0 +1,110 @@
+"""
+Import-time benchmark of the agent scripts' startup.
+
+Runs each agent script with --help (which parses arguments and exits before
+any LLM, MCP or libEnsemble work) and checks that:
+- none of HEAVY_MODULES (LangChain, the provider SDKs, MCP, pydantic, ...) is
+  imported; they belong inside the functions that create models and tools;
+- the median wall time stays under the budget.
+
+The slowest imports of each script (from python -X importtime) are listed,
+so a regression shows where it comes from. Exits 1 on a failed check.
+
+Usage (from agentic/):
+    python -m agent_core.import_bench                # all agent scripts, 200 ms budget
+    python -m agent_core.import_bench libe_agent_basic.py --budget-ms 150 --runs 10
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+
+AGENT_SCRIPTS = (
+    "libe_agent_basic.py",
+    "libe_agent_basic_auto.py",
+    "libe_agent_with_script_generator.py",
+    "libe_agent_interactive.py",
+    "libe_agent_interactive_llm_first.py",
+    "../ensemble_agent.py",
+)
+
+# Packages that must not be imported for --help (top-level names)
+HEAVY_MODULES = (
+    "langchain", "langchain_core", "langchain_openai", "langchain_anthropic", "langgraph",
+    "openai", "anthropic", "mcp", "pydantic", "httpx", "numpy", "libensemble", "gradio",
+)
+
+DEFAULT_BUDGET_MS = 200
+DEFAULT_RUNS = 5
+SHOW_SLOWEST = 5
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def time_help(script, runs=DEFAULT_RUNS):
+    """Wall times (ms) of `python script --help`"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, script, "--help"], cwd=AGENT_DIR,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        times.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{script} --help failed:\n{proc.stderr}")
+    return times
+
+
+def import_profile(script):
+    """[(module, self us, cumulative us, depth)] from python -X importtime script --help"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", script, "--help"], cwd=AGENT_DIR,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    profile = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if m:
+            profile.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return profile
+
+
+def heavy_imports(profile):
+    return sorted({name for name, *_ in profile if name.split(".")[0] in HEAVY_MODULES})
+
+
+def check(script, budget_ms=DEFAULT_BUDGET_MS, runs=DEFAULT_RUNS):
+    """(ok, report lines) for one script"""
+    median = statistics.median(time_help(script, runs))
+    profile = import_profile(script)
+    heavy = heavy_imports(profile)
+    ok = median <= budget_ms and not heavy
+    lines = [f"{'✓' if ok else '✗'} {script}: --help median {median:.0f} ms (budget {budget_ms} ms)"]
+    if heavy:
+        lines.append(f"    heavy modules imported: {', '.join(heavy)}")
+    top = sorted((p for p in profile if p[3] == 0), key=lambda p: -p[2])[:SHOW_SLOWEST]
+    lines += [f"    {cumulative / 1000:7.1f} ms  {name}" for name, _, cumulative, _ in top]
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the --help startup time of the agent scripts")
+    parser.add_argument("scripts", nargs="*", default=AGENT_SCRIPTS, help="Agent scripts (default: all)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Largest allowed median --help time (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Timed runs per script")
+    args = parser.parse_args()
+
+    all_ok = True
+    for script in args.scripts:
+        ok, lines = check(script, args.budget_ms, args.runs)
+        print("\n".join(lines))
+        all_ok = all_ok and ok
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+LLM factory shared by the agent scripts.
+
+LangChain and the provider packages take seconds to import, so they are
+imported here only when a model or agent is actually created; `--help`, argument
+errors and the web UI's startup of an agent do not pay for them
+(python -m agent_core.import_bench checks this).
+"""
+
+import os
+import sys
+
+from .prompt_cache import openai_model_kwargs, prompt_cache_middleware
+from .trace import TRACE
+
+DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
+DEFAULT_ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
+
+
+def default_model():
+    """LLM_MODEL if set, else the default model of whichever API key is available"""
+    if os.environ.get("LLM_MODEL"):
+        return os.environ["LLM_MODEL"]
+    if os.environ.get("OPENAI_API_KEY") or not os.environ.get("ANTHROPIC_API_KEY"):
+        return DEFAULT_OPENAI_MODEL
+    return DEFAULT_ANTHROPIC_MODEL
+
+
+def create_llm(model, temperature=0, base_url=None, cache=None):
+    """Create LLM — ChatAnthropic for Claude models, ChatOpenAI otherwise."""
+    if "claude" in model.lower():
+        try:
+            from langchain_anthropic import ChatAnthropic
+        except ImportError:
+            sys.exit("Error: pip install langchain-anthropic required for Claude models")
+        return ChatAnthropic(model=model, temperature=temperature, cache=cache, callbacks=TRACE.callbacks())
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model, temperature=temperature, base_url=base_url, cache=cache,
+                      model_kwargs=openai_model_kwargs(base_url), callbacks=TRACE.callbacks())
+
+
+def create_agent(llm, tools, **kwargs):
+    """langchain.agents.create_agent, imported on first use, with the prompt cache middleware"""
+    from langchain.agents import create_agent
+    middleware = [prompt_cache_middleware(), *kwargs.pop("middleware", ())]
+    return create_agent(llm, tools, middleware=middleware, **kwargs)
+
+
+def make_tool(name, description, args_schema, coroutine):
+    """LangChain StructuredTool running coroutine (args_schema: a pydantic model or a JSON schema)"""
+    from langchain_core.tools import StructuredTool
+    return StructuredTool(name=name, description=description, args_schema=args_schema, coroutine=coroutine)
+
+
+def generator_tool(mcp_tool, coroutine):
+    """Tool for the generator's CreateLibEnsembleScripts, keeping its JSON schema (with the enum constraints)"""
+    return make_tool(mcp_tool.name, mcp_tool.description, mcp_tool.inputSchema, coroutine)
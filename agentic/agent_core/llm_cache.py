@@ -0,0 +1,171 @@
+"""
+Persistent on-disk cache of LLM responses (opt-in).
+
+The agents call their models with temperature=0, so rerunning the same
+scenario (DEFAULT_PROMPT, the same --scripts directory, the same fix and
+refine templates) asks the same questions again. DiskLLMCache is a LangChain
+cache (passed to the chat model as cache=...) that stores each response in
+its own file, keyed by the sha256 of:
+- the model and base URL
+- LangChain's llm string (model parameters and bound tool schemas)
+- the full message list
+
+Entries are written atomically (temp file + rename), so several agent or web
+UI processes can share one cache directory. Entries older than max_age are
+dropped, and when the cache is larger than max_bytes the least recently used
+entries are removed.
+
+LangChain is imported only when a cache is opened (open_llm_cache).
+"""
+
+import atexit
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Cache directory (LIBE_AGENT_LLM_CACHE_DIR overrides)
+DEFAULT_CACHE_DIR = Path(os.environ.get("LIBE_AGENT_LLM_CACHE_DIR",
+                                        Path.home() / ".cache" / "libe_agent" / "llm"))
+
+# Eviction limits
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Writes between eviction sweeps (one sweep also runs when the cache is opened)
+SWEEP_EVERY = 50
+
+_LOCK_FILE = ".sweep.lock"
+
+
+class DiskLLMCache:
+    """LLM response cache with one JSON file per entry, safe to share between processes"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, namespace="", max_bytes=CACHE_MAX_BYTES,
+                 max_age=CACHE_MAX_AGE):
+        self.directory = Path(directory).expanduser()
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sweep()
+
+    def _path(self, prompt, llm_string):
+        key = hashlib.sha256(json.dumps([self.namespace, llm_string, prompt]).encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / f"{key}.json"
+
+    def lookup(self, prompt, llm_string):
+        from langchain_core.load import loads
+
+        path = self._path(prompt, llm_string)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age:
+                path.unlink()
+                raise FileNotFoundError(path)
+            data = json.loads(path.read_text())
+            generations = [loads(text) for text in data["generations"]]
+            os.utime(path)  # Mark as recently used for eviction
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1  # Unreadable or partial entry from another version: treat as a miss
+            return None
+        self.hits += 1
+        print(f"[llm-cache] hit ({path.stem[:12]})", flush=True)
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        from langchain_core.load import dumps
+
+        path = self._path(prompt, llm_string)
+        data = {"created": time.time(), "namespace": self.namespace,
+                "generations": [dumps(gen) for gen in return_val]}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            self.sweep()
+
+    def clear(self, **kwargs):
+        for path in self.directory.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+    def sweep(self):
+        """Drop expired entries, then the least recently used until under max_bytes.
+
+        Skipped if another process is already sweeping.
+        """
+        with open(self.directory / _LOCK_FILE, "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            now = time.time()
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - st.st_mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+                else:
+                    entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+            # Temp files left by killed writers
+            for path in self.directory.glob("*/.tmp-*"):
+                try:
+                    if now - path.stat().st_mtime > 3600:
+                        path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def report(self):
+        if self.hits or self.misses:
+            print(f"[llm-cache] {self.hits} hit(s), {self.misses} miss(es) in {self.directory}")
+
+
+@functools.cache
+def _langchain_cache_class():
+    """DiskLLMCache as a LangChain BaseCache (what chat models accept as cache=...)"""
+    from langchain_core.caches import BaseCache
+
+    class LangChainDiskLLMCache(DiskLLMCache, BaseCache):
+        pass
+
+    return LangChainDiskLLMCache
+
+
+def open_llm_cache(args, model, base_url=None):
+    """DiskLLMCache for an agent run, or None if the cache is not enabled.
+
+    Enabled by --llm-cache or LIBE_AGENT_LLM_CACHE=1, bypassed by --no-llm-cache.
+    The hit/miss count is printed at exit.
+    """
+    requested = args.llm_cache or os.environ.get("LIBE_AGENT_LLM_CACHE", "").lower() in ("1", "true", "yes")
+    if args.no_llm_cache or not requested:
+        return None
+    cache = _langchain_cache_class()(namespace=f"{model}|{base_url or ''}")
+    print(f"LLM response cache: {cache.directory}")
+    atexit.register(cache.report)
+    return cache
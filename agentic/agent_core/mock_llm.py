@@ -0,0 +1,218 @@
+"""
+Local mock of the Anthropic and OpenAI chat APIs, for checking prompt caching offline.
+
+Serves POST /v1/messages (Anthropic) and POST /v1/chat/completions (OpenAI)
+and answers every request with a fixed reply (subclasses override respond()
+to script replies and tool calls, e.g. benchmarks/bench_agents.py). It checks
+the requests the way the providers would and reports what they would cache:
+- Anthropic: at most 4 cache_control markers; each marked prefix (tools,
+  system, messages up to the marked block) is cached when first seen and
+  read from the cache when repeated.
+- OpenAI: the longest prefix shared with an earlier request counts as cached
+  (in 128-token steps, from 1024 tokens on).
+Requests still containing prompt_cache.PROMPT_BREAK are rejected. Usage
+(input, cache read/write, output tokens) is returned like the providers
+do, so the agents' trace reports it, and one line per request is printed.
+
+Usage (from agentic/):
+    python -m agent_core.mock_llm --port 8788
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8788 ANTHROPIC_API_KEY=mock LLM_MODEL=claude-mock \\
+        python libe_agent_basic.py --trace ...
+    (OPENAI_BASE_URL=http://127.0.0.1:8788/v1 OPENAI_API_KEY=mock for the OpenAI API)
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .prompt_cache import MAX_BREAKPOINTS, PROMPT_BREAK
+
+CHARS_PER_TOKEN = 4
+OPENAI_MIN_CACHED = 1024
+OPENAI_CACHE_STEP = 128
+
+
+def _tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _reply_tokens(reply, tool_calls):
+    return _tokens(reply + (_canonical(tool_calls) if tool_calls else ""))
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def _without_markers(value):
+    if isinstance(value, list):
+        return [_without_markers(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _without_markers(v) for k, v in value.items() if k != "cache_control"}
+    return value
+
+
+class MockLLM:
+    """Prompt cache state and the request handling of the mock endpoint"""
+
+    def __init__(self, reply="NO CHANGES"):
+        self.reply = reply
+        self.anthropic_cache = set()
+        self.openai_prefixes = []
+        self.lock = threading.Lock()
+
+    def respond(self, body, path):
+        """(reply text, tool calls as {"name", "args"} dicts) for a request to path"""
+        return self.reply, []
+
+    def log(self, line):
+        print(line, flush=True)
+
+    def _anthropic_prefixes(self, body):
+        """(label, text of the prefix) for each cache_control marker, in request order"""
+        blocks = [("tools", t) for t in body.get("tools") or []]
+        system = body.get("system")
+        if isinstance(system, list):
+            blocks += [("system", b) for b in system]
+        elif system:
+            blocks.append(("system", system))
+        for i, msg in enumerate(body.get("messages", [])):
+            content = msg.get("content")
+            if isinstance(content, list):
+                blocks += [(f"message {i} block {k}", {"role": msg["role"], **b}) for k, b in enumerate(content)]
+            else:
+                blocks.append((f"message {i}", {"role": msg["role"], "content": content}))
+        prefixes, seen = [], []
+        for label, block in blocks:
+            seen.append(_without_markers(block))
+            if isinstance(block, dict) and "cache_control" in block:
+                prefixes.append((label, _canonical(seen)))
+        return prefixes, _canonical(seen)
+
+    def anthropic(self, body, path=""):
+        text = _canonical(body)
+        if PROMPT_BREAK in text:
+            return 400, {"type": "error", "error": {"type": "invalid_request_error",
+                                                      "message": "prompt contains PROMPT_BREAK"}}
+        prefixes, whole = self._anthropic_prefixes(body)
+        if len(prefixes) > MAX_BREAKPOINTS:
+            return 400, {"type": "error", "error": {"type": "invalid_request_error",
+                                                      "message": f"{len(prefixes)} cache_control blocks (max {MAX_BREAKPOINTS})"}}
+        read = written = 0
+        with self.lock:
+            for _, prefix in prefixes:
+                key = hashlib.sha256(prefix.encode()).hexdigest()
+                if key in self.anthropic_cache:
+                    read = _tokens(prefix)
+                else:
+                    self.anthropic_cache.add(key)
+            if prefixes:
+                written = max(_tokens(prefixes[-1][1]) - read, 0)
+        total = _tokens(whole)
+        reply, tool_calls = self.respond(body, path)
+        content = [{"type": "text", "text": reply}] if reply else []
+        content += [{"type": "tool_use", "id": f"toolu_mock_{time.time_ns()}_{i}", "name": call["name"],
+                     "input": call["args"]} for i, call in enumerate(tool_calls)]
+        usage = {"input_tokens": max(total - read - written, 0),
+                 "output_tokens": _reply_tokens(reply, tool_calls),
+                 "cache_read_input_tokens": read, "cache_creation_input_tokens": written}
+        markers = ", ".join(label for label, _ in prefixes) or "none"
+        self.log(f"[anthropic] markers: {markers} | cache read {read}, write {written}, "
+                 f"uncached {usage['input_tokens']} tokens")
+        return 200, {
+            "id": f"msg_mock_{time.time_ns()}", "type": "message", "role": "assistant",
+            "model": body.get("model", "mock"), "stop_reason": "tool_use" if tool_calls else "end_turn",
+            "stop_sequence": None, "content": content, "usage": usage,
+        }
+
+    def openai(self, body, path=""):
+        text = _canonical({k: body.get(k) for k in ("tools", "messages")})
+        if PROMPT_BREAK in text:
+            return 400, {"error": {"message": "prompt contains PROMPT_BREAK", "type": "invalid_request_error"}}
+        with self.lock:
+            shared = max((_common_prefix_len(text, p) for p in self.openai_prefixes), default=0)
+            self.openai_prefixes.append(text)
+        cached = shared // CHARS_PER_TOKEN // OPENAI_CACHE_STEP * OPENAI_CACHE_STEP
+        if cached < OPENAI_MIN_CACHED:
+            cached = 0
+        total = _tokens(text)
+        reply, tool_calls = self.respond(body, path)
+        message = {"role": "assistant", "content": reply or None}
+        if tool_calls:
+            message["tool_calls"] = [
+                {"id": f"call_mock_{time.time_ns()}_{i}", "type": "function",
+                 "function": {"name": call["name"], "arguments": json.dumps(call["args"])}}
+                for i, call in enumerate(tool_calls)]
+        completion = _reply_tokens(reply, tool_calls)
+        self.log(f"[openai] prompt {total} tokens, cached {cached}"
+                 f" (prompt_cache_key={body.get('prompt_cache_key')})")
+        return 200, {
+            "id": f"chatcmpl-mock-{time.time_ns()}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "tool_calls" if tool_calls else "stop", "message": message}],
+            "usage": {"prompt_tokens": total, "completion_tokens": completion,
+                      "total_tokens": total + completion,
+                      "prompt_tokens_details": {"cached_tokens": cached}},
+        }
+
+
+def _common_prefix_len(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path.rstrip("/").endswith("/messages"):
+                status, reply = mock.anthropic(body, self.path)
+            elif self.path.rstrip("/").endswith("/chat/completions"):
+                status, reply = mock.openai(body, self.path)
+            else:
+                status, reply = 404, {"error": {"message": f"unknown path {self.path}"}}
+            data = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=8788, reply="NO CHANGES", mock=None):
+    """Start the mock endpoint (mock, else a MockLLM answering reply) in a background thread.
+
+    Returns the server (shutdown() to stop; port 0 picks a free port, see server.server_port).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(mock or MockLLM(reply)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Anthropic/OpenAI endpoint checking prompt-cache markers")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--reply", default="NO CHANGES", help="Text of every reply")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(MockLLM(args.reply)))
+    print(f"Mock LLM endpoint on http://127.0.0.1:{args.port} (Ctrl-C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
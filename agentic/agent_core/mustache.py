@@ -0,0 +1,212 @@
+"""
+Minimal Mustache engine that renders like mustache.js does in mcp_server.mjs.
+
+Supports variables, triple mustaches, sections, inverted sections and
+comments, with mustache.js standalone-line stripping, JavaScript truthiness
+and JavaScript string conversion. HTML escaping is disabled, as in
+mcp_server.mjs (Mustache.escape = text => text).
+
+Templates are compiled once and cached by source text.
+"""
+
+import math
+import re
+
+_CLOSE_TAG = re.compile(r"\s*\}\}")
+_CLOSE_CURLY = re.compile(r"\s*\}\}\}")
+_NON_SPACE = re.compile(r"\S")
+
+_cache = {}
+
+
+def js_truthy(value):
+    """Truthiness of a JSON value as JavaScript sees it"""
+    if value is None or value is False:
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value != 0 and not math.isnan(value)
+    if isinstance(value, str):
+        return value != ""
+    return True
+
+
+def js_str(value):
+    """String(value) for a JSON value"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        if value.is_integer() and abs(value) < 1e21:
+            return str(int(value))
+        return repr(value)
+    if isinstance(value, list):
+        return ",".join(js_str(v) for v in value)
+    if isinstance(value, dict):
+        return "[object Object]"
+    return str(value)
+
+
+def _parse(template):
+    """Tokenize and nest a template (port of mustache.js parseTemplate)"""
+    tokens = []
+    sections = []
+    spaces = []
+    has_tag = False
+    non_space = False
+    pos = 0
+
+    def strip_space():
+        nonlocal spaces, has_tag, non_space
+        if has_tag and not non_space:
+            for index in spaces:
+                tokens[index] = None
+        spaces = []
+        has_tag = False
+        non_space = False
+
+    while pos < len(template):
+        open_at = template.find("{{", pos)
+        text = template[pos:] if open_at == -1 else template[pos:open_at]
+        for ch in text:
+            if _NON_SPACE.match(ch):
+                non_space = True
+            else:
+                spaces.append(len(tokens))
+            tokens.append(("text", ch))
+            if ch == "\n":
+                strip_space()
+        if open_at == -1:
+            break
+
+        start = open_at
+        pos = open_at + 2
+        has_tag = True
+        tag_type = template[pos] if pos < len(template) and template[pos] in "#^/{&!>=" else "name"
+        if tag_type != "name":
+            pos += 1
+        while pos < len(template) and template[pos].isspace():
+            pos += 1
+
+        closing = _CLOSE_CURLY if tag_type == "{" else _CLOSE_TAG
+        match = closing.search(template, pos)
+        if not match:
+            raise ValueError(f"Unclosed tag at {len(template)}")
+        value = template[pos:match.start()]
+        pos = match.end()
+        if tag_type == "{":
+            tag_type = "&"
+        if tag_type in (">", "="):
+            raise ValueError(f"Unsupported tag type '{tag_type}' at {start}")
+
+        tokens.append((tag_type, value))
+        if tag_type in ("#", "^"):
+            sections.append(value)
+        elif tag_type == "/":
+            if not sections:
+                raise ValueError(f'Unopened section "{value}" at {start}')
+            open_name = sections.pop()
+            if open_name != value:
+                raise ValueError(f'Unclosed section "{open_name}" at {start}')
+        elif tag_type in ("name", "&"):
+            non_space = True
+
+    strip_space()
+    if sections:
+        raise ValueError(f'Unclosed section "{sections[-1]}" at {pos}')
+
+    # Squash adjacent text and nest sections
+    root = []
+    stack = [root]
+    for token in tokens:
+        if token is None:
+            continue
+        tag_type, value = token
+        collector = stack[-1]
+        if tag_type == "text":
+            if collector and collector[-1][0] == "text":
+                collector[-1] = ("text", collector[-1][1] + value)
+            else:
+                collector.append(token)
+        elif tag_type in ("#", "^"):
+            children = []
+            collector.append((tag_type, value, children))
+            stack.append(children)
+        elif tag_type == "/":
+            stack.pop()
+        elif tag_type != "!":
+            collector.append(token)
+    return root
+
+
+def _lookup(name, stack):
+    if name == ".":
+        return stack[-1]
+    for view in reversed(stack):
+        if name.find(".") > 0:
+            value = view
+            hit = False
+            for part in name.split("."):
+                hit = isinstance(value, dict) and part in value
+                value = value.get(part) if hit else None
+                if value is None:
+                    break
+            if hit:
+                return value
+        elif isinstance(view, dict) and name in view:
+            return view[name]
+    return None
+
+
+def _render_tokens(tokens, stack, out):
+    for token in tokens:
+        tag_type = token[0]
+        if tag_type == "text":
+            out.append(token[1])
+        elif tag_type in ("name", "&"):
+            out.append(js_str(_lookup(token[1], stack)))
+        elif tag_type == "#":
+            value = _lookup(token[1], stack)
+            if not js_truthy(value):
+                continue
+            if isinstance(value, list):
+                for item in value:
+                    _render_tokens(token[2], stack + [item], out)
+            elif value is True:
+                _render_tokens(token[2], stack, out)
+            else:
+                _render_tokens(token[2], stack + [value], out)
+        elif tag_type == "^":
+            value = _lookup(token[1], stack)
+            if not js_truthy(value) or value == []:
+                _render_tokens(token[2], stack, out)
+
+
+class Template:
+    """A compiled Mustache template"""
+
+    def __init__(self, source):
+        self.source = source
+        self.tokens = _parse(source)
+
+    def render(self, view):
+        out = []
+        _render_tokens(self.tokens, [view], out)
+        return "".join(out)
+
+
+def compile_template(source):
+    """Compile (or fetch from cache) a template"""
+    template = _cache.get(source)
+    if template is None:
+        template = _cache[source] = Template(source)
+    return template
+
+
+def render(source, view):
+    """Render template source with view, like Mustache.render()"""
+    return compile_template(source).render(view)
@@ -0,0 +1,399 @@
+"""
+Patch-based script edits from LLM replies.
+
+Instead of rewriting every file for a one-line fix, the model replies with
+edits and the agent applies them to the current bundle:
+
+- search/replace blocks under a "=== filename ===" header:
+
+      === simf.py ===
+      <<<<<<< SEARCH
+      exact current lines
+      =======
+      new lines
+      >>>>>>> REPLACE
+
+- unified diffs (--- a/simf.py, +++ b/simf.py, @@ hunks)
+- a whole file under a "=== filename ===" header (full replacement)
+
+Edits are applied per file, all or nothing. A SEARCH text that is missing or
+matches more than once, or a hunk whose context is not in the file, is a
+conflict: that file is left unchanged and the model is asked for the complete
+file instead (the full-file fallback). Output tokens are reported for each
+request so the saving over whole-bundle rewrites can be checked.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from .bundle import format_bundle_text, make_file, parse_bundle_text
+
+# Reply format requested in fix/refine prompts
+PATCH_REPLY_FORMAT = """Reply with EDITS ONLY, not whole files. For each file you change, give its header and one or more search/replace blocks:
+
+=== filename.py ===
+<<<<<<< SEARCH
+exact lines from the current file (enough to be unique)
+=======
+replacement lines
+>>>>>>> REPLACE
+
+The SEARCH lines must match the current file exactly, including indentation.
+Leave out files that do not change. A unified diff (--- a/file, +++ b/file, @@ hunks) is also accepted.
+DO NOT merge or consolidate files. DO NOT add explanations."""
+
+# Reply format for whole-bundle rewrites (--full-rewrites)
+FULL_REPLY_FORMAT = """Return ALL scripts in the EXACT SAME FORMAT (=== filename === followed by raw Python code).
+DO NOT merge or consolidate files - keep the same file structure.
+DO NOT wrap in markdown or add explanations."""
+
+# Follow-up prompt when some edits could not be applied
+FULL_FILE_FALLBACK_TEMPLATE = """Some of your edits could not be applied:
+
+{conflicts}
+
+Those files were left unchanged. Here are their current contents:
+
+{scripts_text}
+
+Return the COMPLETE corrected version of each of these files ({filenames}), with all the changes you intended,
+in the format === filename === followed by raw Python code.
+DO NOT wrap in markdown or add explanations."""
+
+# Characters per token for the estimate when the provider reports no usage
+CHARS_PER_TOKEN = 4
+
+_HEADER = re.compile(r"^=== ([\w./-]+\.\w+) ===\s*$")
+_FENCE = re.compile(r"^\s*```[\w+-]*\s*$")
+_SEARCH = re.compile(r"^<{5,9} ?SEARCH\s*$")
+_DIVIDER = re.compile(r"^={5,9}\s*$")
+_REPLACE = re.compile(r"^>{5,9} ?REPLACE\s*$")
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+_KIND_LABELS = {"blocks": "search/replace", "diff": "diff", "full": "full file", "fallback": "full-file fallback"}
+
+
+@dataclass
+class _Hunk:
+    old_start: int
+    old: list = field(default_factory=list)
+    new: list = field(default_factory=list)
+
+
+@dataclass
+class _FileEdit:
+    filename: str
+    kind: str  # "blocks", "diff" or "full"
+    blocks: list = field(default_factory=list)  # (search lines, replace lines)
+    hunks: list = field(default_factory=list)
+    content: str = ""
+    errors: list = field(default_factory=list)
+    new_file: bool = False
+
+
+@dataclass
+class EditResult:
+    bundle: list
+    changed: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)  # (filename, message)
+    kinds: set = field(default_factory=set)
+    output_tokens: int = 0
+    estimated: bool = False
+
+    def conflict_text(self):
+        return "\n".join(f"- {filename}: {message}" for filename, message in self.conflicts)
+
+
+def _diff_filename(line):
+    name = line[4:].split("\t")[0].strip()
+    if name == "/dev/null":
+        return None
+    return name[2:] if name.startswith(("a/", "b/")) else name
+
+
+def _parse_blocks(edit, lines):
+    i = 0
+    while i < len(lines):
+        if not _SEARCH.match(lines[i]):
+            i += 1
+            continue
+        search, replace = [], []
+        i += 1
+        while i < len(lines) and not _DIVIDER.match(lines[i]):
+            search.append(lines[i])
+            i += 1
+        i += 1
+        while i < len(lines) and not _REPLACE.match(lines[i]):
+            replace.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            edit.errors.append("unterminated SEARCH/REPLACE block")
+            return
+        edit.blocks.append((search, replace))
+        i += 1
+
+
+def _parse_hunks(edit, lines):
+    hunk = None
+    for line in lines:
+        match = _HUNK.match(line)
+        if match:
+            hunk = _Hunk(int(match.group(1)))
+            edit.hunks.append(hunk)
+            continue
+        if hunk is None:
+            continue
+        if line.startswith("\\"):  # "\ No newline at end of file"
+            continue
+        if line == "" or line.startswith(" "):
+            hunk.old.append(line[1:])
+            hunk.new.append(line[1:])
+        elif line.startswith("-"):
+            hunk.old.append(line[1:])
+        elif line.startswith("+"):
+            hunk.new.append(line[1:])
+        else:
+            hunk = None  # Prose or a fence after the hunk
+    for hunk in edit.hunks:
+        # Blank lines between a hunk and the next section are not context
+        while hunk.old and hunk.new and hunk.old[-1] == hunk.new[-1] == "":
+            hunk.old.pop()
+            hunk.new.pop()
+
+
+def parse_reply(text):
+    """Parse an LLM reply into a list of _FileEdits (in reply order)"""
+    sections = []  # [filename, is_diff, lines, new_file]
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        header = _HEADER.match(line)
+        if header:
+            sections.append([header.group(1), False, [], False])
+        elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_name, new_name = _diff_filename(line), _diff_filename(lines[i + 1])
+            name = new_name or old_name
+            if sections and not sections[-1][2] and sections[-1][0] == name:
+                sections[-1][1] = True  # Diff under a matching === header
+                sections[-1][3] = old_name is None
+            else:
+                sections.append([name, True, [], old_name is None])
+                if new_name is None:
+                    sections[-1][2].append("<deleted>")
+            i += 2
+            continue
+        elif sections:
+            sections[-1][2].append(line)
+        i += 1
+
+    edits = []
+    for filename, is_diff, body, new_file in sections:
+        if is_diff and body[:1] == ["<deleted>"]:
+            edit = _FileEdit(filename, "diff")
+            edit.errors.append("deleting files is not supported")
+        elif any(_SEARCH.match(line) for line in body):
+            edit = _FileEdit(filename, "blocks")
+            _parse_blocks(edit, body)
+        elif is_diff or any(_HUNK.match(line) for line in body):
+            edit = _FileEdit(filename, "diff", new_file=new_file)
+            _parse_hunks(edit, body)
+            if not edit.hunks:
+                edit.errors.append("diff has no @@ hunks")
+        else:
+            content = "\n".join(line for line in body if not _FENCE.match(line)).strip()
+            if not content:
+                continue
+            edit = _FileEdit(filename, "full", content=content + "\n")
+        edits.append(edit)
+    return edits
+
+
+def _find(lines, target, hint=0):
+    """Start indexes of target in lines: exact, else ignoring trailing whitespace.
+
+    Returns matches sorted by distance from hint.
+    """
+    n = len(target)
+    for normalize in (lambda s: s, str.rstrip):
+        wanted = [normalize(t) for t in target]
+        found = [i for i in range(len(lines) - n + 1)
+                 if [normalize(s) for s in lines[i:i + n]] == wanted]
+        if found:
+            return sorted(found, key=lambda i: abs(i - hint))
+    return []
+
+
+def _apply_blocks(content, blocks):
+    lines = content.splitlines()
+    for number, (search, replace) in enumerate(blocks, 1):
+        if not any(s.strip() for s in search):
+            raise ValueError(f"block {number}: empty SEARCH text")
+        found = _find(lines, search)
+        if not found:
+            raise ValueError(f"block {number}: SEARCH text not found:\n{_preview(search)}")
+        if len(found) > 1:
+            raise ValueError(f"block {number}: SEARCH text is ambiguous ({len(found)} matches), "
+                             f"include more surrounding lines:\n{_preview(search)}")
+        start = found[0]
+        lines[start:start + len(search)] = replace
+    return "\n".join(lines) + "\n"
+
+
+def _apply_hunks(content, hunks):
+    lines = content.splitlines()
+    offset = 0  # Line shift from earlier hunks
+    floor = 0   # Earliest position for the next hunk
+    for number, hunk in enumerate(hunks, 1):
+        if not hunk.old:
+            position = min(max(hunk.old_start + offset, floor), len(lines))  # Pure insertion
+        else:
+            hint = hunk.old_start - 1 + offset
+            found = [i for i in _find(lines, hunk.old, hint) if i >= floor]
+            if not found:
+                raise ValueError(f"hunk {number} (@@ -{hunk.old_start}): context does not match the file:\n"
+                                 f"{_preview(hunk.old)}")
+            position = found[0]
+        lines[position:position + len(hunk.old)] = hunk.new
+        floor = position + len(hunk.new)
+        offset = position - (hunk.old_start - 1) + len(hunk.new) - len(hunk.old)
+    return "\n".join(lines) + "\n"
+
+
+def _preview(lines, limit=5):
+    shown = [f"    {line}" for line in lines[:limit]]
+    if len(lines) > limit:
+        shown.append(f"    ... ({len(lines) - limit} more lines)")
+    return "\n".join(shown)
+
+
+def apply_reply(bundle, text):
+    """Apply the edits in an LLM reply to bundle. Returns an EditResult.
+
+    Files with a conflict are left unchanged and listed in result.conflicts.
+    """
+    files = {entry["filename"]: entry for entry in bundle}
+    order = [entry["filename"] for entry in bundle]
+    result = EditResult(bundle)
+    for edit in parse_reply(text):
+        current = files.get(edit.filename)
+        try:
+            if edit.errors:
+                raise ValueError("; ".join(edit.errors))
+            if edit.kind == "full":
+                content = edit.content
+            elif current is None and not (edit.kind == "diff" and edit.new_file):
+                raise ValueError("file is not in the current scripts")
+            elif edit.kind == "blocks":
+                content = _apply_blocks(current["content"], edit.blocks)
+            else:
+                content = _apply_hunks(current["content"] if current else "", edit.hunks)
+        except ValueError as e:
+            result.conflicts.append((edit.filename, str(e)))
+            continue
+        if current is not None and content == current["content"]:
+            continue
+        if edit.filename not in files:
+            order.append(edit.filename)
+        files[edit.filename] = make_file(edit.filename, content)
+        result.kinds.add(edit.kind)
+        if edit.filename not in result.changed:
+            result.changed.append(edit.filename)
+    result.bundle = [files[name] for name in order]
+    return result
+
+
+def merge_full_files(reply, text):
+    """Merge the complete files of a full-file fallback reply into an EditResult (in place). Returns it.
+
+    The conflicts of the files the reply contains are resolved; the others stay in reply.conflicts.
+    """
+    by_name = {entry["filename"]: entry for entry in reply.bundle}
+    order = [entry["filename"] for entry in reply.bundle]
+    returned = set()
+    for entry in parse_bundle_text(text):
+        returned.add(entry["filename"])
+        if entry["filename"] not in by_name:
+            order.append(entry["filename"])
+        elif entry["content"] == by_name[entry["filename"]]["content"]:
+            continue
+        by_name[entry["filename"]] = entry
+        reply.kinds.add("fallback")
+        if entry["filename"] not in reply.changed:
+            reply.changed.append(entry["filename"])
+    reply.bundle = [by_name[name] for name in order]
+    reply.conflicts = [(name, message) for name, message in reply.conflicts if name not in returned]
+    return reply
+
+
+def output_tokens(messages):
+    """Output tokens of the AI messages. Returns (tokens, estimated).
+
+    Uses the provider's usage_metadata; without it the count is estimated
+    from the reply length.
+    """
+    tokens = 0
+    estimated = False
+    for message in messages:
+        if getattr(message, "type", "") != "ai":
+            continue
+        usage = getattr(message, "usage_metadata", None) or {}
+        if usage.get("output_tokens") is not None:
+            tokens += usage["output_tokens"]
+        else:
+            content = message.content if isinstance(message.content, str) else str(message.content)
+            tokens += len(content) // CHARS_PER_TOKEN
+            estimated = True
+    return tokens, estimated
+
+
+def _format_tokens(tokens, estimated):
+    return f"~{tokens:,}" if estimated else f"{tokens:,}"
+
+
+async def request_edits(agent, bundle, prompt, print_prompt=None):
+    """Send prompt to agent and apply the edits in its reply to bundle.
+
+    Conflicted files are requested again as complete files (one follow-up);
+    those it leaves out stay in the result's conflicts. Prints the files
+    changed and the output tokens used. Returns an EditResult.
+    """
+    result = await agent.ainvoke({"messages": [("user", prompt)]})
+    messages = result["messages"]
+    reply = apply_reply(bundle, messages[-1].content)
+    reply.output_tokens, reply.estimated = output_tokens(messages[1:])
+    counts = [_format_tokens(reply.output_tokens, reply.estimated)]
+
+    if reply.conflicts:
+        print(f"✗ {len(reply.conflicts)} edit(s) could not be applied:")
+        print(reply.conflict_text())
+        current = {entry["filename"]: entry for entry in reply.bundle}
+        names = [name for name, _ in reply.conflicts if name in current]
+        fallback_prompt = FULL_FILE_FALLBACK_TEMPLATE.format(
+            conflicts=reply.conflict_text(),
+            scripts_text=format_bundle_text([current[name] for name in dict.fromkeys(names)]),
+            filenames=", ".join(dict.fromkeys(names)) or "the files above",
+        )
+        if print_prompt:
+            print_prompt("Full-File Fallback", fallback_prompt)
+        print("Requesting complete files for the conflicted edits...")
+        followup = await agent.ainvoke({"messages": messages + [("user", fallback_prompt)]})
+        new_messages = followup["messages"][len(messages) + 1:]
+        tokens, estimated = output_tokens(new_messages)
+        counts.append(_format_tokens(tokens, estimated) + " (fallback)")
+        reply.output_tokens += tokens
+        reply.estimated = reply.estimated or estimated
+
+        merge_full_files(reply, new_messages[-1].content if new_messages else "")
+        if reply.conflicts:
+            missing = ", ".join(dict.fromkeys(name for name, _ in reply.conflicts))
+            print(f"✗ The fallback did not return {missing} - those edits were dropped")
+
+    if reply.changed:
+        kinds = ", ".join(_KIND_LABELS[kind] for kind in sorted(reply.kinds))
+        print(f"Edited: {', '.join(reply.changed)} ({kinds})")
+    total = " + ".join(counts)
+    if len(counts) > 1:
+        total += f" = {_format_tokens(reply.output_tokens, reply.estimated)}"
+    print(f"Output tokens this iteration: {total}")
+    return reply
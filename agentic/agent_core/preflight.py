@@ -0,0 +1,282 @@
+"""
+Static pre-flight checks for a script bundle, run before launching it.
+
+Catches in milliseconds what would otherwise only show up after libEnsemble,
+MPI and the application have started:
+- syntax errors (every file is compiled)
+- imports between bundle files (`from simf import run_f`) naming things the
+  other file does not define
+- undefined names (e.g. `set_objectiveZIP_value()`, `applenp.loadtxt`)
+- attributes that do not exist on bundle modules or known modules
+  (the standard library and numpy), e.g. `np.loadtxtt`
+- imported modules that cannot be found (reported as warnings)
+
+Usage (from agentic/):
+    python -m agent_core.preflight generated_scripts/
+"""
+
+import ast
+import builtins
+import difflib
+import importlib
+import importlib.util
+import symtable
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+# Third-party modules that are safe and cheap enough to import for attribute checks
+EXTRA_KNOWN_MODULES = ("numpy",)
+
+# Standard library modules never imported for checks (side effects on import)
+_UNSAFE_MODULES = {"antigravity", "this", "idlelib", "tkinter", "turtle", "turtledemo"}
+
+_MODULE_DUNDERS = {
+    "__name__", "__file__", "__doc__", "__spec__", "__loader__", "__package__",
+    "__builtins__", "__cached__", "__annotations__", "__path__", "__dict__",
+}
+
+
+@dataclass
+class Diagnostic:
+    filename: str
+    line: int
+    message: str
+    severity: str = "error"
+
+    def __str__(self):
+        return f"{self.filename}:{self.line}: {self.severity}: {self.message}"
+
+
+def _suggest(name, candidates):
+    match = difflib.get_close_matches(name, candidates, n=1, cutoff=0.75)
+    return f" (did you mean '{match[0]}'?)" if match else ""
+
+
+def _walk_tables(table):
+    yield table
+    for child in table.get_children():
+        yield from _walk_tables(child)
+
+
+class _ModuleInfo:
+    """Parsed bundle file: its top-level names and global lookups"""
+
+    def __init__(self, filename, source):
+        self.filename = filename
+        self.name = Path(filename).stem
+        self.tree = ast.parse(source, filename)
+        top = symtable.symtable(source, filename, "exec")
+        self.defined = {s.get_name() for s in top.get_symbols() if s.is_assigned() or s.is_imported()}
+        self.global_refs = set()
+        for table in _walk_tables(top):
+            is_module = table.get_type() == "module"
+            for sym in table.get_symbols():
+                if is_module:
+                    if sym.is_referenced() and not (sym.is_assigned() or sym.is_imported()):
+                        self.global_refs.add(sym.get_name())
+                else:
+                    if sym.is_declared_global() and sym.is_assigned():
+                        self.defined.add(sym.get_name())
+                    elif sym.is_referenced() and sym.is_global():
+                        self.global_refs.add(sym.get_name())
+        self.star_imports = [
+            node for node in ast.walk(self.tree)
+            if isinstance(node, ast.ImportFrom) and any(a.name == "*" for a in node.names)
+        ]
+
+
+class _Checker:
+    def __init__(self, bundle_modules, known_modules):
+        self.bundle = bundle_modules
+        self.known = known_modules
+        self.diagnostics = []
+        self._module_cache = {}
+        self._reported_missing = set()
+
+    def add(self, info, node, message, severity="error"):
+        self.diagnostics.append(Diagnostic(info.filename, getattr(node, "lineno", 0), message, severity))
+
+    def _is_known(self, module_name):
+        top = module_name.split(".")[0]
+        if top in _UNSAFE_MODULES:
+            return False
+        return top in sys.stdlib_module_names or top in self.known
+
+    def _external_module(self, module_name):
+        """Imported module for attribute checks, or None if not checkable"""
+        if module_name in self._module_cache:
+            return self._module_cache[module_name]
+        module = None
+        if self._is_known(module_name):
+            try:
+                module = importlib.import_module(module_name)
+            except Exception:
+                module = None
+        self._module_cache[module_name] = module
+        return module
+
+    def _has_attr(self, module_name, attr):
+        """True/False if known, None if the module cannot be checked"""
+        if module_name in self.bundle:
+            return attr in self.bundle[module_name].defined
+        module = self._external_module(module_name)
+        if module is None:
+            return None
+        if hasattr(module, attr):
+            return True
+        if hasattr(module, "__path__"):  # Package: attr may be a not yet imported submodule
+            try:
+                return importlib.util.find_spec(f"{module_name}.{attr}") is not None
+            except (ImportError, ValueError):
+                return False
+        return False
+
+    def _attr_candidates(self, module_name):
+        if module_name in self.bundle:
+            return sorted(self.bundle[module_name].defined)
+        module = self._external_module(module_name)
+        return dir(module) if module else []
+
+    def _check_findable(self, info, node, module_name):
+        top = module_name.split(".")[0]
+        if top in self.bundle or top in sys.modules or (info.filename, top) in self._reported_missing:
+            return
+        self._reported_missing.add((info.filename, top))
+        try:
+            found = importlib.util.find_spec(top) is not None
+        except (ImportError, ValueError):
+            found = False
+        if not found:
+            self.add(info, node, f"module '{top}' not found in this Python environment", "warning")
+
+    def check_imports(self, info):
+        """Returns local alias -> module name for `import x [as y]`"""
+        aliases = {}
+        for node in ast.walk(info.tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    self._check_findable(info, node, alias.name)
+                    if alias.asname:
+                        aliases[alias.asname] = alias.name
+                    else:
+                        top = alias.name.split(".")[0]
+                        aliases[top] = top
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                self._check_findable(info, node, node.module)
+                for alias in node.names:
+                    if alias.name == "*":
+                        continue
+                    found = self._has_attr(node.module, alias.name)
+                    if found is False:
+                        where = f" ({node.module}.py)" if node.module in self.bundle else ""
+                        self.add(info, node,
+                                 f"cannot import name '{alias.name}' from '{node.module}'{where}"
+                                 + _suggest(alias.name, self._attr_candidates(node.module)))
+        return aliases
+
+    def check_names(self, info):
+        defined = set(info.defined)
+        for node in info.star_imports:
+            if node.module in self.bundle:
+                defined |= {n for n in self.bundle[node.module].defined if not n.startswith("_")}
+            else:
+                return  # Names from an external star import are unknown
+        undefined = info.global_refs - defined - set(dir(builtins)) - _MODULE_DUNDERS
+        if not undefined:
+            return
+        candidates = sorted(defined | set(dir(builtins)))
+        reported = set()
+        for node in ast.walk(info.tree):
+            if isinstance(node, ast.Name) and node.id in undefined and node.id not in reported:
+                reported.add(node.id)
+                self.add(info, node, f"undefined name '{node.id}'" + _suggest(node.id, candidates))
+
+    def check_attributes(self, info, aliases):
+        for node in ast.walk(info.tree):
+            if not (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)):
+                continue
+            module_name = aliases.get(node.value.id)
+            if not module_name:
+                continue
+            if self._has_attr(module_name, node.attr) is False:
+                shown = f"'{module_name}'"
+                if module_name != node.value.id:
+                    shown += f" (as '{node.value.id}')"
+                self.add(info, node, f"module {shown} has no attribute '{node.attr}'"
+                         + _suggest(node.attr, self._attr_candidates(module_name)))
+
+
+def check_bundle(bundle, known_modules=EXTRA_KNOWN_MODULES):
+    """Check a bundle ({"filename", "content"} dicts). Returns a list of Diagnostics."""
+    diagnostics = []
+    modules = {}
+    for entry in bundle:
+        filename = entry["filename"]
+        if not filename.endswith(".py"):
+            continue
+        try:
+            compile(entry["content"], filename, "exec", dont_inherit=True)
+            info = _ModuleInfo(filename, entry["content"])
+        except SyntaxError as e:
+            diagnostics.append(Diagnostic(filename, e.lineno or 0, f"SyntaxError: {e.msg}"))
+            continue
+        modules[info.name] = info
+
+    checker = _Checker(modules, set(known_modules))
+    for info in modules.values():
+        aliases = checker.check_imports(info)
+        checker.check_names(info)
+        checker.check_attributes(info, aliases)
+    diagnostics.extend(checker.diagnostics)
+    diagnostics.sort(key=lambda d: (d.severity != "error", d.filename, d.line))
+    return diagnostics
+
+
+def check_directory(directory, pattern="*.py", known_modules=EXTRA_KNOWN_MODULES):
+    bundle = [{"filename": p.name, "content": p.read_text()} for p in sorted(Path(directory).glob(pattern))]
+    return check_bundle(bundle, known_modules)
+
+
+def errors(diagnostics):
+    return [d for d in diagnostics if d.severity == "error"]
+
+
+def format_report(diagnostics):
+    """Pre-flight report for the fix prompt (empty string if there are no errors)"""
+    found = errors(diagnostics)
+    if not found:
+        return ""
+    lines = ["Pre-flight check failed (scripts were not run):"]
+    lines += [f"  {d}" for d in diagnostics]
+    return "\n".join(lines)
+
+
+def preflight(directory):
+    """Check the scripts in directory and print a summary. Returns (ok, report)."""
+    start = time.perf_counter()
+    diagnostics = check_directory(directory)
+    elapsed = (time.perf_counter() - start) * 1000
+    found = errors(diagnostics)
+    for d in diagnostics:
+        print(f"  {d}")
+    if found:
+        print(f"✗ Pre-flight: {len(found)} error(s) in {elapsed:.0f} ms, skipping run")
+        return False, format_report(diagnostics)
+    print(f"✓ Pre-flight passed in {elapsed:.0f} ms")
+    return True, ""
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Static pre-flight check of a script directory")
+    parser.add_argument("directory", help="Directory containing the scripts")
+    args = parser.parse_args()
+    ok, _ = preflight(args.directory)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
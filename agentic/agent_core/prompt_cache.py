@@ -0,0 +1,186 @@
+"""
+Provider prompt caching for the agents' chat models.
+
+Most of every request is the same as the one before: the tool schemas (with
+the generator's enums), the system prompt, the scripts, and in a chat the
+whole earlier conversation. Providers can reuse the work for a repeated
+prefix, which cuts time-to-first-token and input cost, if the stable parts
+come first:
+
+- Anthropic caches up to 4 marked prefixes (cache_control). Requests get a
+  marker on the last tool schema, on the system prompt, on the latest
+  message of a multi-message conversation, and at the PROMPT_BREAK of the
+  latest prompt that has one.
+- OpenAI caches repeated prefixes (of 1024+ tokens) automatically; requests
+  to api.openai.com also get a prompt_cache_key so they are routed alike.
+
+Prompt templates put their stable part (instructions, reply format, scripts)
+first and the part that changes (the error) after PROMPT_BREAK, an invisible
+character that is removed before the request is sent.
+
+prompt_cache_middleware() is the agent middleware (langchain.agents) that
+does this on the messages, system message and tools of each model call;
+openai_model_kwargs() has the prompt_cache_key for ChatOpenAI(model_kwargs=...).
+Cache hits and writes show up in the trace (--trace). Set
+LIBE_AGENT_PROMPT_CACHE=0 to send requests unmarked. mock_llm serves a local
+endpoint that checks the markers.
+"""
+
+import os
+
+# Separates the stable (cacheable) part of a prompt from the part that changes
+PROMPT_BREAK = "\u2063"  # INVISIBLE SEPARATOR
+
+# Most cache_control markers Anthropic accepts in one request
+MAX_BREAKPOINTS = 4
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+OPENAI_CACHE_KEY = "libe-agent"
+
+
+def enabled():
+    return os.environ.get("LIBE_AGENT_PROMPT_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def _split_blocks(content):
+    """content as text blocks, split at PROMPT_BREAK. Returns (blocks, index of the last stable block or None)."""
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    blocks, stable = [], None
+    for block in content:
+        if not (isinstance(block, dict) and block.get("type") == "text" and PROMPT_BREAK in block["text"]):
+            blocks.append(block)
+            continue
+        parts = block["text"].split(PROMPT_BREAK)
+        for k, part in enumerate(parts):
+            if not part:
+                continue
+            blocks.append({**block, "text": part} if k == len(parts) - 1 else {"type": "text", "text": part})
+            if k < len(parts) - 1:
+                stable = len(blocks) - 1
+    return blocks, stable
+
+
+def _has_marker(content):
+    return isinstance(content, list) and any(isinstance(b, dict) and "cache_control" in b for b in content)
+
+
+def _count_markers(system_message, messages, tools):
+    count = sum("cache_control" in (getattr(t, "extras", None) or {}) for t in tools or [])
+    for msg in ([system_message] if system_message else []) + list(messages):
+        if isinstance(msg.content, list):
+            count += sum(isinstance(b, dict) and "cache_control" in b for b in msg.content)
+    return count
+
+
+def _mark_block(message, index=-1):
+    """Copy of message with cache_control on its content block index. None if that block can't take one."""
+    content = message.content
+    if isinstance(content, str):
+        if not content:
+            return None
+        content = [{"type": "text", "text": content}]
+    if not content or not isinstance(content[index], dict) or "cache_control" in content[index]:
+        return None
+    content = list(content)
+    content[index] = {**content[index], "cache_control": dict(CACHE_CONTROL)}
+    return message.model_copy(update={"content": content})
+
+
+def _strip_break(value):
+    if isinstance(value, str):
+        return value.replace(PROMPT_BREAK, "")
+    if isinstance(value, list):
+        return [_strip_break(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _strip_break(v) for k, v in value.items()}
+    return value
+
+
+def _without_break(message):
+    if message is None or PROMPT_BREAK not in str(message.content):
+        return message
+    return message.model_copy(update={"content": _strip_break(message.content)})
+
+
+def mark_anthropic_request(system_message, messages, tools):
+    """Split the messages at PROMPT_BREAK and add cache_control markers for Anthropic.
+
+    Takes and returns (system_message, messages, tools) as LangChain objects; the inputs are not modified.
+    """
+    system_message, messages = _without_break(system_message), list(messages)
+    latest_break = None
+    for i, msg in enumerate(messages):
+        content = msg.content
+        if isinstance(content, str) and PROMPT_BREAK not in content:
+            continue
+        blocks, stable = _split_blocks(content)
+        messages[i] = msg.model_copy(update={"content": blocks})
+        if stable is not None:
+            latest_break = (i, stable)
+    if not enabled():
+        return system_message, messages, tools
+
+    budget = MAX_BREAKPOINTS - _count_markers(system_message, messages, tools)
+    last_tool = tools[-1] if tools else None
+    if budget > 0 and hasattr(last_tool, "extras") and "cache_control" not in (last_tool.extras or {}):
+        extras = {**(last_tool.extras or {}), "cache_control": dict(CACHE_CONTROL)}
+        tools = [*tools[:-1], last_tool.model_copy(update={"extras": extras})]
+        budget -= 1
+    if budget > 0 and system_message is not None and not _has_marker(system_message.content):
+        marked = _mark_block(system_message)
+        if marked is not None:
+            system_message, budget = marked, budget - 1
+    targets = []
+    if len(messages) > 1:
+        targets.append((len(messages) - 1, -1))
+    if latest_break:
+        targets.append(latest_break)
+    for i, index in targets:
+        if budget <= 0:
+            break
+        marked = _mark_block(messages[i], index)
+        if marked is not None:
+            messages[i], budget = marked, budget - 1
+    return system_message, messages, tools
+
+
+def strip_prompt_breaks(system_message, messages):
+    """(system_message, messages) without PROMPT_BREAK, for providers that cache prefixes unmarked"""
+    return _without_break(system_message), [_without_break(m) for m in messages]
+
+
+def openai_model_kwargs(base_url=None):
+    """ChatOpenAI model_kwargs routing requests to api.openai.com alike (prompt_cache_key)"""
+    if enabled() and (not base_url or "api.openai.com" in base_url):
+        return {"prompt_cache_key": OPENAI_CACHE_KEY}
+    return {}
+
+
+_middleware = None
+
+
+def prompt_cache_middleware():
+    """Agent middleware preparing each model call for prompt caching (see above); langchain imported on first use"""
+    global _middleware
+    if _middleware is None:
+        from langchain.agents.middleware import AgentMiddleware
+
+        class PromptCacheMiddleware(AgentMiddleware):
+            def prepare(self, request):
+                if "Anthropic" in type(request.model).__name__:
+                    system_message, messages, tools = mark_anthropic_request(
+                        request.system_message, request.messages, request.tools)
+                    return request.override(system_message=system_message, messages=messages, tools=tools)
+                system_message, messages = strip_prompt_breaks(request.system_message, request.messages)
+                return request.override(system_message=system_message, messages=messages)
+
+            def wrap_model_call(self, request, handler):
+                return handler(self.prepare(request))
+
+            async def awrap_model_call(self, request, handler):
+                return await handler(self.prepare(request))
+
+        _middleware = PromptCacheMiddleware()
+    return _middleware
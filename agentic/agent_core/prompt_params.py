@@ -0,0 +1,454 @@
+"""
+Requested parameters from a structured prompt, compared with rendered scripts.
+
+Prompts in the DEFAULT_PROMPT bullet style state their parameters directly:
+
+    Create six_hump_camel APOSMM scripts:
+    - Executable: /path/to/six_hump_camel.x
+    - Input: /path/to/input.txt
+    - Template vars: X0, X1
+    - 4 workers, 100 sims.
+    - The output file for each simulation is output.txt
+    - The bounds should be 0,1 and -1,2 for X0 and X1 respectively
+
+parse_prompt reads these lines; lines it does not recognise are kept in
+`unparsed`. Bounds are read as (lower, upper) pairs; lines giving them per
+side (lower/upper, lb/ub) or with a lower bound above the upper one are left
+unparsed, for the LLM. script_values reads the same parameters from the rendered
+scripts with ast, and compare_parameters lists the ones that differ, so the
+refinement pass can be skipped (or limited to those fields) without asking
+the model.
+
+For a fully parsed prompt, prompt_to_arguments maps the parameters straight
+to CreateLibEnsembleScripts arguments (generator enums included), and
+render_from_prompt renders them without an LLM tool call. The renderer has
+no bounds argument, so set_bounds writes lb/ub into the rendered gen_specs.
+"""
+
+import ast
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .bundle import bundle_from_tool_result, make_file
+from .config_extract import find_imports, find_specs, parse_scripts, user_value
+from .renderer import SCRIPT_CREATOR_ROOT, TOOL_NAME
+
+# Fields compared between prompt and scripts, in display order
+FIELDS = ("generator", "sim_app", "input_path", "template_vars", "num_workers", "sim_max", "lb", "ub",
+          "output_file")
+
+_NUMBER = r"(?<![\w.])[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+_HEADER = re.compile(r"^(?:please\s+)?(?:create|generate|make|write)\s+(?:an?\s+)?(?P<app>[\w.-]+)\s+"
+                     r"(?P<gen>[\w.-]+)\s+(?:libensemble\s+)?scripts?\b\s*:?\s*$", re.I)
+_KEY_VALUE = re.compile(r"^(?P<key>[A-Za-z][\w /-]*?)\s*:\s*(?P<value>.+?)\s*$")
+_WORKERS = re.compile(r"(\d+)\s+workers?\b", re.I)
+_SIMS = re.compile(r"(\d+)\s+(?:sims?|simulations?|evaluations?|evals?)\b", re.I)
+_OUTPUT = re.compile(r"\boutput\s+file\b.*?\b(?:is|:)\s*[\"'`]?(?P<name>[^\s\"'`]+?)[\"'`]?\.?\s*$", re.I)
+_BOUNDS = re.compile(r"\bbounds?\b", re.I)
+# Bounds given per side ("lower bounds ...", "lb=[...]") are not (lo, hi) pairs: left to the LLM
+_BOUND_SIDES = re.compile(r"\b(?:lb|ub|lower|upper|min(?:imum)?|max(?:imum)?)\b", re.I)
+_PAIR = re.compile(rf"\[?\s*({_NUMBER})\s*,\s*({_NUMBER})\s*\]?")
+
+_KEYS = {
+    "sim_app": ("executable", "sim app", "sim_app", "application", "app", "binary"),
+    "input_path": ("input", "input file", "input path", "input dir", "input directory"),
+    "template_vars": ("template vars", "template variables", "template var", "templated vars"),
+    "num_workers": ("workers", "num workers", "num_workers", "nworkers"),
+    "sim_max": ("sims", "sim max", "sim_max", "max sims", "max_sims", "simulations"),
+    "output_file": ("output", "output file", "output_file", "output file name"),
+}
+
+
+@dataclass
+class PromptParams:
+    values: dict = field(default_factory=dict)
+    unparsed: list = field(default_factory=list)
+
+    @property
+    def complete(self):
+        """True if every line of the prompt was understood"""
+        return bool(self.values) and not self.unparsed
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and "." not in text and "e" not in text.lower() else value
+
+
+def _parse_line(line, values):
+    """Add the parameters in one prompt line to values. Returns False if the line was not understood."""
+    header = _HEADER.match(line)
+    if header:
+        values["app_ref"] = header.group("app")
+        values["generator"] = header.group("gen")
+        return True
+
+    key_value = _KEY_VALUE.match(line)
+    if key_value:
+        key = key_value.group("key").strip().lower()
+        value = key_value.group("value").strip().strip("\"'`").rstrip(".")
+        for name, keys in _KEYS.items():
+            if key in keys:
+                if name == "template_vars":
+                    values[name] = [v for v in re.split(r"[,\s]+", value) if v]
+                elif name in ("num_workers", "sim_max"):
+                    if not value.isdigit():
+                        return False
+                    values[name] = int(value)
+                else:
+                    values[name] = value
+                return True
+
+    found = False
+    workers = _WORKERS.search(line)
+    if workers:
+        values["num_workers"] = int(workers.group(1))
+        found = True
+    sims = _SIMS.search(line)
+    if sims:
+        values["sim_max"] = int(sims.group(1))
+        found = True
+    if found:
+        leftover = _SIMS.sub("", _WORKERS.sub("", line))
+        return not re.sub(r"[\s,.;]|\band\b|\bwith\b|\buse\b", "", leftover, flags=re.I)
+
+    output = _OUTPUT.search(line)
+    if output:
+        values["output_file"] = output.group("name")
+        return True
+
+    if _BOUNDS.search(line):
+        if _BOUND_SIDES.search(line):
+            return False
+        pairs = [(_number(lo), _number(hi)) for lo, hi in _PAIR.findall(line[_BOUNDS.search(line).end():])]
+        if not pairs or any(lo > hi for lo, hi in pairs):
+            return False
+        values["lb"] = [lo for lo, _ in pairs]
+        values["ub"] = [hi for _, hi in pairs]
+        return True
+    return False
+
+
+def bounds_in_order(values):
+    """False if values has lb/ub of different lengths or a lower bound above its upper bound"""
+    if "lb" not in values and "ub" not in values:
+        return True
+    lb, ub = values.get("lb") or [], values.get("ub") or []
+    return len(lb) == len(ub) and all(lo <= hi for lo, hi in zip(lb, ub))
+
+
+def parse_prompt(text):
+    """PromptParams from a bullet-style prompt"""
+    params = PromptParams()
+    for raw in text.splitlines():
+        line = _BULLET.sub("", raw).strip()
+        if not line:
+            continue
+        if not _parse_line(line, params.values):
+            params.unparsed.append(raw.strip())
+    return params
+
+
+# ── Values in the rendered scripts ───────────────────────────
+
+def _literal(node):
+    """Python value of a literal (np.array([...]) gives its list), or None"""
+    if isinstance(node, ast.Call) and node.args and getattr(node.func, "attr", getattr(node.func, "id", "")) in (
+            "array", "asarray"):
+        node = node.args[0]
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _string_assignments(script, names):
+    """name -> (value, line) for `name = "..."` assignments"""
+    found = {}
+    for node in ast.walk(script.tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id in names and isinstance(node.value, ast.Constant)):
+            found.setdefault(node.targets[0].id, (node.value.value, node.lineno))
+    return found
+
+
+def _output_file(scripts):
+    """(file name, script filename, line) of the file read in set_objective_value()"""
+    for script in scripts:
+        for func in script.tree.body:
+            if not (isinstance(func, ast.FunctionDef) and func.name in ("set_objective_value", "set_objective")):
+                continue
+            for node in ast.walk(func):
+                if (isinstance(node, ast.Call) and node.args and isinstance(node.args[0], ast.Constant)
+                        and isinstance(node.args[0].value, str)
+                        and getattr(node.func, "attr", getattr(node.func, "id", "")) in (
+                            "loadtxt", "genfromtxt", "open", "read_csv", "load")):
+                    return node.args[0].value, script.filename, node.lineno
+    return None
+
+
+def script_values(bundle):
+    """field -> (value, filename, line) for the FIELDS found in the scripts"""
+    scripts = parse_scripts(bundle)
+    specs = find_specs(scripts)
+    values = {}
+
+    gen = specs.get("GenSpecs")
+    if gen is not None:
+        gen_f = gen.get("gen_f")
+        imports = find_imports(scripts)
+        if isinstance(gen_f, ast.Name) and gen_f.id in imports:
+            module, name, filename, line = imports[gen_f.id]
+            values["generator"] = (f"{module}.{name}", filename, line)
+        for key in ("lb", "ub"):
+            node = user_value(gen, key)
+            if node is not None:
+                values[key] = (_literal(node), gen.filename, node.lineno)
+
+    sim = specs.get("SimSpecs")
+    node = user_value(sim, "input_names")
+    if node is not None:
+        values["template_vars"] = (_literal(node), sim.filename, node.lineno)
+
+    exit_criteria = specs.get("ExitCriteria")
+    node = exit_criteria.get("sim_max") if exit_criteria else None
+    if node is not None:
+        values["sim_max"] = (_literal(node), exit_criteria.filename, node.lineno)
+
+    for script in scripts:
+        strings = _string_assignments(script, ("sim_app", "input_file", "sim_input_dir"))
+        if "sim_app" in strings:
+            values.setdefault("sim_app", (strings["sim_app"][0], script.filename, strings["sim_app"][1]))
+        for name in ("input_file", "sim_input_dir"):
+            if name in strings:
+                values.setdefault("input_path", (strings[name][0], script.filename, strings[name][1]))
+        for node in ast.walk(script.tree):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                    and node.targets[0].id in ("num_workers", "nworkers")
+                    and isinstance(_literal(node.value), int)):
+                values.setdefault("num_workers", (_literal(node.value), script.filename, node.lineno))
+
+    libe = specs.get("LibeSpecs")
+    node = libe.get("nworkers") if libe else None
+    if node is not None and isinstance(_literal(node), int):
+        values.setdefault("num_workers", (_literal(node), libe.filename, node.lineno))
+
+    output = _output_file(scripts)
+    if output:
+        values["output_file"] = output
+    return values
+
+
+# ── Comparison ───────────────────────────────────────────────
+
+def _same(name, requested, found):
+    if name == "generator":
+        return str(requested).lower() in str(found).lower()
+    if name in ("lb", "ub"):
+        try:
+            return len(requested) == len(found) and all(
+                math.isclose(float(a), float(b)) for a, b in zip(requested, found))
+        except (TypeError, ValueError):
+            return False
+    if name == "output_file":
+        return Path(str(requested)).name == Path(str(found)).name
+    if name == "template_vars":
+        return list(requested) == list(found or [])
+    return requested == found
+
+
+@dataclass
+class Difference:
+    name: str
+    requested: object
+    found: object = None
+    filename: str = ""
+    line: int = 0
+
+    def __str__(self):
+        if self.filename:
+            return (f"- {self.name}: requested {self.requested!r}, "
+                    f"scripts have {self.found!r} ({self.filename}:{self.line})")
+        return f"- {self.name}: requested {self.requested!r}, not found in the scripts"
+
+
+def compare_parameters(requested, bundle):
+    """Differences between requested values (parse_prompt(...).values) and the scripts"""
+    found = script_values(bundle)
+    differences = []
+    for name in FIELDS:
+        if name not in requested:
+            continue
+        if name not in found:
+            differences.append(Difference(name, requested[name]))
+            continue
+        value, filename, line = found[name]
+        if not _same(name, requested[name], value):
+            differences.append(Difference(name, requested[name], value, filename, line))
+    return differences
+
+
+# ── Prompt to CreateLibEnsembleScripts arguments ─────────────
+
+# Prompt words for generators whose name does not contain them
+GENERATOR_ALIASES = {
+    "uniform": "persistent_uniform",
+    "sampling": "persistent_uniform",
+    "randomsampling": "persistent_uniform",
+    "gp": "persistent_gpCAM",
+}
+
+
+def _norm(name):
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _generator_modules(input_schema=None):
+    """gen_function -> gen_module from data/generators.json, limited to the schema's enums"""
+    try:
+        generators = json.loads((SCRIPT_CREATOR_ROOT / "data/generators.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    properties = (input_schema or {}).get("properties", {})
+    modules = properties.get("gen_module", {}).get("enum")
+    functions = properties.get("gen_function", {}).get("enum")
+    table = {}
+    for module, info in generators.items():
+        for function in info.get("generators", []):
+            if (modules is None or module in modules) and (functions is None or function in functions):
+                table.setdefault(function, module)
+    return table
+
+
+def match_generator(name, input_schema=None):
+    """(gen_module, gen_function) for a generator named in a prompt, or None if unknown or ambiguous"""
+    table = _generator_modules(input_schema)
+    wanted = _norm(name)
+    wanted = _norm(GENERATOR_ALIASES.get(wanted, wanted))
+
+    def function_forms(function):
+        return {_norm(function), _norm(function.removeprefix("persistent_"))}
+
+    def module_forms(function):
+        module = table[function]
+        return {_norm(module), _norm(module.removeprefix("persistent_"))}
+
+    # Exact function name, then exact module name, then part of a function name
+    for matches in (
+        [f for f in table if wanted in function_forms(f)],
+        [f for f in table if wanted in module_forms(f)],
+        [f for f in table if any(wanted in form for form in function_forms(f))],
+    ):
+        if len(matches) == 1:
+            return table[matches[0]], matches[0]
+        if matches:
+            return None
+    return None
+
+
+def prompt_to_arguments(params, input_schema=None):
+    """CreateLibEnsembleScripts arguments for parsed prompt params.
+
+    Returns (arguments, problems); arguments is None unless the prompt was
+    fully parsed and has everything the templates need.
+    """
+    values = params.values
+    problems = [f"unrecognised line: {line}" for line in params.unparsed]
+    for name in ("sim_app", "num_workers", "sim_max"):
+        if name not in values:
+            problems.append(f"no {name} given")
+
+    if not bounds_in_order(values):
+        problems.append("lower bounds must not exceed the upper bounds")
+
+    generator = match_generator(values["generator"], input_schema) if "generator" in values else None
+    if generator is None:
+        problems.append(f"unknown generator: {values.get('generator', '(none)')}")
+
+    dimension = len(values["lb"]) if "lb" in values else len(values.get("template_vars", []))
+    if not dimension:
+        problems.append("number of parameters unknown (give bounds or template vars)")
+    if "template_vars" in values and dimension and len(values["template_vars"]) != dimension:
+        problems.append("bounds and template vars have different lengths")
+
+    input_path = values.get("input_path")
+    input_type = "directory" if input_path and not Path(input_path).suffix else "file"
+    if input_type == "directory" and values.get("template_vars"):
+        problems.append("templated input directory needs a templated file name")
+
+    if problems:
+        return None, problems
+
+    sim_app = values["sim_app"]
+    arguments = {
+        "app_ref": values.get("app_ref") or Path(sim_app).stem,
+        "sim_app": sim_app,
+        "num_workers": str(values["num_workers"]),
+        "max_sims": str(values["sim_max"]),
+        "dimension": str(dimension),
+        "gen_module": generator[0],
+        "gen_function": generator[1],
+    }
+    if input_path:
+        arguments["input_path"] = input_path
+        arguments["input_type"] = input_type
+    if values.get("template_vars"):
+        arguments["templated_enable"] = True
+        arguments["template_vars"] = list(values["template_vars"])
+    if values.get("output_file"):
+        arguments["output_file_name"] = values["output_file"]
+    return arguments, []
+
+
+def _format_array(values):
+    return "np.array([" + ", ".join(repr(v) for v in values) + "])"
+
+
+def set_bounds(bundle, lb, ub):
+    """Bundle with gen_specs user lb/ub set to the given lists (unchanged if not found)"""
+    scripts = parse_scripts(bundle)
+    gen = find_specs(scripts).get("GenSpecs")
+    if gen is None:
+        return bundle
+    edits = []
+    for key, values in (("lb", lb), ("ub", ub)):
+        node = user_value(gen, key)
+        if node is not None:
+            edits.append((node, _format_array(values)))
+    if not edits:
+        return bundle
+    source = next(s for s in scripts if s.filename == gen.filename).source
+    lines = source.encode("utf-8").splitlines(keepends=True)
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    data = source.encode("utf-8")
+    for node, text in sorted(edits, key=lambda e: (e[0].lineno, e[0].col_offset), reverse=True):
+        start = starts[node.lineno - 1] + node.col_offset
+        end = starts[node.end_lineno - 1] + node.end_col_offset
+        data = data[:start] + text.encode("utf-8") + data[end:]
+    return [make_file(e["filename"], data.decode("utf-8")) if e["filename"] == gen.filename else e
+            for e in bundle]
+
+
+async def render_from_prompt(session, user_prompt, input_schema=None):
+    """Render scripts for a fully parsed prompt without the LLM.
+
+    Returns (bundle, problems); bundle is None if the prompt needs the LLM.
+    """
+    params = parse_prompt(user_prompt)
+    arguments, problems = prompt_to_arguments(params, input_schema)
+    if arguments is None:
+        return None, problems
+    result = await session.call_tool(TOOL_NAME, arguments)
+    bundle = bundle_from_tool_result(result)
+    if not bundle:
+        text = result.content[0].text if result.content else "no scripts returned"
+        return None, [f"renderer: {text}"]
+    if "lb" in params.values:
+        bundle = set_bounds(bundle, params.values["lb"], params.values["ub"])
+    return bundle, []
@@ -0,0 +1,111 @@
+"""
+Racing parallel fix candidates in attempt workspaces.
+
+Instead of fix, run, fix, run, ... a retry can ask for K fixes at once
+(from agents with different temperatures or models) and run each candidate
+in its own attempt workspace, <work_dir>/_attempts/candidate_<k>/, at the
+same time. The first candidate whose run succeeds wins and the others are
+cancelled, which kills their runs. Every candidate, winner or not, is
+archived as its own version with its run outputs.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from .bundle import write_bundle
+from .workspace import Workspace
+
+
+@dataclass
+class Candidate:
+    index: int
+    label: str
+    agent: object = None
+    bundle: list = None
+    workspace: Workspace = None
+    ok: bool = False
+    error_msg: str = ""
+    status: str = "pending"  # "succeeded", "failed", "cancelled" or "error"
+    duration: float = 0.0
+    version: str = ""
+
+
+def candidate_temperatures(k, low=0.0, high=1.0):
+    """k temperatures spread evenly from low to high (the first is low)"""
+    if k == 1:
+        return [low]
+    return [round(low + (high - low) * i / (k - 1), 2) for i in range(k)]
+
+
+async def race(candidates, attempt):
+    """Run attempt(candidate) for all candidates concurrently.
+
+    attempt sets candidate.ok (and error_msg) and returns. The first
+    candidate to finish with ok=True wins and the rest are cancelled.
+    Returns the winner, or None if every candidate failed.
+    """
+    async def timed(candidate):
+        start = time.perf_counter()
+        try:
+            await attempt(candidate)
+            candidate.status = "succeeded" if candidate.ok else "failed"
+        except asyncio.CancelledError:
+            candidate.status = "cancelled"
+            raise
+        except Exception as e:
+            candidate.status = "error"
+            candidate.error_msg = f"{type(e).__name__}: {e}"
+        finally:
+            candidate.duration = time.perf_counter() - start
+        return candidate
+
+    tasks = {asyncio.ensure_future(timed(c)): c for c in candidates}
+    winner = None
+    pending = set(tasks)
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                candidate = tasks[task]
+                if not task.cancelled() and candidate.ok and winner is None:
+                    winner = candidate
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return winner
+
+
+def archive_candidates(workspace, candidates, action, items, winner=None):
+    """Save each candidate's scripts as version <n>_<action>_candidate_<k> with its run outputs.
+
+    The attempt workspaces are removed afterwards.
+    """
+    for candidate in candidates:
+        candidate.version = workspace.new_version(f"{action}_candidate_{candidate.index}")
+        if candidate.bundle:
+            workspace.store.save(candidate.version, candidate.bundle)
+        if candidate.workspace:
+            note = candidate.error_msg
+            if candidate.status == "cancelled" and winner is not None:
+                note = f"Cancelled: candidate {winner.index} succeeded first"
+            candidate.workspace.archive_outputs(items, note, name=candidate.version)
+            candidate.workspace.discard()
+
+
+def print_race_summary(candidates, winner):
+    print("\nCandidates:")
+    for c in candidates:
+        mark = "✓" if c is winner else "✗"
+        print(f"  {mark} {c.index}: {c.label:<28} {c.status:<10} {c.duration:6.1f} s  versions/{c.version}")
+    if winner is None:
+        print("No candidate succeeded")
+
+
+async def write_candidate(candidate, workspace, bundle):
+    """Create the candidate's attempt workspace with bundle written into it"""
+    candidate.bundle = bundle
+    candidate.workspace = workspace.attempt(f"candidate_{candidate.index}")
+    await asyncio.to_thread(write_bundle, bundle, candidate.workspace.path, False)
+    return candidate.workspace.path
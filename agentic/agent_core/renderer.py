@@ -0,0 +1,368 @@
+"""
+In-process Python renderer for the CreateLibEnsembleScripts tool.
+
+Port of processTemplateData.js and the tool handlers in mcp_server.mjs.
+Generator data and templates are loaded and compiled once per renderer,
+and output is byte-identical to the Node MCP server.
+
+RendererSession exposes the subset of the mcp ClientSession interface the
+agents use (initialize, list_tools, call_tool), so it can stand in for a
+stdio connection to mcp_server.mjs. Like the server, tool results carry the
+rendered files as structuredContent {"files": [...]} (see agent_core.bundle).
+"""
+
+import asyncio
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .bundle import make_bundle
+from .mustache import compile_template, js_str, js_truthy, render
+
+TOOL_NAME = "CreateLibEnsembleScripts"
+TOOL_DESCRIPTION = "Render script using existing script-creator templates"
+
+# Root of the script-creator repository (holds data/ and templates/)
+SCRIPT_CREATOR_ROOT = Path(__file__).resolve().parent.parent.parent
+
+GEN_TO_ALLOC = {
+    "aposmm": {
+        "alloc_module": "persistent_aposmm_alloc",
+        "alloc_function": "persistent_aposmm_alloc",
+        "alloc_specs_user": "",
+    },
+    "default": {
+        "alloc_module": "start_only_persistent",
+        "alloc_function": "only_persistent_gens",
+        "alloc_specs_user": 'user={"async_return": True},',
+    },
+}
+
+TEMPLATE_FILES = {
+    "run_libe.py": "templates/run_libe.py.j2",
+    "simf.py": "templates/simf.py.j2",
+    "submit_slurm.sh": "templates/submit_slurm.sh.j2",
+    "submit_pbs.sh": "templates/submit_pbs.sh.j2",
+}
+
+
+def _parse_int(value):
+    """JavaScript parseInt() of a JSON value (NaN if no leading integer)"""
+    match = re.match(r"\s*([+-]?\d+)", js_str(value))
+    return int(match.group(1)) if match else math.nan
+
+
+def _or(value, default):
+    """JavaScript `value || default`"""
+    return value if js_truthy(value) else default
+
+
+def _basename(path):
+    return re.split(r"[\\/]", path)[-1]
+
+
+def process_template_data(data, generator_specs=None):
+    """Derive template variables from tool arguments (in place, like processTemplateData)"""
+    generator_specs = generator_specs or {}
+
+    # Set dimension, lb_array, ub_array
+    dimension = _parse_int(_or(data.get("dimension"), 2))
+    data["dimension"] = dimension
+    if isinstance(dimension, float) or dimension < 0:
+        raise ValueError("Invalid array length")
+    data["lb_array"] = "np.array([" + ", ".join(["0"] * dimension) + "])"
+    data["ub_array"] = "np.array([" + ", ".join(["3"] * dimension) + "])"
+
+    # Custom gen_specs logic
+    gen_module = _or(data.get("gen_module"), "").lower().strip()
+    gen_func = _or(data.get("gen_function"), "").lower().strip()
+    combined_key = gen_module + "." + gen_func
+    custom_spec = None
+    for key, spec in generator_specs.items():
+        if key.lower().strip() == combined_key:
+            custom_spec = spec
+            break
+    data["_custom_spec"] = custom_spec
+
+    # GPU settings
+    data["auto_gpus"] = _or(data.get("auto_gpus"), False)
+    num_gpus = _parse_int(data["gpus"]) if js_truthy(data.get("gpus")) else 0
+    data["num_gpus"] = num_gpus
+    has_gpus = num_gpus > 0  # False for NaN
+    data["gpus_line"] = f"num_gpus={num_gpus}," if not js_truthy(data["auto_gpus"]) and has_gpus else ""
+    data["needs_mpich_gpu_support"] = js_truthy(data["auto_gpus"]) or has_gpus
+
+    # Cluster settings
+    cluster_enabled = _or(data.get("cluster_enable"), False)
+    data["cluster_enabled"] = cluster_enabled
+    if js_truthy(cluster_enabled):
+        data["cluster_total_nodes"] = _or(data.get("cluster_total_nodes"), None)
+        data["scheduler_type"] = _or(data.get("scheduler_type"), None)
+    else:
+        data["cluster_total_nodes"] = None
+        data["scheduler_type"] = None
+    data["total_nodes"] = data["cluster_total_nodes"]
+
+    # Input handling
+    data["input_type"] = _or(data.get("input_type"), "file")
+    data["input_usage"] = _or(data.get("input_usage"), "directory")
+    data["input_usage_cmdline"] = data["input_usage"] == "cmdline"
+    templated_enabled = _or(data.get("templated_enable"), False)
+    data["templated_enabled"] = templated_enabled
+
+    template_vars = data.get("template_vars")
+    template_vars = [v for v in template_vars if v and v.strip() != ""] if isinstance(template_vars, list) else []
+
+    input_path = data.get("input_path")
+    if data["input_type"] == "file":
+        data["input_file"] = input_path
+        data["input_file_basename"] = _basename(input_path) if js_truthy(input_path) else None
+        data["sim_input_dir"] = None
+        data["templated_filename"] = None
+    else:
+        data["input_file"] = None
+        data["input_file_basename"] = None
+        data["sim_input_dir"] = input_path
+        if js_truthy(templated_enabled):
+            data["templated_filename"] = _or(data.get("templated_filename"), None)
+        else:
+            data["templated_filename"] = None
+
+    # Determine input_filename for user/app_args
+    input_filename = ""
+    if data["input_type"] == "file" and js_truthy(input_path):
+        input_filename = _basename(input_path)
+    elif data["input_type"] == "directory" and js_truthy(templated_enabled) and js_truthy(data["templated_filename"]):
+        input_filename = data["templated_filename"]
+
+    # Set input_filename when "in command line" is selected OR when there are templated values
+    has_template_vars = js_truthy(templated_enabled) and len(template_vars) > 0
+    needs_input_filename = data["input_usage"] == "cmdline" or has_template_vars
+    if needs_input_filename and js_truthy(input_filename):
+        data["input_filename"] = input_filename
+    else:
+        data.pop("input_filename", None)
+
+    # Only set input_names if there are templated values
+    if has_template_vars:
+        data["has_template_vars"] = True
+        data["template_vars_list"] = ", ".join(f'"{v}"' for v in template_vars)
+        data["input_names"] = template_vars
+        data["has_input_names"] = True
+    else:
+        data["has_template_vars"] = False
+        data["template_vars_list"] = ""
+        data.pop("input_names", None)
+        data["has_input_names"] = False
+
+    # Allocation settings
+    gen_function = data.get("gen_function")
+    if js_truthy(gen_function) and "aposmm" in gen_function.lower():
+        data.update(GEN_TO_ALLOC["aposmm"])
+    else:
+        data.update(GEN_TO_ALLOC["default"])
+
+    return data
+
+
+def render_custom_gen_specs(data):
+    """Render the generator-specific gen_specs body, if there is one"""
+    custom_spec = data.get("_custom_spec")
+    if js_truthy(custom_spec):
+        if isinstance(custom_spec, str):
+            spec_str = custom_spec
+        else:
+            spec_str = json.dumps(custom_spec, separators=(",", ":"))
+        data["custom_gen_specs"] = render(spec_str, data) if spec_str else None
+    return data
+
+
+def get_default_set_objective_code(data):
+    """Default set_objective_value() reading the last value of the output file"""
+    output_file_name = _or(data.get("output_file_name"), f"{js_str(_or(data.get('app_ref'), ''))}.stat")
+    return f"""def set_objective_value():
+    try:
+        data = np.loadtxt("{output_file_name}", ndmin=1)
+        return data[-1]
+    except Exception:
+        return np.nan"""
+
+
+class ScriptRenderer:
+    """Renders CreateLibEnsembleScripts bundles from preloaded, precompiled templates"""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else SCRIPT_CREATOR_ROOT
+        try:
+            self.generator_specs = json.loads((self.root / "data/generator_specs.json").read_text())
+        except (OSError, ValueError):
+            self.generator_specs = {}
+        self.templates = {
+            name: compile_template((self.root / rel_path).read_text())
+            for name, rel_path in TEMPLATE_FILES.items()
+        }
+        self._tool_schema = None
+
+    def tool_schema(self):
+        """Tool definition (name, description, inputSchema) as listed by mcp_server.mjs"""
+        if self._tool_schema is None:
+            try:
+                generators = json.loads((self.root / "data/generators.json").read_text())
+            except (OSError, ValueError) as e:
+                raise RuntimeError(f"Failed to load generators.json: {e}")
+            gen_module_enum = list(generators)
+            gen_function_enum = []
+            for info in generators.values():
+                if isinstance(info.get("generators"), list):
+                    gen_function_enum.extend(info["generators"])
+            gen_function_enum = list(dict.fromkeys(gen_function_enum))
+            self._tool_schema = {
+                "name": TOOL_NAME,
+                "description": TOOL_DESCRIPTION,
+                "inputSchema": _input_schema(gen_module_enum, gen_function_enum),
+            }
+        return self._tool_schema
+
+    def render_files(self, arguments):
+        """Render a bundle. Returns a list of (filename, content) in output order."""
+        data = dict(arguments or {})
+        process_template_data(data, self.generator_specs)
+        render_custom_gen_specs(data)
+        if not js_truthy(data.get("set_objective_code")):
+            data["set_objective_code"] = get_default_set_objective_code(data)
+
+        files = [
+            ("run_libe.py", self.templates["run_libe.py"].render(data)),
+            ("simf.py", self.templates["simf.py"].render(data)),
+        ]
+        if js_truthy(data["cluster_enabled"]):
+            batch_name = "submit_slurm.sh" if data["scheduler_type"] == "slurm" else "submit_pbs.sh"
+            files.append((batch_name, self.templates[batch_name].render(data)))
+        return files
+
+    def render_text(self, arguments):
+        """Render a bundle as the "=== filename ===" text returned by mcp_server.mjs"""
+        return join_files_text(self.render_files(arguments))
+
+
+def join_files_text(files):
+    return "\n\n".join(f"=== {name} ===\n{content}" for name, content in files)
+
+
+def _input_schema(gen_module_enum, gen_function_enum):
+    return {
+        "type": "object",
+        "properties": {
+            "app_ref": {"type": "string", "description": "Application reference name"},
+            "num_workers": {"type": "string", "description": "Number of workers"},
+            "sim_app": {"type": "string", "description": "Path to simulation application"},
+            "input_path": {"type": "string", "description": "Path to input file or directory"},
+            "dimension": {"type": "string", "description": "Number of parameters"},
+            "max_sims": {"type": "string", "description": "Maximum simulations"},
+            "input_type": {"type": "string", "description": "Input type: file or directory"},
+            "templated_enable": {"type": "boolean", "description": "Enable templated input file"},
+            "templated_filename": {"type": "string", "description": "Template filename"},
+            "template_vars": {"type": "array", "description": "Template variable names", "items": {"type": "string"}},
+            "cluster_enable": {"type": "boolean", "description": "Enable cluster mode"},
+            "cluster_total_nodes": {"type": "string", "description": "Total nodes for cluster"},
+            "scheduler_type": {"type": "string", "enum": ["slurm", "pbs"], "description": "Scheduler type (slurm or pbs)"},
+            "gen_module": {
+                "type": "string",
+                "enum": gen_module_enum,
+                "description": f"Generator module. Valid options: {', '.join(gen_module_enum)}",
+            },
+            "gen_function": {
+                "type": "string",
+                "enum": gen_function_enum,
+                "description": f"Generator function. Valid options: {', '.join(gen_function_enum)}",
+            },
+            "nodes": {"type": "string", "description": "Number of nodes"},
+            "procs": {"type": "string", "description": "Number of processes"},
+            "gpus": {"type": "string", "description": "Number of GPUs"},
+            "input_usage": {"type": "string", "enum": ["directory", "cmdline"], "description": "Input usage: directory or cmdline"},
+            "output_file_name": {"type": "string", "description": "Output file name to read objective from (defaults to app_ref.stat)"},
+            "custom_set_objective": {"type": "boolean", "description": "Use custom set_objective function"},
+            "set_objective_code": {"type": "string", "description": "Custom set_objective_value() function code"},
+        },
+        "additionalProperties": True,
+    }
+
+
+# ── MCP-compatible session ───────────────────────────────────
+
+@dataclass
+class TextContent:
+    text: str
+    type: str = "text"
+
+
+@dataclass
+class CallToolResult:
+    content: list
+    isError: bool = False
+    structuredContent: dict = None
+
+
+@dataclass
+class Tool:
+    name: str
+    description: str
+    inputSchema: dict
+
+
+@dataclass
+class ListToolsResult:
+    tools: list = field(default_factory=list)
+
+
+class RendererSession:
+    """Drop-in for an mcp ClientSession connected to mcp_server.mjs, rendering in-process"""
+
+    def __init__(self, renderer=None):
+        self.renderer = renderer or ScriptRenderer()
+
+    async def initialize(self):
+        return None
+
+    async def list_tools(self):
+        from .batch import BATCH_INPUT_SCHEMA, BATCH_TOOL_DESCRIPTION, BATCH_TOOL_NAME
+
+        return ListToolsResult(tools=[
+            Tool(**self.renderer.tool_schema()),
+            Tool(name=BATCH_TOOL_NAME, description=BATCH_TOOL_DESCRIPTION, inputSchema=BATCH_INPUT_SCHEMA),
+        ])
+
+    async def call_tool(self, name, arguments=None):
+        from .batch import BATCH_TOOL_NAME
+
+        if name == BATCH_TOOL_NAME:
+            return await self._call_batch(arguments or {})
+        if name != TOOL_NAME:
+            raise ValueError(f"Unknown tool: {name}")
+        try:
+            files = self.renderer.render_files(arguments)
+        except Exception as e:
+            return CallToolResult(content=[TextContent(f"Error rendering templates: {e}")], isError=True)
+        return CallToolResult(
+            content=[TextContent(join_files_text(files))],
+            structuredContent={"files": make_bundle(files)},
+        )
+
+    async def _call_batch(self, arguments):
+        from .batch import expand_parameter_sets, render_batch, summarize
+
+        try:
+            parameter_sets = expand_parameter_sets(
+                arguments.get("parameter_sets"), arguments.get("base"), arguments.get("sweep")
+            )
+            output_dir = arguments["output_dir"]
+            manifest = await asyncio.to_thread(
+                render_batch, parameter_sets, output_dir,
+                workers=arguments.get("workers"), renderer=self.renderer,
+            )
+        except Exception as e:
+            return CallToolResult(content=[TextContent(f"Error rendering batch: {e}")], isError=True)
+        text = summarize(manifest, output_dir) + "\n" + json.dumps(manifest, indent=2)
+        return CallToolResult(content=[TextContent(text)])
@@ -0,0 +1,430 @@
+"""
+Long-lived renderer service shared by agent runs and web UI sessions.
+
+With --renderer node every agent run starts mcp_server.mjs, initializes MCP
+and lists its tools before the first render. The daemon keeps one backend
+session open (mcp_server.mjs over stdio, or the in-process renderer) and
+serves it on a Unix socket, one JSON request and response per line:
+
+    {"id": 1, "method": "list_tools"}
+    {"id": 2, "method": "call_tool", "params": {"name": "CreateLibEnsembleScripts", "arguments": {...}}}
+    {"id": 3, "method": "status"}          (also "shutdown")
+
+- The tool list (with the generator enums built from data/generators.json) is
+  cached by the daemon; when data/generators.json or generator_specs.json
+  change, the backend is restarted so the enums follow.
+- A backend call that fails or hangs restarts the backend and is retried once.
+- Clients (open_generator_session("daemon")) share a pool of connections per
+  process and cache the tool list. If the daemon is not running, or has died,
+  the client starts it in the background and waits for its socket.
+- The daemon exits after IDLE_TIMEOUT seconds without requests.
+
+The backend is LIBE_RENDERER_BACKEND (default: node) and the socket
+LIBE_RENDERER_SOCKET (default: libe-renderer-<uid>-<backend>.sock in
+XDG_RUNTIME_DIR or the temp directory).
+
+Usage (from agentic/):
+    python -m agent_core.renderer_daemon serve [--backend node|python] [--mcp-server PATH]
+    python -m agent_core.renderer_daemon status | stop
+    python -m agent_core.renderer_daemon bench [--starts 20]   # latency per agent start, with and without it
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .renderer import SCRIPT_CREATOR_ROOT, TOOL_NAME, CallToolResult, ListToolsResult, TextContent, Tool
+
+BACKENDS = ("node", "python")
+DEFAULT_BACKEND = os.environ.get("LIBE_RENDERER_BACKEND", "node")
+
+# Data files the tool schema is built from (a change restarts the backend)
+SCHEMA_SOURCES = ("data/generators.json", "data/generator_specs.json")
+
+POOL_SIZE = 4
+CALL_TIMEOUT = 30        # Seconds before a backend call counts as hung
+START_TIMEOUT = 30       # Seconds a client waits for a daemon it started
+IDLE_TIMEOUT = 3600      # Seconds without requests before the daemon exits
+RESTART_DELAY = 1.0
+LINE_LIMIT = 64 * 2**20  # Largest request/response line
+
+AGENTIC_DIR = Path(__file__).resolve().parent.parent
+
+
+def socket_path(backend=DEFAULT_BACKEND):
+    if os.environ.get("LIBE_RENDERER_SOCKET"):
+        return Path(os.environ["LIBE_RENDERER_SOCKET"])
+    base = Path(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir())
+    return base / f"libe-renderer-{os.getuid()}-{backend}.sock"
+
+
+def _schema_stamp():
+    stamps = []
+    for name in SCHEMA_SOURCES:
+        try:
+            stamps.append((SCRIPT_CREATOR_ROOT / name).stat().st_mtime_ns)
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def _tools_to_json(result):
+    return {"tools": [{"name": t.name, "description": t.description, "inputSchema": t.inputSchema}
+                      for t in result.tools]}
+
+
+def _result_to_json(result):
+    return {
+        "content": [{"type": getattr(c, "type", "text"), "text": getattr(c, "text", "")} for c in result.content or []],
+        "isError": bool(getattr(result, "isError", False)),
+        "structuredContent": getattr(result, "structuredContent", None),
+    }
+
+
+# ── Daemon ──
+
+class RendererDaemon:
+    """One backend session, restarted when it fails or the schema sources change"""
+
+    def __init__(self, backend=DEFAULT_BACKEND, mcp_server=None, idle_timeout=IDLE_TIMEOUT):
+        self.backend = backend
+        self.mcp_server = mcp_server
+        self.idle_timeout = idle_timeout
+        self.session = None
+        self.tools = None
+        self.stamp = None
+        self.started = time.time()
+        self.last_request = time.monotonic()
+        self.calls = 0
+        self.restarts = 0
+        self.generation = 0
+        self.last_error = None
+        self._ready = asyncio.Event()
+        self._restart = asyncio.Event()
+        self._stop = asyncio.Event()
+
+    async def supervise(self):
+        """Keep a backend session open; reopen it when a restart is requested or it fails"""
+        from .generator_session import open_generator_session
+
+        while not self._stop.is_set():
+            try:
+                start = time.perf_counter()
+                async with open_generator_session(self.backend, self.mcp_server) as session:
+                    self.tools = _tools_to_json(await session.list_tools())
+                    self.stamp = _schema_stamp()
+                    self.session = session
+                    self.generation += 1
+                    self._restart.clear()
+                    self._ready.set()
+                    print(f"Backend {self.backend} ready in {(time.perf_counter() - start) * 1000:.0f} ms "
+                          f"(generation {self.generation})", flush=True)
+                    await self._restart.wait()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Backend {self.backend} failed: {self.last_error}", flush=True)
+                await asyncio.sleep(RESTART_DELAY)
+            finally:
+                self._ready.clear()
+                self.session = None
+            if not self._stop.is_set():
+                self.restarts += 1
+
+    async def _session(self):
+        if self.stamp is not None and _schema_stamp() != self.stamp:
+            print("Schema sources changed - restarting backend", flush=True)
+            self.restart(self.generation)
+        try:
+            await asyncio.wait_for(self._ready.wait(), START_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"backend {self.backend} not ready after {START_TIMEOUT} s"
+                               f" (last error: {self.last_error})") from None
+        return self.session, self.generation
+
+    def restart(self, generation):
+        """Restart the backend, unless it was already restarted since generation"""
+        if generation == self.generation:
+            self._ready.clear()
+            self._restart.set()
+
+    async def list_tools(self):
+        await self._session()
+        return self.tools
+
+    async def call_tool(self, name, arguments):
+        for retry in (False, True):
+            session, generation = await self._session()
+            try:
+                result = await asyncio.wait_for(session.call_tool(name, arguments), CALL_TIMEOUT)
+                self.calls += 1
+                return _result_to_json(result)
+            except Exception as e:
+                if retry:
+                    raise
+                print(f"Call failed ({type(e).__name__}: {e}) - restarting backend", flush=True)
+                self.restart(generation)
+
+    def status(self):
+        return {"pid": os.getpid(), "backend": self.backend, "uptime_s": round(time.time() - self.started, 1),
+                "calls": self.calls, "restarts": self.restarts, "ready": self._ready.is_set(),
+                "last_error": self.last_error}
+
+    async def dispatch(self, request):
+        method = request.get("method")
+        params = request.get("params") or {}
+        if method == "list_tools":
+            return await self.list_tools()
+        if method == "call_tool":
+            return await self.call_tool(params["name"], params.get("arguments") or {})
+        if method == "status":
+            return self.status()
+        if method == "shutdown":
+            self.stop()
+            return {"stopping": True}
+        raise ValueError(f"Unknown method: {method}")
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                self.last_request = time.monotonic()
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = {"id": request.get("id"), "result": await self.dispatch(request)}
+                except Exception as e:
+                    response = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client gone, or the daemon is shutting down
+        finally:
+            writer.close()
+
+    def stop(self):
+        self._stop.set()
+        self._restart.set()
+
+    async def serve(self, path):
+        """Serve on the Unix socket path until stopped or idle"""
+        supervisor = asyncio.create_task(self.supervise())
+        server = await asyncio.start_unix_server(self.handle, path=str(path), limit=LINE_LIMIT)
+        os.chmod(path, 0o600)
+        print(f"Renderer daemon ({self.backend}) on {path}, pid {os.getpid()}", flush=True)
+        try:
+            while not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), 10)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - self.last_request > self.idle_timeout:
+                        print(f"Idle for {self.idle_timeout} s - exiting", flush=True)
+                        self.stop()
+        finally:
+            server.close()
+            supervisor.cancel()
+            await asyncio.gather(supervisor, return_exceptions=True)
+            Path(path).unlink(missing_ok=True)
+
+
+def serve(backend=DEFAULT_BACKEND, path=None, mcp_server=None, idle_timeout=IDLE_TIMEOUT):
+    """Run a daemon in this process (returns at once if another one holds the socket's lock)"""
+    path = Path(path or socket_path(backend))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(f"{path}.lock", "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print(f"A renderer daemon is already serving {path}")
+        return
+    path.unlink(missing_ok=True)  # Left over from a daemon that died
+    if backend == "node" and not mcp_server:
+        from .generator_session import find_mcp_server
+        mcp_server = find_mcp_server()
+    asyncio.run(RendererDaemon(backend, mcp_server, idle_timeout).serve(path))
+
+
+# ── Client ──
+
+def start_daemon(backend, path, mcp_server=None):
+    """Start a daemon in the background (its output goes to <socket>.log)"""
+    command = [sys.executable, "-m", "agent_core.renderer_daemon", "serve", "--backend", backend, "--socket", str(path)]
+    if mcp_server:
+        command += ["--mcp-server", str(mcp_server)]
+    with open(f"{path}.log", "a") as log:
+        subprocess.Popen(command, cwd=AGENTIC_DIR, stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                         start_new_session=True)
+
+
+class DaemonClient:
+    """Pool of connections to a renderer daemon, started on demand"""
+
+    def __init__(self, backend=DEFAULT_BACKEND, path=None, mcp_server=None, size=POOL_SIZE, autostart=True):
+        self.backend = backend
+        self.path = Path(path or socket_path(backend))
+        self.mcp_server = mcp_server
+        self.autostart = autostart
+        self.tools = None
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self._next_id = 0
+
+    async def _connect(self):
+        try:
+            return await asyncio.open_unix_connection(str(self.path), limit=LINE_LIMIT)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not self.autostart:
+                raise ConnectionError(f"no renderer daemon on {self.path}")
+        print(f"Starting renderer daemon ({self.backend}) on {self.path}")
+        start_daemon(self.backend, self.path, self.mcp_server)
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            await asyncio.sleep(0.05)
+            try:
+                return await asyncio.open_unix_connection(str(self.path), limit=LINE_LIMIT)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise ConnectionError(f"Renderer daemon did not start (see {self.path}.log)")
+
+    async def request(self, method, params=None):
+        """Send one request on a pooled connection (reconnecting, and restarting the daemon, once)"""
+        self._next_id += 1
+        message = json.dumps({"id": self._next_id, "method": method, "params": params}).encode() + b"\n"
+        async with self._slots:
+            for retry in (False, True):
+                reader, writer = self._idle.pop() if self._idle else await self._connect()
+                try:
+                    writer.write(message)
+                    await writer.drain()
+                    line = await reader.readline()
+                    if not line:
+                        raise ConnectionError("renderer daemon closed the connection")
+                except (ConnectionError, OSError):
+                    writer.close()
+                    if retry:
+                        raise
+                    continue
+                self._idle.append((reader, writer))
+                response = json.loads(line)
+                if "error" in response:
+                    raise RuntimeError(f"Renderer daemon: {response['error']}")
+                return response["result"]
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+_clients = {}
+
+
+def daemon_client(backend=DEFAULT_BACKEND, mcp_server=None):
+    """This process's client for the backend's daemon (one pool per event loop)"""
+    key = (backend, str(socket_path(backend)), id(asyncio.get_running_loop()))
+    if key not in _clients:
+        _clients[key] = DaemonClient(backend, mcp_server=mcp_server)
+    return _clients[key]
+
+
+class DaemonSession:
+    """Drop-in for an mcp ClientSession, served by the renderer daemon"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def initialize(self):
+        return None
+
+    async def list_tools(self):
+        if self.client.tools is None:
+            self.client.tools = await self.client.request("list_tools")
+        return ListToolsResult(tools=[Tool(**t) for t in self.client.tools["tools"]])
+
+    async def call_tool(self, name, arguments=None):
+        result = await self.client.request("call_tool", {"name": name, "arguments": arguments or {}})
+        return CallToolResult(content=[TextContent(c["text"], c.get("type", "text")) for c in result["content"]],
+                              isError=result["isError"], structuredContent=result["structuredContent"])
+
+
+# ── Latency per agent start ──
+
+BENCH_ARGUMENTS = {"app_ref": "six_hump_camel", "num_workers": "4", "max_sims": "100",
+                   "gen_module": "persistent_aposmm", "gen_function": "aposmm"}
+
+
+async def _agent_start(open_session):
+    """Seconds from nothing to the first rendered scripts: open, list_tools, one call"""
+    start = time.perf_counter()
+    async with open_session() as session:
+        await session.list_tools()
+        await session.call_tool(TOOL_NAME, BENCH_ARGUMENTS)
+    return time.perf_counter() - start
+
+
+async def bench(backend, starts, mcp_server=None):
+    """Median time per agent start with a fresh backend session and with the daemon"""
+    from contextlib import asynccontextmanager
+
+    from .generator_session import open_generator_session
+
+    @asynccontextmanager
+    async def via_daemon():
+        client = DaemonClient(backend, mcp_server=mcp_server)  # A fresh pool, as in a new agent process
+        try:
+            yield DaemonSession(client)
+        finally:
+            await client.close()
+
+    direct = [await _agent_start(lambda: open_generator_session(backend, mcp_server)) for _ in range(starts)]
+    first = await _agent_start(via_daemon)  # May start the daemon
+    shared = [await _agent_start(via_daemon) for _ in range(starts)]
+    saved = statistics.median(direct) - statistics.median(shared)
+    print(f"Per agent start ({backend}, median of {starts}; open + list_tools + one render):")
+    print(f"  own backend session   {statistics.median(direct) * 1000:9.1f} ms")
+    print(f"  renderer daemon       {statistics.median(shared) * 1000:9.1f} ms   (first connection {first * 1000:.1f} ms)")
+    print(f"  saved per start       {saved * 1000:9.1f} ms")
+    return direct, shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived renderer service for CreateLibEnsembleScripts")
+    parser.add_argument("command", choices=("serve", "status", "stop", "bench"))
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"Render with mcp_server.mjs (node) or in-process (python). Default: {DEFAULT_BACKEND}")
+    parser.add_argument("--socket", help="Unix socket path (default: per user and backend)")
+    parser.add_argument("--mcp-server", help="Path to mcp_server.mjs (node backend)")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help=f"Exit after this many seconds without requests (default: {IDLE_TIMEOUT})")
+    parser.add_argument("--starts", type=int, default=20, help="Agent starts to time (bench)")
+    args = parser.parse_args()
+
+    if args.socket:
+        os.environ["LIBE_RENDERER_SOCKET"] = args.socket
+    if args.command == "serve":
+        serve(args.backend, args.socket, args.mcp_server, args.idle_timeout)
+        return
+
+    async def run():
+        if args.command == "bench":
+            await bench(args.backend, args.starts, args.mcp_server)
+            return
+        client = DaemonClient(args.backend, autostart=False)
+        try:
+            print(json.dumps(await client.request(args.command if args.command == "status" else "shutdown")))
+        except ConnectionError as e:
+            print(f"Renderer daemon: {e}")
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
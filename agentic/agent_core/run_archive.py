@@ -0,0 +1,99 @@
+"""
+Archiving of run outputs (ensemble/, ensemble.log, *.npy, ...) after a run.
+
+Outputs are moved into the version's output/ directory with os.rename, which
+is atomic and O(1) when source and destination share a filesystem (the usual
+case, as versions/ lives inside the work directory). Only across filesystems,
+or when merging into an existing directory, does it fall back to copying.
+
+OutputCompressor optionally packs older output/ directories into a single
+output.tar.zst per version in a background thread (needs `zstandard`).
+"""
+
+import os
+import shutil
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def _move(src, dest):
+    """Move src to dest, by rename when possible"""
+    if dest.exists() and src.is_dir():
+        # Merge into an existing directory (e.g. a second failed run of the same version)
+        shutil.copytree(src, dest, dirs_exist_ok=True)
+        shutil.rmtree(src)
+        return
+    try:
+        os.replace(src, dest)
+    except OSError:
+        shutil.move(str(src), str(dest))
+
+
+def move_run_outputs(work_dir, output_dir, items, error_msg=""):
+    """Move run output items (names or globs) from work_dir into output_dir"""
+    work_dir = Path(work_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if error_msg:
+        (output_dir / "error.txt").write_text(error_msg)
+    for item in items:
+        for path in work_dir.glob(item):
+            _move(path, output_dir / path.name)
+    return output_dir
+
+
+def compress_dir(directory, remove=True):
+    """Pack a directory into <directory>.tar.zst next to it. Returns the archive path."""
+    import zstandard
+
+    directory = Path(directory)
+    archive = directory.with_name(directory.name + ".tar.zst")
+    tmp = archive.with_name(archive.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        with zstandard.ZstdCompressor(threads=-1).stream_writer(fh) as writer:
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                tar.add(directory, arcname=directory.name)
+    os.replace(tmp, archive)
+    if remove:
+        shutil.rmtree(directory)
+    return archive
+
+
+class OutputCompressor:
+    """Compress run output directories in a background thread.
+
+    The most recently submitted directory is kept as is, so the latest
+    failed run stays browsable; submitting a new one queues the previous one.
+    """
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="output-compressor")
+        self._lock = threading.Lock()
+        self._latest = None
+
+    @staticmethod
+    def available():
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _compress(self, directory):
+        try:
+            archive = compress_dir(directory)
+            print(f"[Archive] Compressed {directory} -> {archive.name}", flush=True)
+        except Exception as e:
+            print(f"[Archive] Could not compress {directory}: {e}", flush=True)
+
+    def submit(self, directory):
+        with self._lock:
+            previous, self._latest = self._latest, Path(directory)
+            if previous and previous != self._latest and previous.is_dir():
+                self._pool.submit(self._compress, previous)
+
+    def close(self):
+        """Wait for queued compressions to finish"""
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,378 @@
+"""
+Asynchronous script runner for the agents' run step.
+
+Runs a script with asyncio subprocesses, so the event loop (and with it MCP
+keepalives and other tasks) is never blocked. Output is streamed to the
+console as it arrives and only a bounded tail of each stream is kept for the
+LLM. The run is killed (whole process group) on timeout or cancellation.
+
+With a FailFastWatcher, stderr and ensemble.log are matched live against
+fatal patterns. libEnsemble often keeps the manager alive after a worker
+dies, so on a match the run is stopped (after a short settle time to let the
+traceback finish) instead of waiting for it to time out.
+"""
+
+import asyncio
+import os
+import re
+import signal
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from .trace import TRACE
+
+# Default run timeout in seconds (None for no limit)
+DEFAULT_TIMEOUT = 300
+
+# Characters kept from the end of stdout and of stderr
+TAIL_CHARS = 20000
+
+# Seconds between SIGTERM and SIGKILL when stopping a run
+KILL_GRACE = 5
+
+READ_CHUNK = 65536
+
+# Output that means the run cannot succeed (regexes, matched per line). Generic
+# tracebacks are left out: a sim may log an exception it handled (--fatal-pattern adds them).
+FATAL_PATTERNS = [
+    r"\b(ImportError|ModuleNotFoundError|NameError): ",
+    r"Application not found",
+    r"Received error message from worker",
+    r"ManagerException|WorkerException",
+]
+
+# Seconds to keep collecting output after a fatal match before stopping the run
+FAIL_FAST_SETTLE = 1.0
+
+# Seconds between reads of ensemble.log
+LOG_POLL_INTERVAL = 0.25
+
+# Seconds between samples of the run's resident memory
+RSS_POLL_INTERVAL = 1.0
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def timeout_arg(value):
+    """argparse type for --run-timeout: seconds, 0 or 'none' for no limit"""
+    if str(value).lower() in ("0", "none"):
+        return None
+    seconds = float(value)
+    if seconds < 0:
+        raise ValueError("timeout must be >= 0")
+    return seconds
+
+
+def detect_run_script(directory):
+    """Find the run script in directory (first run_*.py file)"""
+    run_scripts = sorted(Path(directory).glob("run_*.py"))
+    if not run_scripts:
+        return None
+    return run_scripts[0].name
+
+
+class OutputTail:
+    """Keep the last max_chars characters of a stream"""
+
+    def __init__(self, max_chars=TAIL_CHARS):
+        self.max_chars = max_chars
+        self._parts = deque()
+        self._size = 0
+        self.dropped = 0
+
+    def append(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        while self._size > self.max_chars and len(self._parts) > 1:
+            part = self._parts.popleft()
+            self._size -= len(part)
+            self.dropped += len(part)
+        if self._size > self.max_chars:
+            excess = self._size - self.max_chars
+            self._parts[0] = self._parts[0][excess:]
+            self._size -= excess
+            self.dropped += excess
+
+    def text(self):
+        body = "".join(self._parts)
+        if self.dropped:
+            return f"[... {self.dropped} earlier characters omitted ...]\n{body}"
+        return body
+
+
+class FailFastWatcher:
+    """Stop a run as soon as stderr or ensemble.log shows a fatal pattern"""
+
+    def __init__(self, patterns=None, log_file=None, settle=FAIL_FAST_SETTLE, log_lines=100):
+        patterns = FATAL_PATTERNS if patterns is None else patterns
+        self.regex = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        self.log_file = Path(log_file) if log_file else None
+        self.settle = settle
+        self.log_tail = deque(maxlen=log_lines)
+        self.reason = ""
+        self.stop_event = asyncio.Event()
+
+    def on_line(self, source, line):
+        if source == "stdout":
+            return
+        if source == "ensemble.log":
+            self.log_tail.append(line)
+        if self.reason or not self.regex or not self.regex.search(line):
+            return
+        self.reason = f"fatal output in {source}: {line.strip()[:200]}"
+        print(f"\n[fail-fast] {self.reason}", flush=True)
+        asyncio.get_running_loop().call_later(self.settle, self.stop_event.set)
+
+    async def watch_log(self):
+        """Follow log_file (from its current end, or from the start once created)"""
+        if not self.log_file:
+            return
+        offset = self.log_file.stat().st_size if self.log_file.exists() else 0
+        partial = ""
+        while True:
+            await asyncio.sleep(LOG_POLL_INTERVAL)
+            try:
+                size = self.log_file.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size < offset:  # Truncated or replaced
+                offset = 0
+            if size == offset:
+                continue
+            with open(self.log_file, "rb") as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+            offset = size
+            lines = (partial + data.decode("utf-8", errors="replace")).split("\n")
+            partial = lines.pop()
+            for line in lines:
+                self.on_line("ensemble.log", line)
+
+    def log_excerpt(self):
+        return "\n".join(self.log_tail)
+
+
+@dataclass
+class RunResult:
+    returncode: object
+    stdout: str
+    stderr: str
+    duration: float
+    timeout: object = None
+    timed_out: bool = False
+    stopped_reason: str = ""
+    log_excerpt: str = ""
+    peak_rss: object = None  # bytes, summed over the process group (None if not measured)
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and not self.stopped_reason
+
+    def summary(self):
+        """Short outcome, e.g. 'failed with return code 1'"""
+        if self.ok:
+            return "ran successfully"
+        if self.timed_out:
+            return f"timed out after {self.timeout} seconds"
+        if self.stopped_reason:
+            return f"stopped early after {self.duration:.1f} s ({self.stopped_reason})"
+        return f"failed with return code {self.returncode}"
+
+    def error_message(self):
+        """Error text for the LLM (same layout the agents have always used)"""
+        if self.timed_out or self.stopped_reason:
+            head = f"Script {self.summary()}"
+        else:
+            head = f"Return code {self.returncode}"
+        text = f"{head}\nStderr: {self.stderr}\nStdout: {self.stdout}"
+        if self.log_excerpt:
+            text += f"\nensemble.log (last lines):\n{self.log_excerpt}"
+        return text
+
+
+async def _kill_group(process):
+    """SIGTERM the process group, then SIGKILL if it does not exit in time"""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE)
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+def _read_stat(pid):
+    """Fields of /proc/<pid>/stat from field 3 (state) on, or None if the process is gone"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    return data[data.rfind(b")") + 2:].split()
+
+
+def _children(pid):
+    """Child pids of pid from /proc/<pid>/task/*/children (empty if it exited)"""
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", "rb") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return children
+
+
+# /proc/<pid>/task/<tid>/children needs CONFIG_PROC_CHILDREN; without it the whole of /proc is scanned
+_HAS_CHILDREN = os.path.exists(f"/proc/{os.getpid()}/task/{os.getpid()}/children")
+
+
+def group_rss(pgid):
+    """Resident memory in bytes of the processes in a process group, or None without /proc.
+
+    Follows the process tree under pgid (the group leader) where the kernel
+    lists children; else scans every process in /proc.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    if _HAS_CHILDREN:
+        pending, seen = [pgid], set()
+        while pending:
+            pid = pending.pop()
+            fields = _read_stat(pid)
+            if pid in seen or fields is None:
+                continue
+            seen.add(pid)
+            if int(fields[2]) == pgid:
+                total += int(fields[21]) * _PAGE_SIZE
+            pending.extend(_children(pid))
+        return total
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        fields = _read_stat(name)  # None if it exited meanwhile
+        if fields is not None and int(fields[2]) == pgid:
+            total += int(fields[21]) * _PAGE_SIZE
+    return total
+
+
+async def _track_rss(pgid, peak):
+    """Sample the process group's memory (in a worker thread) until cancelled, keeping the peak in peak[0]"""
+    while True:
+        rss = await asyncio.to_thread(group_rss, pgid)
+        if rss is None:
+            return
+        peak[0] = max(peak[0] or 0, rss)
+        await asyncio.sleep(RSS_POLL_INTERVAL)
+
+
+async def _pump(stream, tail, echo, on_line, label):
+    """Read a stream to EOF, keeping a tail, echoing and calling on_line per line"""
+    partial = ""
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        text = chunk.decode("utf-8", errors="replace")
+        tail.append(text)
+        if echo:
+            out = sys.stderr if label == "stderr" else sys.stdout
+            out.write(text)
+            out.flush()
+        if on_line:
+            lines = (partial + text).split("\n")
+            partial = lines.pop()
+            for line in lines:
+                on_line(label, line)
+    if on_line and partial:
+        on_line(label, partial)
+
+
+async def run_script(script_name, cwd, timeout=DEFAULT_TIMEOUT, echo=True, on_line=None,
+                     tail_chars=TAIL_CHARS, python="python", watcher=None):
+    """Run `python script_name` in cwd and return a RunResult.
+
+    on_line(stream, line) is called for every output line ("stdout"/"stderr").
+    A FailFastWatcher stops the run early on fatal output. Cancelling the
+    calling task kills the run.
+    """
+    stdout_tail = OutputTail(tail_chars)
+    stderr_tail = OutputTail(tail_chars)
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        python, script_name,
+        cwd=Path(cwd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,  # own process group, so MPI/worker children are killed too
+    )
+    if watcher:
+        user_on_line = on_line
+
+        def on_line(source, line):
+            watcher.on_line(source, line)
+            if user_on_line:
+                user_on_line(source, line)
+
+    pumps = asyncio.gather(
+        _pump(process.stdout, stdout_tail, echo, on_line, "stdout"),
+        _pump(process.stderr, stderr_tail, echo, on_line, "stderr"),
+    )
+    waiters = {asyncio.ensure_future(process.wait())}
+    peak_rss = [None]
+    rss_task = asyncio.ensure_future(_track_rss(process.pid, peak_rss))
+    log_task = None
+    if watcher:
+        waiters.add(asyncio.ensure_future(watcher.stop_event.wait()))
+        log_task = asyncio.ensure_future(watcher.watch_log())
+
+    timed_out = False
+    stopped_reason = ""
+    try:
+        done, pending = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if not done:
+            timed_out = True
+        elif process.returncode is None:
+            stopped_reason = watcher.reason
+        if timed_out or stopped_reason:
+            await _kill_group(process)
+        await pumps
+    except asyncio.CancelledError:
+        await _kill_group(process)
+        pumps.cancel()
+        raise
+    finally:
+        if log_task:
+            log_task.cancel()
+        rss_task.cancel()
+
+    result = RunResult(
+        returncode=process.returncode,
+        stdout=stdout_tail.text(),
+        stderr=stderr_tail.text(),
+        duration=time.perf_counter() - start,
+        timeout=timeout,
+        timed_out=timed_out,
+        stopped_reason=stopped_reason,
+        log_excerpt=watcher.log_excerpt() if stopped_reason else "",
+        peak_rss=peak_rss[0],
+    )
+    TRACE.add_run(script_name, result)
+    return result
@@ -0,0 +1,181 @@
+"""
+Smoke runs: a shrunk working copy of the scripts for the fix loop.
+
+The fix loop only needs to know whether the scripts work, so each attempt
+first runs a copy of the run script with sim_max and the worker count cut
+down and a wall-clock limit added. The copy lives in an attempt workspace
+(_attempts/smoke/, or _attempts/<attempt>_smoke/ for a racing candidate)
+with the other files of the workspace; the real scripts are not modified.
+The full-size run happens only once the smoke run passes.
+
+The run script is edited in place at the source level (not re-generated
+from the AST), so line numbers in smoke tracebacks match the real script.
+"""
+
+import ast
+
+from .runner import FATAL_PATTERNS, FailFastWatcher, run_script
+
+SMOKE_ATTEMPT = "smoke"
+
+# Defaults for the shrunk ensemble
+SMOKE_SIM_MAX = 4
+SMOKE_WORKERS = 2
+SMOKE_WALLCLOCK = 60
+
+# Runner timeout for a smoke run, on top of its wall-clock limit
+SMOKE_TIMEOUT_GRACE = 30
+
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _int_constant(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+        return node.value
+    return None
+
+
+class _Editor:
+    """Collects source edits by AST position and applies them without moving lines"""
+
+    def __init__(self, source):
+        self.data = source.encode("utf-8")
+        self.line_starts = [0]
+        for i, byte in enumerate(self.data):
+            if byte == 0x0A:
+                self.line_starts.append(i + 1)
+        self.edits = []
+        self.changes = []
+
+    def _offset(self, lineno, col):
+        return self.line_starts[lineno - 1] + col
+
+    def replace(self, node, text):
+        start = self._offset(node.lineno, node.col_offset)
+        end = self._offset(node.end_lineno, node.end_col_offset)
+        self.edits.append((start, end, text))
+
+    def insert_after_open(self, node, text):
+        """Insert text right after the opening bracket of a call or dict"""
+        start = self._offset(node.lineno, node.col_offset)
+        if isinstance(node, ast.Call):
+            start = self._offset(node.func.end_lineno, node.func.end_col_offset)
+        pos = self.data.index(b"(" if isinstance(node, ast.Call) else b"{", start) + 1
+        self.edits.append((pos, pos, text))
+
+    def cap(self, value_node, limit, label):
+        """Replace an int literal (or expression) with at most limit"""
+        value = _int_constant(value_node)
+        if value is not None:
+            if value > limit:
+                self.replace(value_node, str(limit))
+                self.changes.append(f"{label} {value} -> {limit}")
+            return
+        segment = self.data[self._offset(value_node.lineno, value_node.col_offset):
+                            self._offset(value_node.end_lineno, value_node.end_col_offset)].decode()
+        if "\n" not in segment:
+            self.replace(value_node, f"min({segment}, {limit})")
+            self.changes.append(f"{label} capped at {limit}")
+
+    def apply(self):
+        data = self.data
+        for start, end, text in sorted(self.edits, reverse=True):
+            data = data[:start] + text.encode("utf-8") + data[end:]
+        return data.decode("utf-8")
+
+
+def shrink_run_script(source, sim_max=SMOKE_SIM_MAX, num_workers=SMOKE_WORKERS, wallclock=SMOKE_WALLCLOCK):
+    """Return (shrunk source, list of changes). Changes is empty if nothing could be shrunk."""
+    tree = ast.parse(source)
+    editor = _Editor(source)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) == "ExitCriteria":
+            keywords = {kw.arg: kw for kw in node.keywords if kw.arg}
+            if "sim_max" in keywords:
+                editor.cap(keywords["sim_max"].value, sim_max, "sim_max")
+            if "wallclock_max" in keywords:
+                editor.cap(keywords["wallclock_max"].value, wallclock, "wallclock_max")
+            else:
+                editor.insert_after_open(node, f"wallclock_max={wallclock}, ")
+                editor.changes.append(f"wallclock_max={wallclock}")
+        elif isinstance(node, ast.Call) and _call_name(node) == "LibeSpecs":
+            for kw in node.keywords:
+                if kw.arg == "nworkers" and _int_constant(kw.value) is not None:
+                    editor.cap(kw.value, num_workers, "nworkers")
+        elif isinstance(node, ast.Dict):
+            keys = {k.value: v for k, v in zip(node.keys, node.values)
+                    if isinstance(k, ast.Constant) and isinstance(k.value, str)}
+            if "sim_max" in keys:
+                editor.cap(keys["sim_max"], sim_max, "sim_max")
+                if "wallclock_max" not in keys:
+                    editor.insert_after_open(node, f'"wallclock_max": {wallclock}, ')
+                    editor.changes.append(f"wallclock_max={wallclock}")
+            if "nworkers" in keys and _int_constant(keys["nworkers"]) is not None:
+                editor.cap(keys["nworkers"], num_workers, "nworkers")
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id in ("num_workers", "nworkers"):
+                if _int_constant(node.value) is not None:
+                    editor.cap(node.value, num_workers, target.id)
+
+    if not any(c.startswith("sim_max") for c in editor.changes):
+        return source, []
+    return editor.apply(), editor.changes
+
+
+def smoke_attempt_name(workspace):
+    """Attempt name of the smoke run of workspace, unique among racing candidates"""
+    if workspace.parent is None:
+        return SMOKE_ATTEMPT
+    return f"{workspace.path.name}_{SMOKE_ATTEMPT}"
+
+
+def prepare_smoke_workspace(workspace, run_script_name, sim_max=SMOKE_SIM_MAX, num_workers=SMOKE_WORKERS,
+                            wallclock=SMOKE_WALLCLOCK):
+    """Attempt workspace with the workspace's files and a shrunk run script.
+
+    Returns (smoke workspace, changes), or (None, []) if the run script has nothing to shrink.
+    """
+    source = (workspace.path / run_script_name).read_text()
+    shrunk, changes = shrink_run_script(source, sim_max, num_workers, wallclock)
+    if not changes:
+        return None, []
+
+    # Fresh each time: no leftovers from the previous smoke run
+    smoke = workspace.attempt(smoke_attempt_name(workspace))
+    (smoke.path / run_script_name).write_text(shrunk)
+    return smoke, changes
+
+
+async def smoke_run(workspace, run_script_name, fatal_patterns=FATAL_PATTERNS, sim_max=SMOKE_SIM_MAX,
+                    num_workers=SMOKE_WORKERS, wallclock=SMOKE_WALLCLOCK):
+    """Run the shrunk copy of the workspace's scripts. Returns (success, error_msg)."""
+    smoke, changes = prepare_smoke_workspace(workspace, run_script_name, sim_max, num_workers, wallclock)
+    if smoke is None:
+        print("Smoke run: no sim_max to shrink in the run script, skipping")
+        return True, None
+
+    summary = ", ".join(changes)
+    print(f"\nSmoke run ({summary})...")
+    watcher = FailFastWatcher(fatal_patterns, smoke.path / "ensemble.log") if fatal_patterns else None
+    try:
+        result = await run_script(run_script_name, smoke.path, timeout=wallclock + SMOKE_TIMEOUT_GRACE,
+                                  watcher=watcher)
+    finally:
+        # A candidate's smoke run goes with the candidate; the workspace's own stays until the next one
+        if workspace.parent is not None:
+            smoke.discard()
+    if result.ok:
+        print("✓ Smoke run passed")
+        return True, None
+    print(f"✗ Smoke run {result.summary()}")
+    note = f"Smoke run of {run_script_name} with {summary} (line numbers match {run_script_name})"
+    return False, f"{note}\n{result.error_message()}"
@@ -0,0 +1,211 @@
+"""
+Stage-level timing and token instrumentation for the agents (opt-in).
+
+The agents wrap their stages (render, generate, refine, review, each fix,
+each agent turn, archiving) in TRACE.stage(name). A stage records:
+- its wall time;
+- the LLM calls made inside it, with their input/output tokens, the input
+  tokens read from or written to the provider's prompt cache, and the tool
+  calls the model asked for (from a LangChain callback handler passed to the
+  chat model);
+- the script runs inside it, with their runtime and peak RSS (recorded by
+  runner.run_script).
+
+Each finished stage is appended as one JSON line to the trace file, and a
+summary table per stage name is printed at exit. Stages can nest (a run
+inside an agent turn); the inner stage gets the tokens, tool calls and runs
+made while it is open, and the outer one's wall time includes it.
+
+Enabled with --trace [FILE] or LIBE_AGENT_TRACE=1 (or =FILE).
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_FILE = "trace.jsonl"
+
+_current = contextvars.ContextVar("trace_stage", default=None)
+
+
+def _new_record(name, attrs):
+    return {"stage": name, **attrs, "wall_s": 0.0, "input_tokens": 0, "output_tokens": 0,
+            "cache_read_tokens": 0, "cache_write_tokens": 0, "llm_calls": 0, "tool_calls": 0,
+            "calls": [], "runs": []}
+
+
+class Tracer:
+    """Collects stage records; does nothing until enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.agent = ""
+        self.run_id = ""
+        self.records = []
+        self._outside = None  # Tokens/tool calls/runs made outside any stage
+
+    def enable(self, path, agent=""):
+        self.enabled = True
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.agent = agent
+        self.run_id = f"{os.getpid()}-{hex(time.time_ns())[2:10]}"
+        self._outside = _new_record("(outside stages)", {})
+        atexit.register(self.finish)
+
+    def _target(self):
+        return _current.get() or self._outside
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        """Time a stage and collect what happens inside it"""
+        if not self.enabled:
+            yield None
+            return
+        record = _new_record(name, attrs)
+        token = _current.set(record)
+        start = time.perf_counter()
+        record["start"] = time.time()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["wall_s"] = round(time.perf_counter() - start, 4)
+            _current.reset(token)
+            self._write(record)
+
+    def wrap(self, name, coroutine):
+        """coroutine function that runs inside stage name (for agent tools)"""
+        @functools.wraps(coroutine)
+        async def traced(*args, **kwargs):
+            with self.stage(name):
+                return await coroutine(*args, **kwargs)
+        return traced
+
+    def add_llm(self, input_tokens=0, output_tokens=0, tool_calls=0, cache_read=0, cache_write=0):
+        """Record an LLM call (tool_calls: tool calls the model asked for; cache_*: prompt-cache input tokens)"""
+        if self.enabled:
+            record = self._target()
+            record["llm_calls"] += 1
+            record["input_tokens"] += input_tokens or 0
+            record["output_tokens"] += output_tokens or 0
+            record["cache_read_tokens"] += cache_read or 0
+            record["cache_write_tokens"] += cache_write or 0
+            record["tool_calls"] += tool_calls
+            record["calls"].append({"input_tokens": input_tokens or 0, "output_tokens": output_tokens or 0,
+                                    "cache_read_tokens": cache_read or 0, "cache_write_tokens": cache_write or 0})
+
+    def add_run(self, script_name, result):
+        """Record a script run (a runner.RunResult)"""
+        if self.enabled:
+            self._target()["runs"].append({
+                "script": script_name,
+                "ok": result.ok,
+                "runtime_s": round(result.duration, 4),
+                "peak_rss_mb": round(result.peak_rss / 2**20, 1) if result.peak_rss else None,
+            })
+
+    def _write(self, record):
+        record = {"run_id": self.run_id, "agent": self.agent, **record}
+        self.records.append(record)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def callbacks(self):
+        """LangChain callback handlers for the chat model, counting tokens and tool calls ([] when disabled)"""
+        if not self.enabled:
+            return []
+        return [_langchain_handler(self)]
+
+    def summary(self):
+        """Table of the stages (grouped by name, in order of first use)"""
+        groups = {}
+        for r in self.records:
+            g = groups.setdefault(r["stage"], {"n": 0, "wall": 0.0, "in": 0, "out": 0, "cached": 0,
+                                               "tools": 0, "runs": 0, "runtime": 0.0, "rss": None})
+            g["n"] += 1
+            g["wall"] += r["wall_s"]
+            g["in"] += r["input_tokens"]
+            g["out"] += r["output_tokens"]
+            g["cached"] += r.get("cache_read_tokens", 0)
+            g["tools"] += r["tool_calls"]
+            for run in r["runs"]:
+                g["runs"] += 1
+                g["runtime"] += run["runtime_s"]
+                if run["peak_rss_mb"] is not None:
+                    g["rss"] = max(g["rss"] or 0, run["peak_rss_mb"])
+        header = f"{'Stage':<18} {'Count':>5} {'Wall s':>9} {'In tok':>9} {'Cached':>9} {'Out tok':>8} " \
+                 f"{'Tools':>5} {'Runs':>4} {'Run s':>8} {'Peak RSS MB':>11}"
+        lines = [header, "-" * len(header)]
+        for name, g in groups.items():
+            rss = f"{g['rss']:.1f}" if g["rss"] is not None else "-"
+            lines.append(f"{name[:18]:<18} {g['n']:>5} {g['wall']:>9.2f} {g['in']:>9} {g['cached']:>9} "
+                         f"{g['out']:>8} {g['tools']:>5} {g['runs']:>4} {g['runtime']:>8.2f} {rss:>11}")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Write what happened outside any stage and print the summary"""
+        if not self.enabled:
+            return
+        outside = self._outside
+        if outside["llm_calls"] or outside["tool_calls"] or outside["runs"]:
+            self._write(outside)
+        self.enabled = False
+        if self.records:
+            print(f"\nStage timings (trace: {self.path}):")
+            print(self.summary())
+
+
+def _langchain_handler(tracer):
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TraceHandler(BaseCallbackHandler):
+        run_inline = True  # Keep the calling task's context, so tokens go to its stage
+
+        def on_llm_end(self, response, **kwargs):
+            input_tokens = output_tokens = tool_calls = cache_read = cache_write = 0
+            for generations in response.generations:
+                for gen in generations:
+                    message = getattr(gen, "message", None)
+                    usage = getattr(message, "usage_metadata", None) or {}
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+                    details = usage.get("input_token_details") or {}
+                    cache_read += details.get("cache_read", 0) or 0
+                    cache_write += details.get("cache_creation", 0) or 0
+                    tool_calls += len(getattr(message, "tool_calls", None) or [])
+            if not (input_tokens or output_tokens):
+                usage = (response.llm_output or {}).get("token_usage") or {}
+                input_tokens = usage.get("prompt_tokens", 0)
+                output_tokens = usage.get("completion_tokens", 0)
+            tracer.add_llm(input_tokens, output_tokens, tool_calls, cache_read, cache_write)
+
+    return TraceHandler()
+
+
+# The process-wide tracer (agent_core modules record into it)
+TRACE = Tracer()
+
+
+def start_trace(args, agent, work_dir):
+    """Enable TRACE for an agent run if --trace or LIBE_AGENT_TRACE asks for it.
+
+    The trace goes to the given file, else to <work_dir>/trace.jsonl.
+    """
+    env = os.environ.get("LIBE_AGENT_TRACE", "")
+    path = args.trace
+    if path is None and env and env.lower() not in ("0", "false", "no"):
+        path = "" if env.lower() in ("1", "true", "yes") else env
+    if path is None:
+        return None
+    TRACE.enable(path or Path(work_dir) / TRACE_FILE, agent)
+    print(f"Stage trace: {TRACE.path}")
+    return TRACE
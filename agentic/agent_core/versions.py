@@ -0,0 +1,131 @@
+"""
+Content-addressed version archive for generated_scripts/versions/.
+
+Each file content is stored once as a blob under versions/_objects/ (named by
+its sha256). A version directory versions/<name>/ holds a manifest.json
+(filename -> sha256) and the scripts themselves as hardlinks to the blobs
+(copies where hardlinks are not supported), so tools that just list
+versions/<name>/*.py, such as the web UI, keep working.
+
+Saving a version only hashes files whose size/mtime changed since they were
+last seen, and only writes blobs that are not already stored.
+"""
+
+import functools
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from .bundle import sha256_text
+
+OBJECTS_DIR = "_objects"
+MANIFEST = "manifest.json"
+
+
+class VersionStore:
+    """Versions of the scripts in a work directory, deduplicated by content"""
+
+    def __init__(self, work_dir):
+        self.work_dir = Path(work_dir)
+        self.versions_dir = self.work_dir / "versions"
+        self.objects_dir = self.versions_dir / OBJECTS_DIR
+        # path -> (size, mtime_ns, sha256) for work dir files already hashed
+        self._stat_cache = {}
+
+    def blob_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def version_dir(self, name):
+        return self.versions_dir / name
+
+    def _store_blob(self, digest, content):
+        """Write a blob unless present. Safe against concurrent writers of the same blob."""
+        path = self.blob_path(digest)
+        if path.exists():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp, 0o444)  # Blobs are shared by hardlinks; keep them read-only
+        os.replace(tmp, path)
+        return path
+
+    def _link(self, blob, dest):
+        if dest.exists():
+            if dest.samefile(blob):
+                return
+            dest.unlink()
+        try:
+            os.link(blob, dest)
+        except OSError:
+            shutil.copyfile(blob, dest)
+
+    def _write_version(self, name, entries):
+        """entries: filename -> sha256 (blobs already stored)"""
+        version_dir = self.version_dir(name)
+        version_dir.mkdir(parents=True, exist_ok=True)
+        for filename, digest in entries.items():
+            self._link(self.blob_path(digest), version_dir / filename)
+        manifest = self.manifest(name)
+        manifest.update(entries)
+        (version_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+        return version_dir
+
+    def save(self, name, bundle):
+        """Save a script bundle as version <name>"""
+        entries = {}
+        for entry in bundle:
+            digest = entry.get("sha256") or sha256_text(entry["content"])
+            if not self.blob_path(digest).exists():
+                self._store_blob(digest, entry["content"])
+            entries[entry["filename"]] = digest
+        return self._write_version(name, entries)
+
+    def _hash_work_file(self, path):
+        stat = path.stat()
+        cached = self._stat_cache.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2], None
+        content = path.read_text()
+        digest = sha256_text(content)
+        self._stat_cache[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest, content
+
+    def snapshot(self, name, pattern="*.py"):
+        """Save the work directory files matching pattern as version <name>"""
+        entries = {}
+        for path in sorted(self.work_dir.glob(pattern)):
+            if not path.is_file():
+                continue
+            digest, content = self._hash_work_file(path)
+            if not self.blob_path(digest).exists():
+                self._store_blob(digest, content if content is not None else path.read_text())
+            entries[path.name] = digest
+        return self._write_version(name, entries)
+
+    def manifest(self, name):
+        """filename -> sha256 for a version ({} if it has no manifest)"""
+        path = self.version_dir(name) / MANIFEST
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    def load(self, name):
+        """Bundle of a version, read from the blob store"""
+        return [
+            {"filename": filename, "content": self.blob_path(digest).read_text(), "sha256": digest}
+            for filename, digest in sorted(self.manifest(name).items())
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def _store_for(work_dir):
+    return VersionStore(work_dir)
+
+
+def version_store(work_dir):
+    """Shared VersionStore for a work directory (keeps its hash cache across calls)"""
+    return _store_for(Path(work_dir).resolve())
@@ -0,0 +1,273 @@
+"""
+Workspaces: the working directory of one agent run, or of one attempt in it.
+
+A Workspace owns a directory (generated_scripts/ by default) holding the
+scripts, the run outputs (ensemble/, libE_stats.txt, *.npy, ...) and the
+versions/ archive. While an agent uses it, it holds a lock on
+<dir>/.workspace.lock, so a second agent started in the same checkout does
+not move it aside; it gets the next free generated_scripts_<n>/ instead.
+The lock file records the agent's pid, so tools that started the agent can
+find the directory it ended up in (find_workspace).
+
+Version numbers (versions/<n>_<action>/) are reserved under a lock on
+versions/, so concurrent attempts never get the same number.
+
+Attempt workspaces (<dir>/_attempts/<name>/) let several runs of the same
+scripts proceed side by side. Their files are cloned from the parent: as
+reflinks where the filesystem supports them (btrfs, XFS, ...), else as
+hardlinks for the files a run only reads, else as copies. They archive into
+the parent's versions/.
+"""
+
+import fcntl
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+from .bundle import read_bundle, write_bundle
+from .run_archive import move_run_outputs
+from .trace import TRACE, TRACE_FILE
+from .versions import version_store
+
+DEFAULT_WORK_DIR = "generated_scripts"
+
+# Directory where existing workspaces are moved (created if missing)
+ARCHIVE_RUNS_DIR = "archive_runs"
+
+ATTEMPTS_DIR = "_attempts"
+LOCK_FILE = ".workspace.lock"
+VERSIONS_LOCK = ".numbering.lock"
+
+# Workspace entries not cloned into attempt workspaces
+CLONE_SKIP = ("versions", ATTEMPTS_DIR, LOCK_FILE, TRACE_FILE)
+
+# Scripts may be edited in an attempt, so they are never hardlinked
+SCRIPT_SUFFIXES = (".py",)
+
+CLONE_METHODS = ("auto", "reflink", "hardlink", "copy")
+
+# Linux ioctl sharing the extents of one file with another (cp --reflink)
+FICLONE = 0x40049409
+
+_VERSION_NUMBER = re.compile(r"^(\d+)_")
+
+
+def _reflink(src, dst):
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        Path(dst).unlink(missing_ok=True)
+        raise
+    shutil.copystat(src, dst)
+
+
+def clone_file(src, dst, method="auto"):
+    """Copy src to dst as cheaply as the filesystem allows. Returns the method used.
+
+    auto tries a reflink, then a hardlink (not for scripts), then a copy.
+    """
+    src, dst = Path(src), Path(dst)
+    if method in ("auto", "reflink"):
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except OSError:
+            if method == "reflink":
+                raise
+    if method in ("auto", "hardlink") and src.suffix not in SCRIPT_SUFFIXES:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            if method == "hardlink":
+                raise
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def clone_files(src_dir, dst_dir, method="auto", skip=CLONE_SKIP):
+    """Clone the top-level files of src_dir into dst_dir. Returns {method: count}."""
+    used = {}
+    for path in Path(src_dir).iterdir():
+        if path.is_file() and path.name not in skip:
+            how = clone_file(path, Path(dst_dir) / path.name, method)
+            used[how] = used.get(how, 0) + 1
+    return used
+
+
+def _try_lock(path):
+    """Open and exclusively lock path. Returns the open file, or None if another process holds it.
+
+    If path is moved away while it is being locked (its workspace archived), the file now at path is
+    locked instead; FileNotFoundError if its directory is gone.
+    """
+    while True:
+        fh = open(path, "a")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            fh.close()
+            return None
+        try:
+            if os.path.samestat(os.fstat(fh.fileno()), os.stat(path)):
+                return fh
+        except FileNotFoundError:
+            pass
+        fh.close()
+
+
+def find_workspace(pid, path=DEFAULT_WORK_DIR):
+    """The workspace directory (path or path_<n>) opened by process pid, or None"""
+    base = Path(path)
+    for candidate in [base, *sorted(base.parent.glob(f"{base.name}_[0-9]*"))]:
+        try:
+            owner = (candidate / LOCK_FILE).read_text().strip()
+        except OSError:
+            continue
+        if owner == str(pid):
+            return candidate
+    return None
+
+
+class Workspace:
+    """Working directory of an agent run or attempt, with its version archive"""
+
+    def __init__(self, path, parent=None):
+        self.path = Path(path)
+        self.parent = parent
+        self.root = parent.root if parent else self
+        self.current = None  # Name of the version the scripts in path belong to
+        self._lock = None
+
+    @classmethod
+    def open(cls, path=DEFAULT_WORK_DIR, archive_parent=ARCHIVE_RUNS_DIR):
+        """Fresh, locked workspace for an agent run.
+
+        An existing directory is moved to archive_parent/<name>_<unique> first,
+        unless another agent is using it; then <path>_2, <path>_3, ... is tried.
+        """
+        base = Path(path)
+        candidate, n = base, 1
+        moved = None  # Lock of the workspace moved aside, held until the new one is locked
+        try:
+            while True:
+                if candidate.exists():
+                    try:
+                        lock = _try_lock(candidate / LOCK_FILE)
+                    except FileNotFoundError:
+                        continue  # Moved aside by another agent meanwhile
+                    if lock is None:
+                        n += 1
+                        candidate = base.with_name(f"{base.name}_{n}")
+                        continue
+                    # The lock follows the file into the archive, so no other agent
+                    # can take the directory while it is being moved
+                    archive_dir = Path(archive_parent)
+                    archive_dir.mkdir(parents=True, exist_ok=True)
+                    dest = archive_dir / f"{candidate.name}_{hex(time.time_ns())[2:10]}"
+                    shutil.move(str(candidate), str(dest))
+                    print(f"Moved existing {candidate} to {dest}")
+                    if moved:
+                        moved.close()
+                    moved = lock
+                # Created locked under a private name, then renamed into place, so no
+                # other agent ever sees it unlocked
+                staging = candidate.with_name(f".{candidate.name}.{os.getpid()}")
+                shutil.rmtree(staging, ignore_errors=True)
+                staging.mkdir(parents=True)
+                lock = _try_lock(staging / LOCK_FILE)
+                lock.write(f"{os.getpid()}\n")
+                lock.flush()
+                try:
+                    os.rename(staging, candidate)
+                except OSError:
+                    lock.close()  # Another agent created it meanwhile
+                    shutil.rmtree(staging, ignore_errors=True)
+                    continue
+                workspace = cls(candidate)
+                workspace._lock = lock
+                if candidate != base:
+                    print(f"{base} is in use by another agent - using {candidate}")
+                return workspace
+        finally:
+            if moved:
+                moved.close()
+
+    def __fspath__(self):
+        return str(self.path)
+
+    def __str__(self):
+        return str(self.path)
+
+    def __truediv__(self, other):
+        return self.path / other
+
+    @property
+    def versions_dir(self):
+        return self.root.path / "versions"
+
+    @property
+    def store(self):
+        return version_store(self.root.path)
+
+    def new_version(self, action):
+        """Reserve versions/<n>_<action>/ with the next free n and make it current. Returns the name."""
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.versions_dir / VERSIONS_LOCK, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            numbers = [int(m.group(1)) for m in map(_VERSION_NUMBER.match, os.listdir(self.versions_dir)) if m]
+            name = f"{max(numbers, default=0) + 1}_{action}"
+            (self.versions_dir / name).mkdir()
+        self.current = name
+        return name
+
+    def save(self, bundle, action=None):
+        """Write a bundle into the workspace; with action, also archive it as a new version"""
+        with TRACE.stage("archive"):
+            write_bundle(bundle, self.path)
+            if action:
+                self.store.save(self.new_version(action), bundle)
+        return self.current
+
+    def snapshot(self, name=None, pattern="*.py"):
+        """Archive the workspace's scripts as version name (default: the current version)"""
+        name = name or self.current
+        with TRACE.stage("archive"):
+            if self.root is self:
+                return self.store.snapshot(name, pattern)
+            return self.store.save(name, read_bundle(self.path, pattern))
+
+    def archive_outputs(self, items, error_msg="", name=None):
+        """Move run outputs (names or globs) into versions/<name>/output/. Returns that directory."""
+        name = name or self.current
+        with TRACE.stage("archive"):
+            return move_run_outputs(self.path, self.versions_dir / name / "output", items, error_msg)
+
+    def attempt(self, name, method="auto"):
+        """Fresh attempt workspace <root>/_attempts/<name>/ with the files of this workspace cloned in"""
+        path = self.root.path / ATTEMPTS_DIR / name
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+        clone_files(self.path, path, method)
+        attempt = Workspace(path, parent=self)
+        attempt.current = self.current
+        return attempt
+
+    def discard(self):
+        """Remove an attempt workspace (and _attempts/ once empty)"""
+        if self.parent is None:
+            raise ValueError("Only attempt workspaces can be discarded")
+        shutil.rmtree(self.path, ignore_errors=True)
+        try:
+            self.path.parent.rmdir()
+        except OSError:
+            pass
+
+    def close(self):
+        if self._lock:
+            self._lock.close()
+            self._lock = None
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Offline regression and performance benchmark of the agents over agentic/tests.
+
+Runs every agent variant (AGENTS) on every broken-script fixture (FIXTURES),
+concurrently (one run per CPU by default, so that contention does not
+dominate the timings), each as its own process with --trace, against:
+- a scripted LLM: agent_core.mock_llm serving the OpenAI API on localhost.
+  It answers fix prompts with search/replace edits (or whole files with
+  --full-rewrites) and drives the tool agents with run_script, read_file and
+  write_file calls. It only fixes the bugs named in the error it is shown,
+  so a fixture takes as many iterations as with a model that fixes what it
+  is told;
+- benchmarks/stubs/libensemble on PYTHONPATH (a few sim_f calls instead of
+  an ensemble), and the six_hump_camel application compiled from
+  tests/six_hump_camel (stubs/six_hump_camel_app.py without a C compiler).
+
+Reports, from the agents' traces, per agent and fixture: success rate,
+iterations to green (the check round, from 1, of the first successful run),
+wall time per stage, and LLM calls and tokens. Exits 1 if a run did not
+succeed.
+
+--save FILE writes the results as JSON; --baseline FILE compares with such a
+file and exits 1 on a regression: a lower success rate, more iterations, or
+wall time or tokens above the baseline by more than --tolerance.
+
+--out DIR keeps the runs' workspaces, traces and output; it must be a new or
+empty directory.
+
+Needs the agents' packages (langchain, langchain-openai) and the fixtures'
+(numpy, jinja2); no libEnsemble, MPI, API key or network.
+
+Usage (from agentic/):
+    python benchmarks/bench_agents.py [--agents basic,basic_auto] [--fixtures scripts_with_errors]
+        [--repeat 3] [--save bench.json] [--baseline bench.json]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+
+AGENTIC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AGENTIC_DIR))
+
+from agent_core.bundle import parse_bundle_text  # noqa: E402
+from agent_core.llm import DEFAULT_OPENAI_MODEL  # noqa: E402
+from agent_core.mock_llm import MockLLM, serve  # noqa: E402
+from agent_core.patches import FULL_REPLY_FORMAT, PATCH_REPLY_FORMAT  # noqa: E402
+from agent_core.trace import TRACE_FILE  # noqa: E402
+
+TESTS_DIR = AGENTIC_DIR / "tests"
+STUBS_DIR = Path(__file__).resolve().parent / "stubs"
+
+# Agent variants: name -> script (relative to agentic/)
+AGENTS = {
+    "basic": "libe_agent_basic.py",
+    "with_script_generator": "libe_agent_with_script_generator.py",
+    "interactive": "libe_agent_interactive.py",
+    "basic_auto": "libe_agent_basic_auto.py",
+    "llm_first": "libe_agent_interactive_llm_first.py",
+    "ensemble_agent": "../ensemble_agent.py",
+}
+
+# Packages the agents and the fixture scripts need
+REQUIRED_MODULES = ("langchain", "langchain_openai", "pydantic", "numpy", "jinja2")
+
+
+@dataclass
+class Fix:
+    """A bug in a fixture: old -> new in filename, fixed once trigger appears in an error"""
+    filename: str
+    old: str
+    new: str
+    trigger: str
+
+
+# Paths hard-coded in scripts_with_exe_with_errors/run_example.py
+FIXTURE_APP = "/home/shudson/test_mcp/script-creator/agentic/tests/six_hump_camel/six_hump_camel.x"
+FIXTURE_INPUT = "/home/shudson/test_mcp/script-creator/agentic/tests/six_hump_camel/input.txt"
+
+# Fixtures (directories in tests/) and the fixes the scripted LLM knows for them.
+# {sim_app} and {input_file} are the benchmark's application and its input file.
+FIXTURES = {
+    "scripts_with_errors": [
+        Fix("run_example.py", "sim_f=run_six_hump_camel,", "sim_f=six_hump_camel,", "run_six_hump_camel"),
+    ],
+    "scripts_with_exe_with_errors": [
+        Fix("set_objective.py", "applenp.", "np.", "applenp"),
+        Fix("simf.py", "set_objectiveZIP_value()", "set_objective_value()", "set_objectiveZIP_value"),
+        Fix("run_example.py", FIXTURE_APP, "{sim_app}", "Application not found"),
+        Fix("run_example.py", FIXTURE_INPUT, "{input_file}", "Application not found"),
+    ],
+}
+
+# Runs of the script after which the scripted tool agent gives up
+MAX_TOOL_RUNS = 4
+
+# Stages in which the agents change the scripts, and in which they check them
+EDIT_STAGES = ("fix", "race", "write")
+CHECK_STAGES = ("validate", "run")
+
+# Wall time differences below this are not reported as regressions (seconds)
+MIN_WALL_DELTA = 0.5
+
+ERROR_MARKER = "failed with the following error:"
+
+
+# ── Scripted LLM ──
+
+def _text(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _triggered(fixes, error):
+    return [fix for fix in fixes if fix.trigger in error]
+
+
+def _apply(filename, content, fixes):
+    for fix in fixes:
+        if fix.filename == filename:
+            content = content.replace(fix.old, fix.new)
+    return content
+
+
+class ScriptedLLM(MockLLM):
+    """Mock OpenAI endpoint replying like a model that fixes the errors it is shown.
+
+    Each agent run uses base URL /<key>/v1; runs[key] holds the fixes of its fixture.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.runs = {}
+
+    def log(self, line):
+        pass
+
+    def respond(self, body, path):
+        fixes = self.runs.get(path.strip("/").split("/")[0], [])
+        messages = body.get("messages") or []
+        tools = {tool["function"]["name"] for tool in body.get("tools") or []}
+        if "run_script" in tools:
+            return self.tool_step(messages, fixes)
+        return self.edit_reply(_text(messages[-1]) if messages else "", fixes)
+
+    def edit_reply(self, prompt, fixes):
+        """Search/replace blocks (or whole files) fixing the bugs named in a fix prompt's error"""
+        if ERROR_MARKER not in prompt:
+            return "NO CHANGES", []
+        scripts_text, error = prompt.split(ERROR_MARKER, 1)
+        for reply_format, patch in ((PATCH_REPLY_FORMAT, True), (FULL_REPLY_FORMAT, False)):
+            cut = scripts_text.find(reply_format.splitlines()[0])
+            if cut >= 0:
+                break
+        else:
+            return "NO CHANGES", []
+
+        chosen = _triggered(fixes, error)
+        sections = []
+        for entry in parse_bundle_text(scripts_text[:cut]):
+            name, content = entry["filename"], entry["content"]
+            fixed = _apply(name, content, chosen)
+            if not patch:
+                sections.append(f"=== {name} ===\n{fixed}")
+            elif fixed != content:
+                blocks = [f"<<<<<<< SEARCH\n{old}\n=======\n{new}\n>>>>>>> REPLACE"
+                          for old, new in zip(content.splitlines(), fixed.splitlines()) if old != new]
+                sections.append(f"=== {name} ===\n" + "\n".join(blocks))
+        if patch and not sections:
+            return "I cannot tell how to fix this error.", []
+        return "\n\n".join(sections), []
+
+    def tool_step(self, messages, fixes):
+        """Next step of a tool agent: run the script, read the files to fix, write them, run again"""
+        calls = {}
+        runs = []
+        goal = ""
+        for message in messages:
+            if message.get("role") == "user":
+                goal = _text(message)
+            for call in message.get("tool_calls") or []:
+                calls[call["id"]] = (call["function"]["name"], json.loads(call["function"]["arguments"] or "{}"))
+            if message.get("role") == "tool" and calls.get(message.get("tool_call_id"), ("",))[0] == "run_script":
+                runs.append(_text(message))
+        # Results of the tool calls of the last AI message
+        latest = []
+        for message in reversed(messages):
+            if message.get("role") != "tool":
+                break
+            name, args = calls.get(message.get("tool_call_id"), ("", {}))
+            latest.insert(0, (name, args, _text(message)))
+
+        match = re.search(r"'(run_[\w-]*\.py)'", goal)
+        script = match.group(1) if match else "run_libe.py"
+        run = [{"name": "run_script", "args": {"script_name": script}}]
+        step = latest[-1][0] if latest else ""
+
+        if step == "run_script":
+            result = latest[-1][2]
+            if result.startswith("SUCCESS"):
+                return f"{script} ran successfully.", []
+            if len(runs) >= MAX_TOOL_RUNS:
+                return f"Giving up after {len(runs)} runs of {script}.", []
+            files = dict.fromkeys(fix.filename for fix in _triggered(fixes, result))
+            if not files:
+                return "I cannot tell how to fix this error.", []
+            return "", [{"name": "read_file", "args": {"filepath": name}} for name in files]
+        if step == "read_file":
+            chosen = _triggered(fixes, runs[-1] if runs else "")
+            writes = []
+            for _, args, content in latest:
+                fixed = _apply(args.get("filepath"), content, chosen)
+                if fixed != content:
+                    writes.append({"name": "write_file", "args": {"filepath": args["filepath"], "content": fixed}})
+            return ("", writes) if writes else ("I cannot tell how to fix this error.", [])
+        return "", run
+
+
+# ── Runs ──
+
+@dataclass
+class RunResult:
+    agent: str
+    fixture: str
+    repeat: int
+    ok: bool = False
+    iterations: int = None
+    wall_s: float = 0.0
+    exit_code: int = None
+    llm_calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    stages: dict = field(default_factory=dict)  # Stage name -> wall time (s)
+    error: str = ""
+
+
+def read_trace(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def trace_metrics(result, records):
+    """Fill result from an agent run's trace records"""
+    rounds, edited = 1, False
+    for record in sorted(records, key=lambda r: r.get("start", 0)):
+        name = record["stage"]
+        result.llm_calls += record["llm_calls"]
+        result.input_tokens += record["input_tokens"]
+        result.cached_tokens += record.get("cache_read_tokens", 0)
+        result.output_tokens += record["output_tokens"]
+        result.stages[name] = round(result.stages.get(name, 0.0) + record["wall_s"], 4)
+        if name in EDIT_STAGES:
+            edited = True
+        elif name in CHECK_STAGES or record["runs"]:
+            if edited:
+                rounds += 1
+                edited = False
+            if not result.ok and any(run["ok"] for run in record["runs"]):
+                result.ok, result.iterations = True, rounds
+    return result
+
+
+def build_app(out_dir):
+    """(application, its input file, how it was made): compiled from tests/six_hump_camel, else the stand-in"""
+    app_dir = out_dir / "six_hump_camel"
+    app_dir.mkdir(parents=True, exist_ok=True)
+    source = TESTS_DIR / "six_hump_camel"
+    shutil.copy(source / "input.txt", app_dir)
+    app = app_dir / "six_hump_camel.x"
+    cc = shutil.which("cc") or shutil.which("gcc")
+    if cc and subprocess.run([cc, "-O2", "-o", str(app), str(source / "six_hump_camel.c"), "-lm"],
+                             capture_output=True).returncode == 0:
+        return app, app_dir / "input.txt", f"compiled with {Path(cc).name}"
+    shutil.copy(STUBS_DIR / "six_hump_camel_app.py", app)
+    app.chmod(0o755)
+    return app, app_dir / "input.txt", "Python stand-in"
+
+
+def agent_env(sims):
+    """Environment of the agent runs: scripted LLM only, stub libEnsemble, no user agent settings.
+
+    This interpreter's directory comes first on PATH, so the scripts the agents
+    run with `python` get the same environment (e.g. a virtualenv's numpy).
+    """
+    env = {k: v for k, v in os.environ.items()
+           if not k.startswith(("ANTHROPIC_", "OPENAI_", "LIBE_AGENT_", "ENSEMBLE_AGENT_", "LLM_"))}
+    env.update(OPENAI_API_KEY="scripted", LLM_MODEL=DEFAULT_OPENAI_MODEL, LIBE_AGENT_RENDERER="python",
+               LIBE_STUB_SIMS=str(sims), NO_PROXY="127.0.0.1,localhost", no_proxy="127.0.0.1,localhost",
+               PYTHONPATH=os.pathsep.join(p for p in (str(STUBS_DIR), env.get("PYTHONPATH")) if p),
+               PATH=os.pathsep.join(p for p in (os.path.dirname(sys.executable), env.get("PATH")) if p))
+    return env
+
+
+async def run_agent(result, run_dir, base_url, env, timeout):
+    """Run one agent on one fixture and fill result from its trace"""
+    run_dir.mkdir(parents=True)
+    trace = run_dir / TRACE_FILE
+    command = [sys.executable, str(AGENTIC_DIR / AGENTS[result.agent]), "--scripts", str(TESTS_DIR / result.fixture),
+               "--work-dir", str(run_dir / "work"), "--trace", str(trace), "--no-llm-cache"]
+    start = time.perf_counter()
+    with open(run_dir / "output.log", "wb") as log:
+        process = await asyncio.create_subprocess_exec(
+            *command, cwd=run_dir, env={**env, "OPENAI_BASE_URL": base_url},
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            result.exit_code = await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+            result.error = f"timed out after {timeout:.0f} s"
+    result.wall_s = round(time.perf_counter() - start, 3)
+    records = read_trace(trace)
+    trace_metrics(result, records)
+    if not result.error and not records:
+        result.error = f"no trace (exit code {result.exit_code}, see {run_dir / 'output.log'})"
+    elif not result.error and not result.ok:
+        result.error = "no successful run"
+    return result
+
+
+# ── Report ──
+
+def summarize(results):
+    """Per agent/fixture pair: success count, and medians of iterations, wall time and tokens"""
+    pairs = {}
+    for r in results:
+        pairs.setdefault(f"{r.agent}/{r.fixture}", []).append(r)
+    summary = {}
+    for key, runs in pairs.items():
+        green = [r for r in runs if r.ok]
+        stages = dict.fromkeys(name for r in runs for name in r.stages)
+        summary[key] = {
+            "agent": runs[0].agent, "fixture": runs[0].fixture,
+            "runs": len(runs), "succeeded": len(green),
+            "iterations": statistics.median(r.iterations for r in green) if green else None,
+            "wall_s": round(statistics.median(r.wall_s for r in runs), 3),
+            **{name: statistics.median(getattr(r, name) for r in runs)
+               for name in ("llm_calls", "input_tokens", "cached_tokens", "output_tokens")},
+            "stages": {name: round(statistics.mean(r.stages.get(name, 0.0) for r in runs), 4) for name in stages},
+        }
+    return summary
+
+
+def print_report(summary, results):
+    header = f"{'Agent':<22} {'Fixture':<29} {'OK':>5} {'Iter':>5} {'Wall s':>7} {'LLM':>4} " \
+             f"{'In tok':>8} {'Cached':>7} {'Out tok':>7}"
+    print(f"\n{header}\n{'-' * len(header)}")
+    for s in summary.values():
+        iterations = f"{s['iterations']:g}" if s["iterations"] is not None else "-"
+        print(f"{s['agent'][:22]:<22} {s['fixture'][:29]:<29} {s['succeeded']:>2}/{s['runs']:<2} {iterations:>5} "
+              f"{s['wall_s']:>7.2f} {s['llm_calls']:>4g} {s['input_tokens']:>8g} {s['cached_tokens']:>7g} "
+              f"{s['output_tokens']:>7g}")
+
+    agents = dict.fromkeys(s["agent"] for s in summary.values())
+    header = f"{'Agent':<22} {'Success':>8} {'Mean iter':>9} {'Mean wall s':>11} {'Tokens':>8}"
+    print(f"\n{header}\n{'-' * len(header)}")
+    for agent in agents:
+        runs = [r for r in results if r.agent == agent]
+        green = [r for r in runs if r.ok]
+        iterations = f"{statistics.mean(r.iterations for r in green):.1f}" if green else "-"
+        print(f"{agent[:22]:<22} {len(green) / len(runs):>7.0%} {iterations:>9} "
+              f"{statistics.mean(r.wall_s for r in runs):>11.2f} "
+              f"{statistics.mean(r.input_tokens + r.output_tokens for r in runs):>8.0f}")
+
+    stages = dict.fromkeys(name for r in results for name in r.stages)
+    header = f"{'Stage':<18} {'Runs':>5} {'Mean s':>8} {'Max s':>8}"
+    print(f"\n{header}\n{'-' * len(header)}")
+    for name in stages:
+        walls = [r.stages[name] for r in results if name in r.stages]
+        print(f"{name[:18]:<18} {len(walls):>5} {statistics.mean(walls):>8.2f} {max(walls):>8.2f}")
+
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        print(f"✗ {r.agent}/{r.fixture} (repeat {r.repeat}): {r.error}")
+
+
+def regressions(summary, baseline, tolerance):
+    """Regressions of summary against a baseline summary, as messages"""
+    problems = []
+    for key, now in summary.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if now["succeeded"] / now["runs"] < before["succeeded"] / before["runs"]:
+            problems.append(f"{key}: succeeded {now['succeeded']}/{now['runs']} "
+                            f"(baseline {before['succeeded']}/{before['runs']})")
+        if before["iterations"] is not None and now["iterations"] is not None \
+                and now["iterations"] > before["iterations"]:
+            problems.append(f"{key}: {now['iterations']:g} iterations (baseline {before['iterations']:g})")
+        for metric in ("wall_s", "input_tokens", "output_tokens"):
+            limit = before[metric] * (1 + tolerance)
+            if metric == "wall_s":
+                limit = max(limit, before[metric] + MIN_WALL_DELTA)
+            if before[metric] and now[metric] > limit:
+                problems.append(f"{key}: {metric} {now[metric]:g} (baseline {before[metric]:g}, "
+                                f"+{now[metric] / before[metric] - 1:.0%})")
+    return problems
+
+
+def _names(value, known, what):
+    names = [n.strip() for n in value.split(",") if n.strip()] if value else list(known)
+    unknown = [n for n in names if n not in known]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown {what}: {', '.join(unknown)} (choose from {', '.join(known)})")
+    return names
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the agents over the agentic/tests fixtures")
+    parser.add_argument("--agents", type=lambda v: _names(v, AGENTS, "agent"), default=list(AGENTS),
+                        help=f"Comma-separated agents (default: all of {','.join(AGENTS)})")
+    parser.add_argument("--fixtures", type=lambda v: _names(v, FIXTURES, "fixture"), default=list(FIXTURES),
+                        help=f"Comma-separated fixtures in tests/ (default: {','.join(FIXTURES)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each agent/fixture pair (default: 1)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Agent runs at the same time, 0 for all at once (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=600, help="Timeout per agent run in seconds (default: 600)")
+    parser.add_argument("--sims", type=int, default=4, help="Simulations per stub ensemble run (default: 4)")
+    parser.add_argument("--out", help="Directory for the runs' workspaces, traces and output (default: a temp dir)")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare with the results saved by an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed increase of wall time and tokens over the baseline (default: 0.25)")
+    args = parser.parse_args()
+
+    missing = [name for name in REQUIRED_MODULES if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"Error: missing packages for {sys.executable}: {', '.join(missing)}")
+        sys.exit(2)
+
+    out_dir = Path(args.out or tempfile.mkdtemp(prefix="bench_agents_")).resolve()
+    if out_dir.exists() and any(out_dir.iterdir()):
+        print(f"Error: --out {out_dir} is not empty (an earlier benchmark's runs?) - give a new or empty directory")
+        sys.exit(2)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    app, input_file, app_kind = build_app(out_dir)
+
+    llm = ScriptedLLM()
+    server = serve(0, mock=llm)
+    url = f"http://127.0.0.1:{server.server_port}"
+    env = agent_env(args.sims)
+
+    jobs = []
+    for agent in args.agents:
+        for fixture in args.fixtures:
+            for repeat in range(1, args.repeat + 1):
+                key = f"{agent}-{fixture}-{repeat}"
+                llm.runs[key] = [replace(fix, new=fix.new.format(sim_app=app, input_file=input_file))
+                                 for fix in FIXTURES[fixture]]
+                jobs.append((RunResult(agent, fixture, repeat), out_dir / key, f"{url}/{key}/v1"))
+    print(f"{len(jobs)} agent runs ({len(args.agents)} agents x {len(args.fixtures)} fixtures x {args.repeat}), "
+          f"{min(args.jobs, len(jobs)) or len(jobs)} at a time")
+    print(f"Application: {app} ({app_kind})\nOutput: {out_dir}\n")
+
+    limit = asyncio.Semaphore(args.jobs or len(jobs))
+    done = 0
+
+    async def limited(result, run_dir, base_url):
+        nonlocal done
+        async with limit:
+            await run_agent(result, run_dir, base_url, env, args.timeout)
+        done += 1
+        status = f"succeeded in {result.iterations} iteration(s)" if result.ok else f"failed: {result.error}"
+        print(f"[{done}/{len(jobs)}] {result.agent}/{result.fixture}: {status} ({result.wall_s:.2f} s)", flush=True)
+        return result
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(limited(*job) for job in jobs))
+    finally:
+        server.shutdown()
+    total = time.perf_counter() - start
+
+    summary = summarize(results)
+    print_report(summary, results)
+    print(f"\nTotal wall time: {total:.2f} s")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"), "python": sys.version.split()[0],
+            "application": app_kind, "sims": args.sims, "total_wall_s": round(total, 3),
+            "summary": summary, "runs": [asdict(r) for r in results],
+        }, indent=2))
+        print(f"Results saved to {args.save}")
+
+    problems = []
+    if args.baseline:
+        problems = regressions(summary, json.loads(Path(args.baseline).read_text())["summary"], args.tolerance)
+        print(f"\nRegressions against {args.baseline}:" if problems else f"\n✓ No regressions against {args.baseline}")
+        for problem in problems:
+            print(f"  ✗ {problem}")
+    if problems or not all(r.ok for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process Python renderer against the stdio MCP round trip.
+
+Measures, for each path:
+- cold start: time to a usable session (process start, initialize, list_tools)
+- per call: mean/median latency of CreateLibEnsembleScripts calls
+
+and checks that both paths return byte-identical output for a set of cases.
+
+The Node path needs Node.js, `npm install` in the repo root and the mcp
+Python package. If those are missing it is skipped.
+
+Usage (from agentic/):
+    python benchmarks/bench_renderer.py [--calls 200] [--mcp-server ../mcp_server.mjs]
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_core.generator_session import open_generator_session  # noqa: E402
+from agent_core.renderer import TOOL_NAME  # noqa: E402
+
+CASES = [
+    {
+        "app_ref": "six_hump_camel", "num_workers": "4", "max_sims": "100", "dimension": "2",
+        "sim_app": "/path/to/six_hump_camel.x", "input_path": "/path/to/input.txt",
+        "templated_enable": True, "template_vars": ["X0", "X1"],
+        "gen_module": "persistent_aposmm", "gen_function": "aposmm",
+        "output_file_name": "output.txt", "input_usage": "cmdline", "nodes": "1", "procs": "1",
+    },
+    {
+        "app_ref": "forces", "num_workers": "8", "max_sims": "64", "dimension": "3",
+        "sim_app": "/path/to/forces.x", "input_path": "/path/to/inputs", "input_type": "directory",
+        "templated_enable": True, "templated_filename": "forces.in", "template_vars": ["a", "b", " "],
+        "gen_module": "persistent_sampling", "gen_function": "persistent_uniform",
+        "cluster_enable": True, "cluster_total_nodes": "2", "scheduler_type": "slurm", "gpus": "4",
+    },
+    {
+        "app_ref": "warpx", "num_workers": "4", "max_sims": "20",
+        "gen_module": "persistent_gpCAM", "gen_function": "persistent_gpCAM_covar",
+        "auto_gpus": True, "cluster_enable": True, "scheduler_type": "pbs",
+    },
+    {},
+]
+
+
+def python_cold_start():
+    """Fresh interpreter: import renderer, construct it, list tools and render once"""
+    code = (
+        "import asyncio\n"
+        "from agent_core.renderer import RendererSession\n"
+        "async def main():\n"
+        "    s = RendererSession()\n"
+        "    await s.initialize()\n"
+        "    await s.list_tools()\n"
+        "    await s.call_tool('CreateLibEnsembleScripts', {'app_ref': 'x'})\n"
+        "asyncio.run(main())\n"
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, check=True)
+    return time.perf_counter() - start
+
+
+async def session_timings(renderer, mcp_server, calls):
+    """Return (startup seconds, per-call seconds list, outputs for CASES)"""
+    start = time.perf_counter()
+    async with open_generator_session(renderer, mcp_server) as session:
+        await session.list_tools()
+        startup = time.perf_counter() - start
+
+        outputs = []
+        for case in CASES:
+            result = await session.call_tool(TOOL_NAME, case)
+            outputs.append(result.content[0].text)
+
+        per_call = []
+        for i in range(calls):
+            case = CASES[i % len(CASES)]
+            t0 = time.perf_counter()
+            await session.call_tool(TOOL_NAME, case)
+            per_call.append(time.perf_counter() - t0)
+    return startup, per_call, outputs
+
+
+def report(label, startup, per_call):
+    print(f"{label:<22} startup {startup * 1000:9.2f} ms   "
+          f"per call mean {statistics.mean(per_call) * 1000:8.3f} ms   "
+          f"median {statistics.median(per_call) * 1000:8.3f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-process renderer vs stdio MCP server")
+    parser.add_argument("--calls", type=int, default=200, help="Number of timed tool calls per path")
+    parser.add_argument("--mcp-server", default=str(Path(__file__).resolve().parent.parent.parent / "mcp_server.mjs"),
+                        help="Path to mcp_server.mjs")
+    args = parser.parse_args()
+
+    print(f"Python cold start (new interpreter, incl. imports): {python_cold_start() * 1000:.1f} ms")
+    py_startup, py_calls, py_outputs = await session_timings("python", None, args.calls)
+    report("python (in-process)", py_startup, py_calls)
+
+    try:
+        node_startup, node_calls, node_outputs = await session_timings("node", args.mcp_server, args.calls)
+    except Exception as e:
+        print(f"node (stdio MCP)       skipped: {type(e).__name__}: {e}")
+        return
+    report("node (stdio MCP)", node_startup, node_calls)
+
+    print(f"\nStartup speedup: {node_startup / py_startup:.0f}x   "
+          f"per-call speedup: {statistics.mean(node_calls) / statistics.mean(py_calls):.0f}x")
+
+    mismatches = [i for i, (a, b) in enumerate(zip(py_outputs, node_outputs)) if a != b]
+    if mismatches:
+        print(f"✗ Output differs from mcp_server.mjs for cases {mismatches}")
+        sys.exit(1)
+    print(f"✓ Output byte-identical to mcp_server.mjs for all {len(CASES)} cases")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
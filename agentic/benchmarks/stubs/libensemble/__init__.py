@@ -0,0 +1,96 @@
+"""
+Minimal stand-in for libEnsemble, for benchmarks/bench_agents.py.
+
+Covers what the scripts in agentic/tests import. Ensemble.run() does no
+generator or worker management: it evaluates a few points drawn uniformly
+within gen_specs.user["lb"]/["ub"] with sim_f, in order, in the calling
+process (in ensemble/sim<n>/ with sim_dirs_make), so errors in the sim
+function and in launching the application surface the way they do in a
+real run. The number of points is min(sim_max, LIBE_STUB_SIMS, default 4).
+
+Needs numpy, like libEnsemble itself.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+STUB_SIMS = int(os.environ.get("LIBE_STUB_SIMS", "4"))
+
+
+def _spec_dict(specs):
+    """specs as the dict libEnsemble gives user functions ("in", "out", "user", ...)"""
+    values = dict(vars(specs)) if specs is not None else {}
+    if "inputs" in values:
+        values["in"] = values.pop("inputs")
+    if "outputs" in values:
+        values["out"] = values.pop("outputs")
+    values.setdefault("user", {})
+    return values
+
+
+class Ensemble:
+    """Runs sim_f on a few sample points instead of a full ensemble"""
+
+    def __init__(self, sim_specs=None, gen_specs=None, exit_criteria=None, libE_specs=None,
+                 alloc_specs=None, persis_info=None, executor=None, **kwargs):
+        self.sim_specs = sim_specs
+        self.gen_specs = gen_specs
+        self.exit_criteria = exit_criteria
+        self.libE_specs = libE_specs
+        self.alloc_specs = alloc_specs
+        self.persis_info = persis_info or {}
+        self.executor = executor
+        self.is_manager = True
+        self.H = None
+
+    def add_random_streams(self, num_streams=0, seed=""):
+        self.persis_info = {i: {"rand_stream": np.random.default_rng(i)} for i in range(num_streams + 1)}
+        return self.persis_info
+
+    def _points(self, count):
+        user = getattr(self.gen_specs, "user", None) or {}
+        lb = np.asarray(user.get("lb", [0.0]), dtype=float)
+        ub = np.asarray(user.get("ub", [1.0]), dtype=float)
+        return np.random.default_rng(0).uniform(lb, ub, size=(count, len(lb)))
+
+    def run(self):
+        sim_max = getattr(self.exit_criteria, "sim_max", None) or STUB_SIMS
+        points = self._points(min(sim_max, STUB_SIMS))
+        sim_specs = _spec_dict(self.sim_specs)
+        libE_specs = self.libE_specs
+        dtype = [("sim_id", int), ("x", float, points.shape[1])] + list(sim_specs.get("out", [("f", float)]))
+        H = self.H = np.zeros(len(points), dtype=dtype)
+
+        log = open("ensemble.log", "a")
+        base = Path.cwd()
+        try:
+            for sim_id, x in enumerate(points):
+                H_in = np.zeros(1, dtype=[("x", float, points.shape[1])])
+                H_in["x"][0] = x
+                sim_dir = base
+                if getattr(libE_specs, "sim_dirs_make", False):
+                    sim_dir = base / "ensemble" / f"sim{sim_id}"
+                    sim_dir.mkdir(parents=True, exist_ok=True)
+                    for path in getattr(libE_specs, "sim_dir_copy_files", None) or []:
+                        shutil.copy(path, sim_dir)
+                os.chdir(sim_dir)
+                try:
+                    result = sim_specs["sim_f"](H_in, self.persis_info.get(1, {}), sim_specs,
+                                                {"executor": self.executor, "H_rows": [sim_id]})
+                finally:
+                    os.chdir(base)
+                H_out = result[0]
+                H["sim_id"][sim_id] = sim_id
+                H["x"][sim_id] = x
+                for name in H_out.dtype.names:
+                    H[name][sim_id] = H_out[name][0]
+                log.write(f"[stub] sim {sim_id} done\n")
+        finally:
+            log.close()
+        return H, self.persis_info, 0
+
+    def save_output(self, file):
+        np.save(f"{Path(file).stem}_history.npy", self.H)
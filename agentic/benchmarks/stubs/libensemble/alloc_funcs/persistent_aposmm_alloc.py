@@ -0,0 +1,5 @@
+"""APOSMM allocation placeholder (the stand-in Ensemble has no workers)"""
+
+
+def persistent_aposmm_alloc(W, H, sim_specs, gen_specs, alloc_specs, persis_info, libE_info):
+    raise NotImplementedError("libEnsemble stand-in: allocation functions are not run")
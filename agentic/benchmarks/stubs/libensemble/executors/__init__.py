@@ -0,0 +1,35 @@
+"""Executor of the libEnsemble stand-in: runs the registered application directly (no MPI launcher)"""
+
+import shlex
+import subprocess
+
+
+class Task:
+    def __init__(self, process):
+        self.process = process
+        self.errcode = process.returncode
+        self.finished = True
+        self.state = "FINISHED" if process.returncode == 0 else "FAILED"
+
+    def wait(self, timeout=None):
+        return self.state
+
+    def poll(self):
+        return self.state
+
+
+class MPIExecutor:
+    def __init__(self, **kwargs):
+        self.apps = {}
+
+    def register_app(self, full_path, app_name=None, calc_type=None, desc=None, **kwargs):
+        self.apps[app_name or calc_type] = full_path
+
+    def submit(self, app_name=None, calc_type=None, app_args=None, num_procs=None, num_nodes=None,
+               stdout="out.txt", stderr="err.txt", **kwargs):
+        command = [self.apps[app_name or calc_type]] + shlex.split(app_args or "")
+        with open(stdout, "w") as out, open(stderr, "w") as err:
+            return Task(subprocess.run(command, stdout=out, stderr=err))
+
+
+Executor = MPIExecutor
@@ -0,0 +1,8 @@
+"""Calc status codes of the libEnsemble stand-in (same values as libEnsemble)"""
+
+WORKER_KILL = 30
+WORKER_KILL_ON_ERR = 31
+WORKER_KILL_ON_TIMEOUT = 32
+TASK_FAILED = 33
+TASK_FAILED_TO_START = 34
+WORKER_DONE = 35
@@ -0,0 +1,26 @@
+"""Spec classes of the libEnsemble stand-in: plain attribute holders"""
+
+
+class _Specs:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class SimSpecs(_Specs):
+    pass
+
+
+class GenSpecs(_Specs):
+    pass
+
+
+class AllocSpecs(_Specs):
+    pass
+
+
+class ExitCriteria(_Specs):
+    pass
+
+
+class LibeSpecs(_Specs):
+    pass
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""Python stand-in for tests/six_hump_camel/six_hump_camel.c (used when no C compiler is found)"""
+
+import re
+
+with open("input.txt") as f:
+    text = f.read()
+values = dict(re.findall(r"(x[01])\s*=\s*(\S+)", text))
+try:
+    x0, x1 = float(values["x0"]), float(values["x1"])
+    f = (4 - 2.1 * x0 * x0 + x0**4 / 3.0) * x0 * x0 + x0 * x1 + (-4 + 4 * x1 * x1) * x1 * x1
+except (KeyError, ValueError):
+    f = float("nan")
+with open("output.txt", "w") as out:
+    out.write(f"{f:.10f}\n")
@@ -16,50 +16,40 @@ For options: python libe_agent_basic_auto.py -h
 import os
 import sys
 import asyncio
-import subprocess
 import argparse
 import shutil
-import time
 from pathlib import Path
 from typing import Optional
-from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_agent
-from langchain_core.tools import StructuredTool
+from agent_core.compact_errors import compact_for_prompt, sources_from_dir
+from agent_core.llm import create_agent, create_llm, default_model, make_tool
+from agent_core.llm_cache import open_llm_cache
+from agent_core.preflight import preflight
+from agent_core.runner import DEFAULT_TIMEOUT, FATAL_PATTERNS, FailFastWatcher, run_script, timeout_arg
+from agent_core.run_archive import OutputCompressor
+from agent_core.trace import TRACE, start_trace
+from agent_core.workspace import DEFAULT_WORK_DIR, Workspace
 
 
 # LLM model to use — default depends on which API key is available
-DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
-DEFAULT_ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
-if os.environ.get("LLM_MODEL"):
-    MODEL = os.environ["LLM_MODEL"]
-elif os.environ.get("OPENAI_API_KEY") or not os.environ.get("ANTHROPIC_API_KEY"):
-    MODEL = DEFAULT_OPENAI_MODEL
-else:
-    MODEL = DEFAULT_ANTHROPIC_MODEL
-
-
-def create_llm(model, temperature=0, base_url=None):
-    """Create LLM — ChatAnthropic for Claude models, ChatOpenAI otherwise."""
-    if "claude" in model.lower():
-        try:
-            from langchain_anthropic import ChatAnthropic
-        except ImportError:
-            sys.exit("Error: pip install langchain-anthropic required for Claude models")
-        return ChatAnthropic(model=model, temperature=temperature)
-    return ChatOpenAI(model=model, temperature=temperature, base_url=base_url)
-
-# Working directory for scripts
-WORK_DIR = None
-
-# Archive counter for version tracking
-ARCHIVE_COUNTER = 1
-
-# Current archive name (scripts and their output go together)
-CURRENT_ARCHIVE = None
-
-# Directory where existing generated_scripts runs are moved (create if missing)
-ARCHIVE_RUNS_DIR = "archive_runs"
+MODEL = default_model()
+
+# Workspace of this run: scripts, run outputs and versions/ (set in main)
+WORKSPACE = None
+
+# Timeout for each script run in seconds (--run-timeout; None for no limit)
+RUN_TIMEOUT = DEFAULT_TIMEOUT
+
+# Output regexes that stop a run early (--fatal-pattern, --no-fail-fast; None disables)
+FAIL_FAST_PATTERNS = FATAL_PATTERNS
+
+# Static pre-flight check before each run (--no-preflight to disable)
+PREFLIGHT = True
+
+# Compact run errors (tracebacks, relevant source lines) for the LLM (--full-errors to disable)
+COMPACT_ERRORS = True
+
+# Background compressor for older run outputs (--compress-outputs)
+COMPRESSOR = None
 
 # Files and directories to archive after each run
 ARCHIVE_ITEMS = [
@@ -71,129 +61,101 @@ ARCHIVE_ITEMS = [
 ]
 
 
-def archive_existing_output_dir(output_dir, archive_parent=None):
-    """If output_dir exists, move it to archive_parent/output_dir_<unique>, then create fresh output_dir."""
-    output_dir = Path(output_dir)
-    archive_dir = Path(archive_parent or ARCHIVE_RUNS_DIR)
-    if not output_dir.exists():
-        output_dir.mkdir(parents=True, exist_ok=True)
-        return
-    archive_dir.mkdir(parents=True, exist_ok=True)
-    dest = archive_dir / f"{output_dir.name}_{hex(time.time_ns())[2:10]}"
-    shutil.move(str(output_dir), str(dest))
-    print(f"Moved existing {output_dir} to {dest}")
-    output_dir.mkdir(parents=True, exist_ok=True)
+# Tool schemas (pydantic is imported when the agent starts, not for --help)
+def tool_input_schemas():
+    from pydantic import BaseModel, Field
 
+    class RunScriptInput(BaseModel):
+        script_name: str = Field(description="Name of the Python script to run (e.g., 'run_libe.py')")
 
-# Tool schemas
-class RunScriptInput(BaseModel):
-    script_name: str = Field(description="Name of the Python script to run (e.g., 'run_libe.py')")
+    class ReadFileInput(BaseModel):
+        filepath: str = Field(description="Path to the file to read (relative to work directory)")
 
-class ReadFileInput(BaseModel):
-    filepath: str = Field(description="Path to the file to read (relative to work directory)")
+    class WriteFileInput(BaseModel):
+        filepath: str = Field(description="Path to the file to write (relative to work directory)")
+        content: str = Field(description="Content to write to the file")
 
-class WriteFileInput(BaseModel):
-    filepath: str = Field(description="Path to the file to write (relative to work directory)")
-    content: str = Field(description="Content to write to the file")
+    class ListFilesInput(BaseModel):
+        pass  # No input needed
 
-class ListFilesInput(BaseModel):
-    pass  # No input needed
+    return RunScriptInput, ReadFileInput, WriteFileInput, ListFilesInput
 
 
 # Archiving functions
 def start_new_archive(action: str):
     """Start a new archive version (scripts + their output go together)"""
-    global ARCHIVE_COUNTER, CURRENT_ARCHIVE
-    CURRENT_ARCHIVE = f"{ARCHIVE_COUNTER}_{action}"
-    archive_dir = WORK_DIR / "versions" / CURRENT_ARCHIVE
-    archive_dir.mkdir(parents=True, exist_ok=True)
-    ARCHIVE_COUNTER += 1
-    print(f"[Archive] Started new version: {CURRENT_ARCHIVE}")
+    WORKSPACE.new_version(action)
+    print(f"[Archive] Started new version: {WORKSPACE.current}")
 
 
 def archive_current_scripts():
     """Archive all current scripts to the current archive"""
-    if CURRENT_ARCHIVE is None:
+    if WORKSPACE.current is None:
         return
     
-    archive_dir = WORK_DIR / "versions" / CURRENT_ARCHIVE
-    
-    # Copy all Python scripts to the archive
-    for script_file in WORK_DIR.glob("*.py"):
-        shutil.copy(script_file, archive_dir / script_file.name)
+    # Store changed scripts once; unchanged ones are linked to existing blobs
+    WORKSPACE.snapshot()
     
-    print(f"[Archive] Saved scripts to: {CURRENT_ARCHIVE}/")
+    print(f"[Archive] Saved scripts to: {WORKSPACE.current}/")
 
 
 def archive_run_output(error_msg: str):
     """Archive run output to the current archive (same dir as the scripts)"""
-    if CURRENT_ARCHIVE is None:
+    if WORKSPACE.current is None:
         return
     
-    archive_dir = WORK_DIR / "versions" / CURRENT_ARCHIVE
-    output_dir = archive_dir / "output"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # Rename configured items into the archive (no copy on the same filesystem)
+    output_dir = WORKSPACE.archive_outputs(ARCHIVE_ITEMS, error_msg)
+    if COMPRESSOR:
+        COMPRESSOR.submit(output_dir)
     
-    # Save error output
-    (output_dir / "error.txt").write_text(error_msg)
-    
-    # Archive configured items
-    for item in ARCHIVE_ITEMS:
-        item_path = WORK_DIR / item
-        
-        if item_path.exists() and item_path.is_dir():
-            shutil.copytree(str(item_path), str(output_dir / item), dirs_exist_ok=True)
-            shutil.rmtree(str(item_path))
-        else:
-            for filepath in WORK_DIR.glob(item):
-                if filepath.is_file():
-                    shutil.copy(str(filepath), str(output_dir / filepath.name))
-                    filepath.unlink()
-    
-    print(f"[Archive] Saved run output to: {CURRENT_ARCHIVE}/output/")
+    print(f"[Archive] Saved run output to: {WORKSPACE.current}/output/")
 
 
 # Tool implementations
 async def run_script_tool(script_name: str) -> str:
     """Run a Python script and return output or error"""
-    script_path = WORK_DIR / script_name
-    timeout_seconds = 300
+    script_path = WORKSPACE.path / script_name
     
     if not script_path.exists():
-        msg = f"ERROR: Script '{script_name}' not found in {WORK_DIR}"
+        msg = f"ERROR: Script '{script_name}' not found in {WORKSPACE.path}"
         print(f"\n{msg}\n")
         return msg
     
+    # Static checks first: report errors without launching the run
+    if PREFLIGHT:
+        ok, report = preflight(WORKSPACE.path)
+        if not ok:
+            return f"FAILED: {report}"
+    
     print("\nRunning scripts...")
     
     try:
-        result = subprocess.run(
-            ["python", script_name],
-            cwd=WORK_DIR,
-            capture_output=True,
-            text=True,
-            timeout=timeout_seconds
-        )
+        # Streams output while running; the event loop stays free
+        watcher = FailFastWatcher(FAIL_FAST_PATTERNS, WORKSPACE.path / "ensemble.log") if FAIL_FAST_PATTERNS else None
+        result = await run_script(script_name, WORKSPACE.path, timeout=RUN_TIMEOUT, watcher=watcher)
         
-        if result.returncode == 0:
+        if result.ok:
             print("✓ Script ran successfully")
-            msg = f"SUCCESS: Script ran successfully.\nOutput:\n{result.stdout[:500]}"
+            msg = f"SUCCESS: Script ran successfully.\nOutput:\n{result.stdout[-500:]}"
         else:
-            error_msg = f"Return code {result.returncode}\nStderr: {result.stderr}\nStdout: {result.stdout}"
-            print(f"✗ Scripts failed with return code {result.returncode}")
+            error_msg = result.error_message()
+            print(f"✗ Script {result.summary()}")
+            status = f"{'ERROR' if result.timed_out else 'FAILED'}: Script {result.summary()}"
             if result.stderr:
                 error_summary = result.stderr.strip().split('\n')[-1]
                 print(f"Error summary: {error_summary}\n")
             # Archive the failed run output (goes with the current scripts)
-            archive_run_output(error_msg)
-            msg = f"FAILED: Script failed with return code {result.returncode}\n\nStderr:\n{result.stderr}\n\nStdout:\n{result.stdout[:500]}"
+            await asyncio.to_thread(archive_run_output, error_msg)
+            if COMPACT_ERRORS:
+                msg = f"{status}\n\n{compact_for_prompt(error_msg, sources_from_dir(WORKSPACE.path))}"
+            else:
+                msg = f"{status}\n\nStderr:\n{result.stderr}\n\nStdout:\n{result.stdout[-500:]}"
+                if result.log_excerpt:
+                    msg += f"\n\nensemble.log (last lines):\n{result.log_excerpt}"
         
         return msg
         
-    except subprocess.TimeoutExpired:
-        msg = f"ERROR: Script timed out after {timeout_seconds} seconds"
-        print(f"\n{msg}\n")
-        return msg
     except Exception as e:
         msg = f"ERROR: {str(e)}"
         print(msg)
@@ -202,7 +164,7 @@ async def run_script_tool(script_name: str) -> str:
 
 async def read_file_tool(filepath: str) -> str:
     """Read a file and return its contents"""
-    file_path = WORK_DIR / filepath
+    file_path = WORKSPACE.path / filepath
     
     if not file_path.exists():
         return f"ERROR: File '{filepath}' not found"
@@ -216,7 +178,7 @@ async def read_file_tool(filepath: str) -> str:
 
 async def write_file_tool(filepath: str, content: str) -> str:
     """Write content to a file"""
-    file_path = WORK_DIR / filepath
+    file_path = WORKSPACE.path / filepath
     
     try:
         file_path.write_text(content)
@@ -233,7 +195,7 @@ async def write_file_tool(filepath: str, content: str) -> str:
 async def list_files_tool() -> str:
     """List all Python files in the working directory"""
     try:
-        py_files = list(WORK_DIR.glob("*.py"))
+        py_files = list(WORKSPACE.path.glob("*.py"))
         if not py_files:
             return "No Python files found"
         return "Python files:\n" + "\n".join([f"- {f.name}" for f in py_files])
@@ -241,70 +203,101 @@ async def list_files_tool() -> str:
         return f"ERROR listing files: {str(e)}"
 
 
-def setup_work_directory(scripts_dir: str) -> Path:
-    """Copy scripts to working directory and archive initial version"""
-    global WORK_DIR
+def setup_work_directory(scripts_dir: str, work_dir: str) -> Workspace:
+    """Copy scripts to a fresh workspace and archive initial version"""
+    global WORKSPACE
     scripts_dir = Path(scripts_dir)
-    archive_existing_output_dir("generated_scripts")
-    work_dir = Path("generated_scripts")
-    WORK_DIR = work_dir
+    WORKSPACE = Workspace.open(work_dir)
     
     # Copy all Python files to work dir
     for script_file in scripts_dir.glob("*.py"):
-        shutil.copy(script_file, work_dir)
+        shutil.copy(script_file, WORKSPACE.path)
         print(f"Copied: {script_file.name}")
     
     # Start archive for initial scripts
     start_new_archive("copied_scripts")
     archive_current_scripts()
     
-    return work_dir
+    return WORKSPACE
 
 
 async def main():
-    global WORK_DIR
+    global COMPRESSOR, RUN_TIMEOUT, FAIL_FAST_PATTERNS, PREFLIGHT, COMPACT_ERRORS
     
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Autonomous agent to run and fix libEnsemble scripts")
     parser.add_argument("--scripts", required=True, help="Directory containing scripts to run")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR,
+                        help=f"Working directory (default: {DEFAULT_WORK_DIR}; a free {DEFAULT_WORK_DIR}_<n> if in use)")
     parser.add_argument("--max-iterations", type=int, default=10, 
                        help="Maximum agent iterations (default: 10)")
+    parser.add_argument("--compress-outputs", action="store_true",
+                       help="Compress older run outputs to output.tar.zst in the background (needs zstandard)")
+    parser.add_argument("--run-timeout", type=timeout_arg, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout for each script run in seconds, 0 for none (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--no-fail-fast", action="store_true",
+                        help="Let runs continue after fatal output in stderr/ensemble.log")
+    parser.add_argument("--fatal-pattern", action="append", default=[],
+                        help="Extra regex that stops a run early (repeatable)")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the static check of the scripts before each run")
+    parser.add_argument("--full-errors", action="store_true",
+                        help="Give the LLM full stderr/stdout instead of a compacted error")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Cache LLM responses on disk and reuse them for identical requests")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Bypass the LLM response cache (even if LIBE_AGENT_LLM_CACHE is set)")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="Record stage timings, tokens and run memory to a JSONL trace "
+                             "(default file: <work dir>/trace.jsonl) and print a summary at exit")
     args = parser.parse_args()
+    RUN_TIMEOUT = args.run_timeout
+    FAIL_FAST_PATTERNS = None if args.no_fail_fast else FATAL_PATTERNS + args.fatal_pattern
+    PREFLIGHT = not args.no_preflight
+    COMPACT_ERRORS = not args.full_errors
+    
+    if args.compress_outputs:
+        if not OutputCompressor.available():
+            print("Error: --compress-outputs requires zstandard (pip install zstandard)")
+            sys.exit(1)
+        COMPRESSOR = OutputCompressor()
     
     # Setup working directory
-    WORK_DIR = setup_work_directory(args.scripts)
-    print(f"\nWorking directory: {WORK_DIR}\n")
+    setup_work_directory(args.scripts, args.work_dir)
+    start_trace(args, "libe_agent_basic_auto", WORKSPACE.path)
+    print(f"\nWorking directory: {WORKSPACE}\n")
     
     # Detect run script
-    run_scripts = list(WORK_DIR.glob("run_*.py"))
+    run_scripts = list(WORKSPACE.path.glob("run_*.py"))
     if not run_scripts:
         print("Error: No run_*.py script found")
         return
     run_script_name = run_scripts[0].name
     
     # Create tools
-    run_tool = StructuredTool(
+    RunScriptInput, ReadFileInput, WriteFileInput, ListFilesInput = tool_input_schemas()
+    run_tool = make_tool(
         name="run_script",
         description="Run a Python script. Returns SUCCESS if it works, FAILED with error details if it fails.",
         args_schema=RunScriptInput,
-        coroutine=run_script_tool
+        coroutine=TRACE.wrap("run", run_script_tool)
     )
     
-    read_tool = StructuredTool(
+    read_tool = make_tool(
         name="read_file",
         description="Read a file and return its contents. Use this to inspect scripts before fixing them.",
         args_schema=ReadFileInput,
         coroutine=read_file_tool
     )
     
-    write_tool = StructuredTool(
+    write_tool = make_tool(
         name="write_file",
         description="Write content to a file. Use this to fix scripts that have errors.",
         args_schema=WriteFileInput,
-        coroutine=write_file_tool
+        coroutine=TRACE.wrap("write", write_file_tool)
     )
     
-    list_tool = StructuredTool(
+    list_tool = make_tool(
         name="list_files",
         description="List all Python files in the working directory.",
         args_schema=ListFilesInput,
@@ -312,7 +305,8 @@ async def main():
     )
     
     # Create agent
-    llm = create_llm(MODEL, base_url=os.environ.get("OPENAI_BASE_URL"))
+    base_url = os.environ.get("OPENAI_BASE_URL")
+    llm = create_llm(MODEL, base_url=base_url, cache=open_llm_cache(args, MODEL, base_url))
     agent = create_agent(llm, [run_tool, read_tool, write_tool, list_tool])
     
     # Give agent the goal
@@ -337,9 +331,10 @@ Start by running '{run_script_name}'."""
     print("\nStarting autonomous agent...")
     
     try:
-        result = await agent.ainvoke({
-            "messages": [("user", goal)]
-        })
+        with TRACE.stage("agent"):
+            result = await agent.ainvoke({
+                "messages": [("user", goal)]
+            })
         
         print("\n" + "="*60)
         print("AGENT COMPLETED")
@@ -351,6 +346,9 @@ Start by running '{run_script_name}'."""
         print(f"\nAgent error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if COMPRESSOR:
+            COMPRESSOR.close()
 
 
 if __name__ == "__main__":
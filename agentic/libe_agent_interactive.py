@@ -4,7 +4,7 @@ Interactive LangChain agent for libEnsemble script generation.
 
 Features:
 1. Generate scripts with MCP tool
-2. Interactive review of key script sections
+2. Interactive review of key script sections (read from the scripts locally, no LLM call)
 3. User can approve or request changes
 4. Runs scripts with retry on errors
 
@@ -16,24 +16,54 @@ For options: python libe_agent_interactive.py -h
 import os
 import sys
 import asyncio
-import re
-import subprocess
 import argparse
-import shutil
+import time
 from pathlib import Path
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_agent
-from langchain_core.tools import StructuredTool
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from agent_core.bundle import (
+    bundle_from_tool_result, format_bundle_text, read_bundle,
+)
+from agent_core.config_extract import extract_generator, extract_objective
+from agent_core.fix import fix_prompt
+from agent_core.generator_session import (
+    DEFAULT_RENDERER, RENDERERS, find_mcp_server, needs_mcp_server, open_generator_session,
+)
+from agent_core.llm import create_agent, create_llm, default_model, generator_tool
+from agent_core.llm_cache import open_llm_cache
+from agent_core.patches import FULL_REPLY_FORMAT, PATCH_REPLY_FORMAT, request_edits
+from agent_core.preflight import preflight
+from agent_core.prompt_params import render_from_prompt
+from agent_core.runner import DEFAULT_TIMEOUT, FATAL_PATTERNS, FailFastWatcher, detect_run_script, run_script, timeout_arg
+from agent_core.smoke import smoke_run
+from agent_core.trace import TRACE, start_trace
+from agent_core.workspace import DEFAULT_WORK_DIR, Workspace
 
 
 # Maximum retry attempts for fixing failed scripts
 MAX_RETRIES = 2
 
-# OpenAI model to use
-DEFAULT_MODEL = "gpt-4o-mini"
-MODEL = os.environ.get("LLM_MODEL", DEFAULT_MODEL)
+# Timeout for each script run in seconds (--run-timeout; None for no limit)
+RUN_TIMEOUT = DEFAULT_TIMEOUT
+
+# Output regexes that stop a run early (--fatal-pattern, --no-fail-fast; None disables)
+FAIL_FAST_PATTERNS = FATAL_PATTERNS
+
+# Static pre-flight check before each run (--no-preflight to disable)
+PREFLIGHT = True
+
+# Compact run errors (tracebacks, relevant source lines) for the LLM (--full-errors to disable)
+COMPACT_ERRORS = True
+
+# Smoke-run a shrunk copy of the run script before each full run (--smoke)
+SMOKE = False
+
+# Map bullet-style prompts to the generator arguments without the LLM (--llm-generate to disable)
+PARSE_PROMPT = True
+
+# Ask the LLM for edits (search/replace blocks or diffs) instead of whole files (--full-rewrites to disable)
+PATCH_EDITS = True
+
+# LLM model to use — default depends on which API key is available
+MODEL = default_model()
 
 # Show prompts flag
 SHOW_PROMPTS = False
@@ -56,7 +86,7 @@ DEFAULT_PROMPT = """Create six_hump_camel APOSMM scripts:
 - The output file for each simulation is output.txt
 - The bounds should be 0,1 and -1,2 for X0 and X1 respectively"""
 
-# Templates for reviewing specific sections
+# Templates for reviewing specific sections (only used if a section is not found by config_extract)
 EXTRACT_GENERATOR_TEMPLATE = """Look at these scripts and extract the generator configuration:
 
 {scripts_text}
@@ -85,28 +115,16 @@ REFINE_WITH_FEEDBACK_TEMPLATE = """Here are the generated scripts:
 User feedback: {feedback}
 
 Update the scripts based on this feedback.
-Return ONLY the scripts in the format (=== filename === followed by code).
-Do NOT add explanations or wrap in markdown."""
-
-# Template for fixing failed scripts
-FIX_PROMPT_TEMPLATE = """These scripts failed with the following error:
-
-{error_msg}
-
-Here are the current scripts (main run script is {run_script_name}):
+{reply_format}"""
 
-{scripts_text}
-
-Fix the scripts to resolve this error.
-DO NOT make any other changes or improvements.
-Return ALL scripts in the EXACT SAME FORMAT (=== filename === followed by raw Python code).
-DO NOT merge or consolidate files - keep the same file structure.
-DO NOT wrap in markdown or add explanations."""
 
 
 # Global MCP session
 mcp_session = None
 
+# Bundle from the most recent CreateLibEnsembleScripts call
+last_bundle = None
+
 
 def print_prompt(stage_name, prompt_text):
     """Print a prompt with formatting if SHOW_PROMPTS is enabled"""
@@ -127,7 +145,8 @@ def get_user_input(prompt_text):
 
 
 async def call_mcp_tool(**kwargs):
-    """Wrapper to call the MCP tool"""
+    """Wrapper to call the MCP tool (keeps the structured bundle, returns text for the LLM)"""
+    global last_bundle
     # Block custom_set_objective - AI always gets it wrong
     if 'custom_set_objective' in kwargs:
         del kwargs['custom_set_objective']
@@ -135,50 +154,67 @@ async def call_mcp_tool(**kwargs):
         del kwargs['set_objective_code']
     
     result = await mcp_session.call_tool("CreateLibEnsembleScripts", kwargs)
+    last_bundle = bundle_from_tool_result(result)
     return result.content[0].text if result.content else "Scripts created"
 
 
-async def run_mcp_generator(agent, user_prompt):
-    """Stage 1: Run the MCP script generator"""
+async def run_mcp_generator(agent, user_prompt, input_schema=None):
+    """Stage 1: Run the MCP script generator. Returns the generated bundle."""
+    global last_bundle
     print("\n" + "="*70)
     print("  STAGE 1: Generating Scripts")
     print("="*70)
     
+    # Prompts in the DEFAULT_PROMPT style are mapped to the tool arguments directly
+    if PARSE_PROMPT:
+        start = time.perf_counter()
+        bundle, problems = await render_from_prompt(mcp_session, user_prompt, input_schema)
+        if bundle:
+            print(f"✓ Prompt parsed locally - rendered without the LLM in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return bundle
+        print(f"Prompt not fully parsed locally ({'; '.join(problems)}) - asking the LLM")
+    
     print_prompt("MCP Generator", user_prompt)
     
-    result = await agent.ainvoke({
+    last_bundle = None
+    await agent.ainvoke({
         "messages": [("user", user_prompt)]
     })
     
-    # Find the tool result (MCP-generated scripts)
-    for msg in result["messages"]:
-        if hasattr(msg, "type") and msg.type == "tool":
-            return msg.content
-    
-    return None
+    # Structured bundle captured from the tool call
+    return last_bundle
+
+
+async def extract_section(agent, bundle, extract, template, stage_name):
+    """Review section read from the scripts locally; asks the LLM only if it is not found"""
+    info = extract(bundle)
+    if info is not None:
+        return info
+    print("(Not found in the script structure - asking the model)")
+    prompt = template.format(scripts_text=format_bundle_text(bundle))
+    print_prompt(stage_name, prompt)
+    result = await agent.ainvoke({
+        "messages": [("user", prompt)]
+    })
+    return result["messages"][-1].content
 
 
-async def interactive_review(agent, scripts_text):
+async def interactive_review(agent, bundle):
     """Stage 2: Interactive review of key sections"""
     if not INTERACTIVE_MODE:
         print("\n[Skipping interactive review - use --interactive to enable]")
-        return scripts_text
+        return bundle
     
     print("\n" + "="*70)
     print("  STAGE 2: Interactive Script Review")
     print("="*70)
     
-    current_scripts = scripts_text
+    current_scripts = bundle
     
     # Review 1: Generator configuration
     print("\n--- Generator Configuration ---")
-    gen_prompt = EXTRACT_GENERATOR_TEMPLATE.format(scripts_text=current_scripts)
-    print_prompt("Extract Generator", gen_prompt)
-    
-    gen_result = await agent.ainvoke({
-        "messages": [("user", gen_prompt)]
-    })
-    gen_info = gen_result["messages"][-1].content
+    gen_info = await extract_section(agent, current_scripts, extract_generator,
+                                     EXTRACT_GENERATOR_TEMPLATE, "Extract Generator")
     print(gen_info)
     
     response = get_user_input("Does this look correct?")
@@ -189,36 +225,25 @@ async def interactive_review(agent, scripts_text):
     elif response == 'edit':
         feedback = input("What would you like to change? ")
         refine_prompt = REFINE_WITH_FEEDBACK_TEMPLATE.format(
-            scripts_text=current_scripts,
-            feedback=feedback
+            scripts_text=format_bundle_text(current_scripts),
+            feedback=feedback,
+            reply_format=PATCH_REPLY_FORMAT if PATCH_EDITS else FULL_REPLY_FORMAT
         )
         print_prompt("Refine", refine_prompt)
         
-        refine_result = await agent.ainvoke({
-            "messages": [("user", refine_prompt)]
-        })
-        current_scripts = refine_result["messages"][-1].content
-        
-        # Clean up
-        current_scripts = re.sub(r'```python\n', '', current_scripts)
-        current_scripts = re.sub(r'```\n?', '', current_scripts)
-        if '===' in current_scripts:
-            start = current_scripts.find('===')
-            current_scripts = current_scripts[start:]
-        
-        print("✓ Updated")
+        refine_result = await request_edits(agent, current_scripts, refine_prompt, print_prompt)
+        if refine_result.changed:
+            current_scripts = refine_result.bundle
+            print("✓ Updated")
+        else:
+            print("✗ No script changes found in response - keeping current scripts")
     else:  # y or anything else
         print("✓ Approved")
     
     # Review 2: Set objective function
     print("\n--- Set Objective Function ---")
-    obj_prompt = EXTRACT_OBJECTIVE_TEMPLATE.format(scripts_text=current_scripts)
-    print_prompt("Extract Objective", obj_prompt)
-    
-    obj_result = await agent.ainvoke({
-        "messages": [("user", obj_prompt)]
-    })
-    obj_info = obj_result["messages"][-1].content
+    obj_info = await extract_section(agent, current_scripts, extract_objective,
+                                     EXTRACT_OBJECTIVE_TEMPLATE, "Extract Objective")
     print(obj_info)
     
     response = get_user_input("Does this look correct?")
@@ -229,24 +254,18 @@ async def interactive_review(agent, scripts_text):
     elif response == 'edit':
         feedback = input("What would you like to change? ")
         refine_prompt = REFINE_WITH_FEEDBACK_TEMPLATE.format(
-            scripts_text=current_scripts,
-            feedback=feedback
+            scripts_text=format_bundle_text(current_scripts),
+            feedback=feedback,
+            reply_format=PATCH_REPLY_FORMAT if PATCH_EDITS else FULL_REPLY_FORMAT
         )
         print_prompt("Refine", refine_prompt)
         
-        refine_result = await agent.ainvoke({
-            "messages": [("user", refine_prompt)]
-        })
-        current_scripts = refine_result["messages"][-1].content
-        
-        # Clean up
-        current_scripts = re.sub(r'```python\n', '', current_scripts)
-        current_scripts = re.sub(r'```\n?', '', current_scripts)
-        if '===' in current_scripts:
-            start = current_scripts.find('===')
-            current_scripts = current_scripts[start:]
-        
-        print("✓ Updated")
+        refine_result = await request_edits(agent, current_scripts, refine_prompt, print_prompt)
+        if refine_result.changed:
+            current_scripts = refine_result.bundle
+            print("✓ Updated")
+        else:
+            print("✗ No script changes found in response - keeping current scripts")
     else:  # y or anything else
         print("✓ Approved")
     
@@ -254,143 +273,62 @@ async def interactive_review(agent, scripts_text):
     return current_scripts
 
 
-def save_scripts(scripts_text, output_dir, archive_name=None):
-    """Save generated scripts to files and optionally archive"""
-    output_dir = Path(output_dir)
-    output_dir.mkdir(exist_ok=True)
-    
-    pattern = r"=== (.+?) ===\n(.*?)(?=\n===|$)"
-    matches = re.findall(pattern, scripts_text, re.DOTALL)
-    
-    for filename, content in matches:
-        filepath = output_dir / filename.strip()
-        filepath.write_text(content.strip() + "\n")
-        print(f"- Saved: {filepath}")
-    
-    # Archive this version if requested
-    if archive_name:
-        archive_dir = output_dir / "versions" / archive_name
-        archive_dir.mkdir(parents=True, exist_ok=True)
-        for filename, content in matches:
-            archive_path = archive_dir / filename.strip()
-            archive_path.write_text(content.strip() + "\n")
-
-
-def archive_run_outputs(output_dir, archive_name, error_msg=""):
-    """Move run outputs to archive"""
-    output_dir = Path(output_dir)
-    run_output_dir = output_dir / "versions" / archive_name / "output"
-    run_output_dir.mkdir(parents=True, exist_ok=True)
-    
-    if error_msg:
-        (run_output_dir / "error.txt").write_text(error_msg)
-    
-    for item in ARCHIVE_ITEMS:
-        item_path = output_dir / item
-        if item_path.exists() and item_path.is_dir():
-            shutil.move(str(item_path), str(run_output_dir / item))
-        else:
-            for filepath in output_dir.glob(item):
-                if filepath.is_file():
-                    shutil.move(str(filepath), str(run_output_dir / filepath.name))
-
-
-def detect_run_script(directory):
-    """Find the run script in directory"""
-    directory = Path(directory)
-    run_scripts = list(directory.glob("run_*.py"))
-    return run_scripts[0].name if run_scripts else None
-
-
-def run_generated_scripts(output_dir, run_script_name):
+async def run_generated_scripts(workspace, run_script_name):
     """Stage 3: Run the generated scripts"""
     print("\n" + "="*70)
     print("  STAGE 3: Running Scripts")
     print("="*70)
     
-    output_dir = Path(output_dir)
-    run_script = output_dir / run_script_name
+    output_dir = workspace.path
+    run_script_path = output_dir / run_script_name
     
-    if not run_script.exists():
+    if not run_script_path.exists():
         return False, f"{run_script_name} not found"
     
-    result = subprocess.run(
-        ["python", run_script_name],
-        cwd=output_dir,
-        capture_output=True,
-        text=True,
-        timeout=300
-    )
+    # Static checks first: skip the launch if they already find errors
+    if PREFLIGHT:
+        ok, report = preflight(output_dir)
+        if not ok:
+            return False, report
+    
+    # Iterate on a shrunk copy; the full-size run only happens once it passes
+    if SMOKE:
+        ok, error_msg = await smoke_run(workspace, run_script_name, FAIL_FAST_PATTERNS)
+        if not ok:
+            return False, error_msg
+    
+    # Run the script, streaming its output, without blocking the event loop
+    watcher = FailFastWatcher(FAIL_FAST_PATTERNS, Path(output_dir) / "ensemble.log") if FAIL_FAST_PATTERNS else None
+    result = await run_script(run_script_name, output_dir, timeout=RUN_TIMEOUT, watcher=watcher)
     
-    if result.returncode == 0:
+    # Check if successful
+    if result.ok:
         print("✓ Scripts ran successfully")
         return True, None
     else:
-        error_msg = f"Return code {result.returncode}\nStderr: {result.stderr}\nStdout: {result.stdout}"
-        print(f"✗ Scripts failed with return code {result.returncode}")
-        if result.stderr:
-            print(f"Error output:\n{result.stderr[:500]}")
+        error_msg = result.error_message()
+        print(f"✗ Scripts {result.summary()}")
         return False, error_msg
 
 
-async def fix_scripts(agent, scripts_text, error_msg, run_script_name):
+async def fix_scripts(agent, bundle, error_msg, run_script_name):
     """Fix scripts based on error message"""
     print("\n" + "="*70)
     print("  STAGE 4: Fixing Scripts")
     print("="*70)
     
-    fix_prompt = FIX_PROMPT_TEMPLATE.format(
-        error_msg=error_msg[:1000],
-        scripts_text=scripts_text,
-        run_script_name=run_script_name
-    )
-    
-    print_prompt("Fix Scripts", fix_prompt)
-    
-    fix_result = await agent.ainvoke({
-        "messages": [("user", fix_prompt)]
-    })
-    
-    fixed_scripts = fix_result["messages"][-1].content
-    
-    # Clean up
-    fixed_scripts = re.sub(r'```python\n', '', fixed_scripts)
-    fixed_scripts = re.sub(r'```\n?', '', fixed_scripts)
-    if '===' in fixed_scripts:
-        start = fixed_scripts.find('===')
-        fixed_scripts = fixed_scripts[start:]
-    
-    return fixed_scripts
-
-
-def find_mcp_server(user_provided_path=None):
-    """Find mcp_server.mjs file"""
-    search_locations = []
-    
-    if user_provided_path:
-        search_locations.append(Path(user_provided_path))
-    
-    env_path = os.environ.get('GENERATOR_MCP_SERVER')
-    if env_path:
-        search_locations.append(Path(env_path))
-    
-    search_locations.extend([
-        Path(__file__).parent.parent / "mcp_server.mjs",
-        Path.cwd() / "mcp_server.mjs"
-    ])
+    prompt = fix_prompt(bundle, error_msg, run_script_name, COMPACT_ERRORS, PATCH_EDITS, max_error_chars=1000)
+    print_prompt("Fix Scripts", prompt)
     
-    for location in search_locations:
-        if location.exists():
-            return location
+    fix_result = await request_edits(agent, bundle, prompt, print_prompt)
+    if not fix_result.changed:
+        print("✗ No script changes found in fix response - keeping current scripts")
     
-    print(f"Error: Cannot find mcp_server.mjs")
-    print(f"Searched: {', '.join(str(loc) for loc in search_locations)}")
-    print("Set GENERATOR_MCP_SERVER or use --mcp-server flag")
-    sys.exit(1)
+    return fix_result.bundle
 
 
 async def main():
-    global mcp_session, SHOW_PROMPTS, INTERACTIVE_MODE
+    global mcp_session, SHOW_PROMPTS, INTERACTIVE_MODE, RUN_TIMEOUT, FAIL_FAST_PATTERNS, PREFLIGHT, COMPACT_ERRORS, SMOKE, PATCH_EDITS, PARSE_PROMPT
     
     # Parse command line arguments
     parser = argparse.ArgumentParser(
@@ -414,12 +352,47 @@ Examples:
     parser.add_argument("--prompt", help="Prompt for script generation (not used with --scripts)")
     parser.add_argument("--prompt-file", help="Read prompt from file")
     parser.add_argument("--show-prompts", action="store_true", help="Print prompts sent to AI")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR,
+                        help=f"Working directory (default: {DEFAULT_WORK_DIR}; a free {DEFAULT_WORK_DIR}_<n> if in use)")
     parser.add_argument("--mcp-server", help="Path to mcp_server.mjs")
+    parser.add_argument("--renderer", choices=RENDERERS, default=DEFAULT_RENDERER,
+                       help="Render scripts in-process (python), via mcp_server.mjs (node) "
+                            "or via the shared renderer daemon (daemon)")
     parser.add_argument("--generate-only", action="store_true", 
                        help="Only generate/review scripts, don't run them")
+    parser.add_argument("--run-timeout", type=timeout_arg, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout for each script run in seconds, 0 for none (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--no-fail-fast", action="store_true",
+                        help="Let runs continue after fatal output in stderr/ensemble.log")
+    parser.add_argument("--fatal-pattern", action="append", default=[],
+                        help="Extra regex that stops a run early (repeatable)")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the static check of the scripts before each run")
+    parser.add_argument("--full-errors", action="store_true",
+                        help="Give the LLM full stderr/stdout instead of a compacted error")
+    parser.add_argument("--smoke", action="store_true",
+                        help="Check each attempt with a shrunk run (few sims/workers) before the full run")
+    parser.add_argument("--full-rewrites", action="store_true",
+                        help="Have the LLM return whole files instead of edits when fixing or refining scripts")
+    parser.add_argument("--llm-generate", action="store_true",
+                        help="Always let the LLM choose the generator arguments, even for prompts that parse locally")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Cache LLM responses on disk and reuse them for identical requests")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Bypass the LLM response cache (even if LIBE_AGENT_LLM_CACHE is set)")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="Record stage timings, tokens and run memory to a JSONL trace "
+                             "(default file: <work dir>/trace.jsonl) and print a summary at exit")
     args = parser.parse_args()
     
     SHOW_PROMPTS = args.show_prompts
+    RUN_TIMEOUT = args.run_timeout
+    FAIL_FAST_PATTERNS = None if args.no_fail_fast else FATAL_PATTERNS + args.fatal_pattern
+    PREFLIGHT = not args.no_preflight
+    COMPACT_ERRORS = not args.full_errors
+    SMOKE = args.smoke
+    PATCH_EDITS = not args.full_rewrites
+    PARSE_PROMPT = not args.llm_generate
     INTERACTIVE_MODE = args.interactive
     
     # Get prompt (only used for generation, not for reviewing existing scripts)
@@ -432,117 +405,106 @@ Examples:
     else:
         user_prompt = DEFAULT_PROMPT
     
-    output_dir = "generated_scripts"
-    archive_counter = 1
+    workspace = Workspace.open(args.work_dir)
+    output_dir = workspace.path
+    start_trace(args, "libe_agent_interactive", output_dir)
     
-    # Find MCP server
-    mcp_server = find_mcp_server(args.mcp_server)
-    print(f"Generator MCP: {mcp_server}")
-    
-    # Connect to MCP server
-    server_params = StdioServerParameters(command="node", args=[str(mcp_server)])
+    # Find MCP server (only needed when rendering with node)
+    if needs_mcp_server(args.renderer):
+        mcp_server = find_mcp_server(args.mcp_server)
+        print(f"Generator MCP: {mcp_server}{' (renderer daemon)' if args.renderer == 'daemon' else ''}")
+    else:
+        mcp_server = None
+        print("Generator: renderer daemon" if args.renderer == "daemon" else "Generator: in-process renderer")
     
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            mcp_session = session
+    async with open_generator_session(args.renderer, mcp_server) as session:
+        mcp_session = session
+        
+        print("✓ Connected to script generator")
+        
+        # Get MCP tool schema
+        mcp_tools = await session.list_tools()
+        mcp_tool = mcp_tools.tools[0]
+        
+        # Create LangChain tool
+        lc_tool = generator_tool(mcp_tool, call_mcp_tool)
+        
+        # Create agent
+        base_url = os.environ.get("OPENAI_BASE_URL")
+        llm = create_llm(MODEL, base_url=base_url, cache=open_llm_cache(args, MODEL, base_url))
+        agent = create_agent(llm, [lc_tool])
+        print("✓ Agent initialized")
+        
+        # Determine if we're using existing scripts
+        if args.scripts:
+            print(f"\nLoading existing scripts from: {args.scripts}")
+            current_scripts = read_bundle(args.scripts)
+            run_script_name = detect_run_script(args.scripts)
+            if not run_script_name:
+                print("Error: No run_*.py script found")
+                return
             
-            print("✓ Connected to MCP server")
+            # Interactive review of existing scripts
+            with TRACE.stage("review"):
+                current_scripts = await interactive_review(agent, current_scripts)
+            if current_scripts is None:
+                return  # User stopped
+            workspace.save(current_scripts, "reviewed")
+        else:
+            # Generate new scripts
+            if not user_prompt:
+                print("Error: Need --prompt or --prompt-file for generation")
+                return
+                
+            run_script_name = "run_libe.py"
+            with TRACE.stage("generate"):
+                generated_scripts = await run_mcp_generator(agent, user_prompt, mcp_tool.inputSchema)
             
-            # Get MCP tool schema
-            mcp_tools = await session.list_tools()
-            mcp_tool = mcp_tools.tools[0]
+            if not generated_scripts:
+                print("✗ No scripts generated")
+                return
             
-            # Create LangChain tool
-            lc_tool = StructuredTool(
-                name=mcp_tool.name,
-                description=mcp_tool.description,
-                args_schema=mcp_tool.inputSchema,
-                coroutine=call_mcp_tool
-            )
+            workspace.save(generated_scripts, "generated")
             
-            # Create agent
-            llm = ChatOpenAI(
-                model=MODEL,
-                temperature=0,
-                base_url=os.environ.get("OPENAI_BASE_URL"),
-            )
-            agent = create_agent(llm, [lc_tool])
-            print("✓ Agent initialized")
+            # Interactive review
+            with TRACE.stage("review"):
+                current_scripts = await interactive_review(agent, generated_scripts)
+            if current_scripts is None:
+                return  # User stopped
+            workspace.save(current_scripts, "reviewed")
+        
+        # Stop here if generate-only
+        if args.generate_only:
+            print("\n✓ Generation/review complete (--generate-only mode)")
+            return
+        
+        # Run scripts with retry loop
+        for attempt in range(MAX_RETRIES + 1):
+            with TRACE.stage("run", attempt=attempt):
+                success, error_msg = await run_generated_scripts(workspace, run_script_name)
             
-            # Determine if we're using existing scripts
-            if args.scripts:
-                print(f"\nLoading existing scripts from: {args.scripts}")
-                scripts_dir = Path(args.scripts)
-                current_scripts = ""
-                for script_file in sorted(scripts_dir.glob("*.py")):
-                    current_scripts += f"=== {script_file.name} ===\n{script_file.read_text()}\n\n"
-                run_script_name = detect_run_script(args.scripts)
-                if not run_script_name:
-                    print("Error: No run_*.py script found")
-                    return
-                
-                # Interactive review of existing scripts
-                current_scripts = await interactive_review(agent, current_scripts)
-                if current_scripts is None:
-                    return  # User stopped
-                save_scripts(current_scripts, output_dir, f"{archive_counter}_reviewed")
-                archive_counter += 1
-            else:
-                # Generate new scripts
-                if not user_prompt:
-                    print("Error: Need --prompt or --prompt-file for generation")
-                    return
-                    
-                run_script_name = "run_libe.py"
-                scripts_text = await run_mcp_generator(agent, user_prompt)
-                
-                if not scripts_text or "===" not in scripts_text:
-                    print("✗ No scripts generated")
-                    return
-                
-                save_scripts(scripts_text, output_dir, f"{archive_counter}_generated")
-                archive_counter += 1
-                
-                # Interactive review
-                current_scripts = await interactive_review(agent, scripts_text)
-                if current_scripts is None:
-                    return  # User stopped
-                save_scripts(current_scripts, output_dir, f"{archive_counter}_reviewed")
-                archive_counter += 1
+            if success:
+                print(f"\n{'='*70}")
+                print("  ✓ SUCCESS - Scripts completed successfully!")
+                print('='*70)
+                break
             
-            # Stop here if generate-only
-            if args.generate_only:
-                print("\n✓ Generation/review complete (--generate-only mode)")
-                return
+            workspace.archive_outputs(ARCHIVE_ITEMS, error_msg)
             
-            # Run scripts with retry loop
-            for attempt in range(MAX_RETRIES + 1):
-                current_archive = f"{archive_counter-1}_attempt_{attempt}" if attempt > 0 else f"{archive_counter-1}_reviewed"
-                success, error_msg = run_generated_scripts(output_dir, run_script_name)
-                
-                if success:
-                    print(f"\n{'='*70}")
-                    print("  ✓ SUCCESS - Scripts completed successfully!")
-                    print('='*70)
-                    break
+            if attempt < MAX_RETRIES:
+                print(f"\n{'='*70}")
+                print(f"  Retry attempt {attempt + 1}/{MAX_RETRIES}")
+                print('='*70)
                 
-                archive_run_outputs(output_dir, current_archive, error_msg)
-                
-                if attempt < MAX_RETRIES:
-                    print(f"\n{'='*70}")
-                    print(f"  Retry attempt {attempt + 1}/{MAX_RETRIES}")
-                    print('='*70)
-                    
+                with TRACE.stage("fix", attempt=attempt + 1):
                     current_scripts = await fix_scripts(
                         agent, current_scripts, error_msg, run_script_name
                     )
-                    archive_counter += 1
-                    save_scripts(current_scripts, output_dir, f"{archive_counter}_fix_{attempt+1}")
-                else:
-                    print(f"\n{'='*70}")
-                    print(f"  ✗ FAILED after {MAX_RETRIES} retry attempts")
-                    print('='*70)
+                workspace.save(current_scripts, f"fix_{attempt+1}")
+            else:
+                print(f"\n{'='*70}")
+                print(f"  ✗ FAILED after {MAX_RETRIES} retry attempts")
+                print('='*70)
 
 
 if __name__ == "__main__":
@@ -16,33 +16,30 @@ For options: python libe_agent_interactive_llm_first.py -h
 import os
 import sys
 import asyncio
-import re
-import subprocess
 import argparse
 import shutil
 import time
 from pathlib import Path
 from typing import Optional
-from pydantic import BaseModel, Field, create_model
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_agent
-from langchain_core.tools import StructuredTool
-from langchain_core.messages import HumanMessage
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-
-
-DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
-DEFAULT_ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
-if os.environ.get("LLM_MODEL"):
-    MODEL = os.environ["LLM_MODEL"]
-elif os.environ.get("OPENAI_API_KEY") or not os.environ.get("ANTHROPIC_API_KEY"):
-    MODEL = DEFAULT_OPENAI_MODEL
-else:
-    MODEL = DEFAULT_ANTHROPIC_MODEL
+from agent_core.bundle import bundle_from_tool_result, write_bundle
+from agent_core.compact_errors import compact_for_prompt, sources_from_dir
+from agent_core.context import CONTEXT_TOKENS, compact_history
+from agent_core.debug_log import DEBUG_LOG_FILE, DebugLog
+from agent_core.generator_session import (
+    DEFAULT_RENDERER, RENDERERS, find_mcp_server, needs_mcp_server, open_generator_session,
+)
+from agent_core.llm import create_agent, create_llm, default_model, make_tool
+from agent_core.llm_cache import open_llm_cache
+from agent_core.preflight import preflight
+from agent_core.runner import DEFAULT_TIMEOUT, FATAL_PATTERNS, FailFastWatcher, run_script, timeout_arg
+from agent_core.run_archive import OutputCompressor
+from agent_core.trace import TRACE, start_trace
+from agent_core.workspace import DEFAULT_WORK_DIR, Workspace
+
+
+MODEL = default_model()
 SHOW_PROMPTS = False
 
-ARCHIVE_RUNS_DIR = "archive_runs"
 SKILLS_DIR = Path(__file__).parent / "skills"
 
 INPUT_MARKER = "[INPUT_REQUESTED]"
@@ -86,12 +83,26 @@ ARCHIVE_ITEMS = [
 
 # Global state
 mcp_session = None
-WORK_DIR = None
-ARCHIVE_COUNTER = 1
-CURRENT_ARCHIVE = None
+WORKSPACE = None
+
+# Timeout for each script run in seconds (--run-timeout; None for no limit)
+RUN_TIMEOUT = DEFAULT_TIMEOUT
+
+# Output regexes that stop a run early (--fatal-pattern, --no-fail-fast; None disables)
+FAIL_FAST_PATTERNS = FATAL_PATTERNS
+
+# Static pre-flight check before each run (--no-preflight to disable)
+PREFLIGHT = True
+
+# Compact run errors (tracebacks, relevant source lines) for the LLM (--full-errors to disable)
+COMPACT_ERRORS = True
+COMPRESSOR = None
 USER_PROMPT = None
 DEBUG_LOG = None
 
+# Conversation history budget in estimated tokens (--context-tokens; 0 keeps everything)
+CONTEXT_BUDGET = CONTEXT_TOKENS
+
 
 # ── Skills ───────────────────────────────────────────────────
 
@@ -111,77 +122,29 @@ def load_skill_index():
 # ── Debug logging ─────────────────────────────────────────────
 
 def dump_messages(messages, label=""):
-    """Write full message history to DEBUG_LOG file."""
-    if not DEBUG_LOG:
-        return
-    with open(DEBUG_LOG, "a") as f:
-        f.write(f"\n{'='*80}\n")
-        if label:
-            f.write(f"  {label}\n{'='*80}\n")
-        for msg in messages:
-            role = type(msg).__name__
-            f.write(f"\n--- {role} ---\n")
-            if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                f.write("[Tool calls]\n")
-                for tc in msg.tool_calls:
-                    f.write(f"  {tc.get('name', '?')}({tc.get('args', {})})\n")
-            content = msg.content if isinstance(msg.content, str) else str(msg.content)
-            if content:
-                if len(content) > 2000:
-                    f.write(content[:1000] + f"\n... [{len(content)} chars total] ...\n" + content[-500:] + "\n")
-                else:
-                    f.write(content + "\n")
-        f.write(f"\n{'='*80}\n\n")
+    """Append the messages not yet in the debug log (debug_log.jsonl + debug_log.txt)."""
+    if DEBUG_LOG:
+        DEBUG_LOG.messages(messages, label)
 
 
 # ── Archive helpers ──────────────────────────────────────────
 
-def archive_existing_output_dir(output_dir, archive_parent=None):
-    """If output_dir exists, move it to archive_parent/output_dir_<unique>, then create fresh."""
-    output_dir = Path(output_dir)
-    archive_dir = Path(archive_parent or ARCHIVE_RUNS_DIR)
-    if not output_dir.exists():
-        output_dir.mkdir(parents=True, exist_ok=True)
-        return
-    archive_dir.mkdir(parents=True, exist_ok=True)
-    dest = archive_dir / f"{output_dir.name}_{hex(time.time_ns())[2:10]}"
-    shutil.move(str(output_dir), str(dest))
-    print(f"Moved existing {output_dir} to {dest}")
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-
 def start_new_archive(action):
-    global ARCHIVE_COUNTER, CURRENT_ARCHIVE
-    CURRENT_ARCHIVE = f"{ARCHIVE_COUNTER}_{action}"
-    (WORK_DIR / "versions" / CURRENT_ARCHIVE).mkdir(parents=True, exist_ok=True)
-    ARCHIVE_COUNTER += 1
+    WORKSPACE.new_version(action)
 
 
 def archive_current_scripts():
-    if not CURRENT_ARCHIVE:
+    if not WORKSPACE.current:
         return
-    dest = WORK_DIR / "versions" / CURRENT_ARCHIVE
-    for f in WORK_DIR.glob("*.py"):
-        shutil.copy(f, dest / f.name)
+    WORKSPACE.snapshot()
 
 
 def archive_run_output(error_msg=""):
-    if not CURRENT_ARCHIVE:
+    if not WORKSPACE.current:
         return
-    output_dir = WORK_DIR / "versions" / CURRENT_ARCHIVE / "output"
-    output_dir.mkdir(parents=True, exist_ok=True)
-    if error_msg:
-        (output_dir / "error.txt").write_text(error_msg)
-    for item in ARCHIVE_ITEMS:
-        item_path = WORK_DIR / item
-        if item_path.exists() and item_path.is_dir():
-            shutil.copytree(str(item_path), str(output_dir / item), dirs_exist_ok=True)
-            shutil.rmtree(str(item_path))
-        else:
-            for fp in WORK_DIR.glob(item):
-                if fp.is_file():
-                    shutil.copy(str(fp), str(output_dir / fp.name))
-                    fp.unlink()
+    output_dir = WORKSPACE.archive_outputs(ARCHIVE_ITEMS, error_msg)
+    if COMPRESSOR:
+        COMPRESSOR.submit(output_dir)
 
 
 # ── MCP schema conversion ────────────────────────────────────
@@ -194,6 +157,8 @@ def mcp_tool_to_pydantic(mcp_tool):
     Without this, StructuredTool receives a raw dict and the LLM never
     sees the parameter names or descriptions — so it can't fill them in.
     """
+    from pydantic import Field, create_model
+
     props = mcp_tool.inputSchema.get("properties", {})
     field_defs = {}
     for name, spec in props.items():
@@ -207,52 +172,64 @@ def mcp_tool_to_pydantic(mcp_tool):
 
 # ── Tool schemas ─────────────────────────────────────────────
 
-class RunScriptInput(BaseModel):
-    script_name: str = Field(description="Name of the Python script to run")
+def tool_input_schemas():
+    """Input models of the file/run tools (pydantic is imported when the agent starts, not for --help)"""
+    from pydantic import BaseModel, Field
 
-class ReadFileInput(BaseModel):
-    filepath: str = Field(description="Path to file relative to work directory")
+    class RunScriptInput(BaseModel):
+        script_name: str = Field(description="Name of the Python script to run")
 
-class WriteFileInput(BaseModel):
-    filepath: str = Field(description="Path to file relative to work directory")
-    content: str = Field(description="Full content to write")
+    class ReadFileInput(BaseModel):
+        filepath: str = Field(description="Path to file relative to work directory")
 
-class ListFilesInput(BaseModel):
-    pass
+    class WriteFileInput(BaseModel):
+        filepath: str = Field(description="Path to file relative to work directory")
+        content: str = Field(description="Full content to write")
 
-class ReadSkillInput(BaseModel):
-    filename: str = Field(description="Name of the skill file to read (e.g. 'aposmm.md', 'generators.md')")
+    class ListFilesInput(BaseModel):
+        pass
+
+    class ReadSkillInput(BaseModel):
+        filename: str = Field(description="Name of the skill file to read (e.g. 'aposmm.md', 'generators.md')")
+
+    return RunScriptInput, ReadFileInput, WriteFileInput, ListFilesInput, ReadSkillInput
 
 
 # ── Tool implementations ────────────────────────────────────
 
 async def run_script_tool(script_name: str) -> str:
-    script_path = WORK_DIR / script_name
+    script_path = WORKSPACE.path / script_name
     if not script_path.exists():
         return f"ERROR: Script '{script_name}' not found"
 
+    if PREFLIGHT:
+        ok, report = preflight(WORKSPACE.path)
+        if not ok:
+            return f"FAILED: {report}"
+
     print(f"\nRunning {script_name}...", flush=True)
     try:
-        result = subprocess.run(
-            ["python", script_name], cwd=WORK_DIR,
-            capture_output=True, text=True, timeout=300
-        )
-        if result.returncode == 0:
+        watcher = FailFastWatcher(FAIL_FAST_PATTERNS, WORKSPACE.path / "ensemble.log") if FAIL_FAST_PATTERNS else None
+        result = await run_script(script_name, WORKSPACE.path, timeout=RUN_TIMEOUT, watcher=watcher)
+        if result.ok:
             print("✓ Script ran successfully", flush=True)
-            return f"SUCCESS\nOutput:\n{result.stdout[:500]}"
-        else:
-            error_msg = f"Return code {result.returncode}\nStderr: {result.stderr}\nStdout: {result.stdout}"
-            print(f"✗ Failed (code {result.returncode})", flush=True)
-            archive_run_output(error_msg)
-            return f"FAILED (code {result.returncode})\nStderr:\n{result.stderr}\nStdout:\n{result.stdout[:500]}"
-    except subprocess.TimeoutExpired:
-        return "ERROR: Script timed out (300s)"
+            return f"SUCCESS\nOutput:\n{result.stdout[-500:]}"
+        print(f"✗ Script {result.summary()}", flush=True)
+        status = f"{'ERROR' if result.timed_out else 'FAILED'}: Script {result.summary()}"
+        error_msg = result.error_message()
+        await asyncio.to_thread(archive_run_output, error_msg)
+        if COMPACT_ERRORS:
+            return f"{status}\n{compact_for_prompt(error_msg, sources_from_dir(WORKSPACE.path))}"
+        msg = f"{status}\nStderr:\n{result.stderr}\nStdout:\n{result.stdout[-500:]}"
+        if result.log_excerpt:
+            msg += f"\nensemble.log (last lines):\n{result.log_excerpt}"
+        return msg
     except Exception as e:
         return f"ERROR: {e}"
 
 
 async def read_file_tool(filepath: str) -> str:
-    file_path = WORK_DIR / filepath
+    file_path = WORKSPACE.path / filepath
     if not file_path.exists():
         return f"ERROR: File '{filepath}' not found"
     return file_path.read_text()
@@ -260,17 +237,17 @@ async def read_file_tool(filepath: str) -> str:
 
 async def write_file_tool(filepath: str, content: str) -> str:
     try:
-        (WORK_DIR / filepath).write_text(content)
+        (WORKSPACE.path / filepath).write_text(content)
         start_new_archive("fix")
         archive_current_scripts()
-        print(f"- Saved: {WORK_DIR / filepath}", flush=True)
+        print(f"- Saved: {WORKSPACE.path / filepath}", flush=True)
         return f"SUCCESS: Wrote {filepath}"
     except Exception as e:
         return f"ERROR: {e}"
 
 
 async def list_files_tool() -> str:
-    py_files = list(WORK_DIR.glob("*.py"))
+    py_files = list(WORKSPACE.path.glob("*.py"))
     if not py_files:
         return "No Python files found"
     return "Files:\n" + "\n".join(f"- {f.name}" for f in py_files)
@@ -292,12 +269,9 @@ async def generate_scripts_mcp(**kwargs):
     result = await mcp_session.call_tool("CreateLibEnsembleScripts", kwargs)
     scripts_text = result.content[0].text if result.content else ""
 
-    if scripts_text and "===" in scripts_text:
-        WORK_DIR.mkdir(exist_ok=True)
-        pattern = r"=== (.+?) ===\n(.*?)(?=\n===|$)"
-        for filename, content in re.findall(pattern, scripts_text, re.DOTALL):
-            (WORK_DIR / filename.strip()).write_text(content.strip() + "\n")
-            print(f"- Saved: {WORK_DIR / filename.strip()}", flush=True)
+    bundle = bundle_from_tool_result(result)
+    if bundle:
+        write_bundle(bundle, WORKSPACE.path)
         start_new_archive("generated")
         archive_current_scripts()
 
@@ -312,43 +286,10 @@ async def generate_scripts_mcp(**kwargs):
     return scripts_text + reminder
 
 
-# ── LLM factory ──────────────────────────────────────────────
-
-def create_llm(model, temperature=0, base_url=None):
-    """Create LLM — ChatAnthropic for Claude models, ChatOpenAI otherwise."""
-    if "claude" in model.lower():
-        try:
-            from langchain_anthropic import ChatAnthropic
-        except ImportError:
-            sys.exit("Error: pip install langchain-anthropic required for Claude models")
-        return ChatAnthropic(model=model, temperature=temperature)
-    return ChatOpenAI(model=model, temperature=temperature, base_url=base_url)
-
-
-# ── MCP server discovery ────────────────────────────────────
-
-def find_mcp_server(user_path=None):
-    locations = []
-    if user_path:
-        locations.append(Path(user_path))
-    env_path = os.environ.get('GENERATOR_MCP_SERVER')
-    if env_path:
-        locations.append(Path(env_path))
-    locations.extend([
-        Path(__file__).parent.parent / "mcp_server.mjs",
-        Path.cwd() / "mcp_server.mjs"
-    ])
-    for loc in locations:
-        if loc.exists():
-            return loc
-    print("Error: Cannot find mcp_server.mjs")
-    sys.exit(1)
-
-
 # ── Main ─────────────────────────────────────────────────────
 
 async def main():
-    global mcp_session, WORK_DIR, SHOW_PROMPTS, USER_PROMPT
+    global mcp_session, WORKSPACE, SHOW_PROMPTS, USER_PROMPT, RUN_TIMEOUT, FAIL_FAST_PATTERNS, PREFLIGHT, COMPACT_ERRORS, CONTEXT_BUDGET
 
     parser = argparse.ArgumentParser(
         description="Interactive agent for libEnsemble scripts",
@@ -367,139 +308,181 @@ Examples:
     parser.add_argument("--show-prompts", action="store_true")
     parser.add_argument("--debug", action="store_true", help="Dump full message log to debug_log.txt")
     parser.add_argument("--mcp-server", help="Path to mcp_server.mjs")
+    parser.add_argument("--renderer", choices=RENDERERS, default=DEFAULT_RENDERER,
+                        help="Render scripts in-process (python), via mcp_server.mjs (node) "
+                             "or via the shared renderer daemon (daemon)")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR,
+                        help=f"Working directory (default: {DEFAULT_WORK_DIR}; a free {DEFAULT_WORK_DIR}_<n> if in use)")
     parser.add_argument("--generate-only", action="store_true")
     parser.add_argument("--max-iterations", type=int, default=15)
+    parser.add_argument("--compress-outputs", action="store_true",
+                        help="Compress older run outputs to output.tar.zst in the background (needs zstandard)")
+    parser.add_argument("--run-timeout", type=timeout_arg, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout for each script run in seconds, 0 for none (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--no-fail-fast", action="store_true",
+                        help="Let runs continue after fatal output in stderr/ensemble.log")
+    parser.add_argument("--fatal-pattern", action="append", default=[],
+                        help="Extra regex that stops a run early (repeatable)")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="Skip the static check of the scripts before each run")
+    parser.add_argument("--full-errors", action="store_true",
+                        help="Give the LLM full stderr/stdout instead of a compacted error")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Cache LLM responses on disk and reuse them for identical requests")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Bypass the LLM response cache (even if LIBE_AGENT_LLM_CACHE is set)")
+    parser.add_argument("--context-tokens", type=int, default=CONTEXT_TOKENS,
+                        help="Compact the chat history when it exceeds about this many tokens (0 disables)")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="Record stage timings, tokens and run memory to a JSONL trace "
+                             "(default file: <work dir>/trace.jsonl) and print a summary at exit")
     args = parser.parse_args()
 
+    global COMPRESSOR
+    if args.compress_outputs:
+        if not OutputCompressor.available():
+            print("Error: --compress-outputs requires zstandard (pip install zstandard)")
+            sys.exit(1)
+        COMPRESSOR = OutputCompressor()
+
     SHOW_PROMPTS = args.show_prompts
+    RUN_TIMEOUT = args.run_timeout
+    FAIL_FAST_PATTERNS = None if args.no_fail_fast else FATAL_PATTERNS + args.fatal_pattern
+    PREFLIGHT = not args.no_preflight
+    COMPACT_ERRORS = not args.full_errors
+    CONTEXT_BUDGET = args.context_tokens
     interactive = args.interactive
 
     global DEBUG_LOG
     if args.debug or os.environ.get("AGENT_DEBUG"):
-        DEBUG_LOG = "debug_log.txt"
-        with open(DEBUG_LOG, "w") as f:
-            f.write(f"Debug log started: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Model: {MODEL}\n\n")
+        DEBUG_LOG = DebugLog(DEBUG_LOG_FILE)
+        DEBUG_LOG.note(f"Debug log started: {time.strftime('%Y-%m-%d %H:%M:%S')}\nModel: {MODEL}\n")
 
-    archive_existing_output_dir("generated_scripts")
-    WORK_DIR = Path("generated_scripts")
+    WORKSPACE = Workspace.open(args.work_dir)
+    start_trace(args, "libe_agent_interactive_llm_first", WORKSPACE.path)
 
     # Load skills into system prompt
     skill_index = load_skill_index()
     system_prompt = SYSTEM_PROMPT.format(skill_index=skill_index)
 
     if DEBUG_LOG:
-        with open(DEBUG_LOG, "a") as f:
-            f.write("SYSTEM PROMPT\n" + "="*80 + "\n")
-            f.write(system_prompt + "\n\n")
-
-    # Connect to MCP server
-    mcp_server = find_mcp_server(args.mcp_server)
-    print(f"Generator MCP: {mcp_server}")
-    server_params = StdioServerParameters(command="node", args=[str(mcp_server)])
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            mcp_session = session
-            print("✓ Connected to MCP server")
-
-            mcp_tools = await session.list_tools()
-            mcp_tool = mcp_tools.tools[0]
-
-            mcp_schema = mcp_tool_to_pydantic(mcp_tool)
-            tools = [
-                StructuredTool(
-                    name=mcp_tool.name, description=mcp_tool.description,
-                    args_schema=mcp_schema, coroutine=generate_scripts_mcp
-                ),
-                StructuredTool(name="run_script", description="Run a Python script. Returns SUCCESS or FAILED with error details.", args_schema=RunScriptInput, coroutine=run_script_tool),
-                StructuredTool(name="read_file", description="Read a file to inspect its contents.", args_schema=ReadFileInput, coroutine=read_file_tool),
-                StructuredTool(name="write_file", description="Write/overwrite a file to fix scripts.", args_schema=WriteFileInput, coroutine=write_file_tool),
-                StructuredTool(name="list_files", description="List Python files in working directory.", args_schema=ListFilesInput, coroutine=list_files_tool),
-                StructuredTool(name="read_skill", description="Read a reference doc about generators, optimizer options, or configuration.", args_schema=ReadSkillInput, coroutine=read_skill_tool),
-            ]
-
-            if DEBUG_LOG:
-                with open(DEBUG_LOG, "a") as f:
-                    f.write("TOOL SCHEMAS\n" + "="*80 + "\n")
-                    for t in tools:
-                        f.write(f"\n{t.name}: {t.description}\n")
-                        if t.args_schema:
-                            f.write(f"  Schema: {t.args_schema.model_json_schema()}\n")
-
-            llm = create_llm(MODEL, base_url=os.environ.get("OPENAI_BASE_URL"))
-            agent = create_agent(llm, tools, system_prompt=system_prompt)
-            print("✓ Agent initialized\n")
-
-            # Build initial user message
-            messages = []
-
-            if args.scripts:
-                scripts_dir = Path(args.scripts)
-                for f in sorted(scripts_dir.glob("*.py")):
-                    shutil.copy(f, WORK_DIR)
-                    print(f"Copied: {f.name}")
-                start_new_archive("copied_scripts")
-                archive_current_scripts()
-                run_scripts = list(WORK_DIR.glob("run_*.py"))
-                run_name = run_scripts[0].name if run_scripts else "run_libe.py"
-                initial_msg = f"I have libEnsemble scripts. The main script is '{run_name}'. Please review them and highlight the key configuration."
-            elif args.prompt:
-                initial_msg = args.prompt
-            elif args.prompt_file:
-                initial_msg = Path(args.prompt_file).read_text()
-            elif interactive:
-                print("Describe the scripts you want to generate (or press Enter for default demo):", flush=True)
-                print(INPUT_MARKER, flush=True)
-                user_input = input().strip()
-                initial_msg = user_input if user_input else DEFAULT_PROMPT
-                if not user_input:
-                    print("Using default demo prompt")
-            else:
-                initial_msg = DEFAULT_PROMPT
-
-            USER_PROMPT = initial_msg
-
-            if not interactive:
-                # Autonomous: single invocation
-                goal = f"{initial_msg}\n\nAfter generating/loading scripts: review them, run them, fix errors and retry (max 3 attempts). Report the result."
-                messages.append(HumanMessage(content=goal))
-                if SHOW_PROMPTS:
-                    print(f"Goal: {goal}\n")
-                print("Starting agent...\n")
+        DEBUG_LOG.section("SYSTEM PROMPT", system_prompt)
+
+    # Connect to script generator (in-process renderer or MCP server)
+    if needs_mcp_server(args.renderer):
+        mcp_server = find_mcp_server(args.mcp_server)
+        print(f"Generator MCP: {mcp_server}{' (renderer daemon)' if args.renderer == 'daemon' else ''}")
+    else:
+        mcp_server = None
+        print("Generator: renderer daemon" if args.renderer == "daemon" else "Generator: in-process renderer")
+
+    async with open_generator_session(args.renderer, mcp_server) as session:
+        mcp_session = session
+        print("✓ Connected to script generator")
+
+        mcp_tools = await session.list_tools()
+        mcp_tool = mcp_tools.tools[0]
+
+        mcp_schema = mcp_tool_to_pydantic(mcp_tool)
+        RunScriptInput, ReadFileInput, WriteFileInput, ListFilesInput, ReadSkillInput = tool_input_schemas()
+        tools = [
+            make_tool(
+                name=mcp_tool.name, description=mcp_tool.description,
+                args_schema=mcp_schema, coroutine=TRACE.wrap("render", generate_scripts_mcp)
+            ),
+            make_tool(name="run_script", description="Run a Python script. Returns SUCCESS or FAILED with error details.", args_schema=RunScriptInput, coroutine=TRACE.wrap("run", run_script_tool)),
+            make_tool(name="read_file", description="Read a file to inspect its contents.", args_schema=ReadFileInput, coroutine=read_file_tool),
+            make_tool(name="write_file", description="Write/overwrite a file to fix scripts.", args_schema=WriteFileInput, coroutine=TRACE.wrap("write", write_file_tool)),
+            make_tool(name="list_files", description="List Python files in working directory.", args_schema=ListFilesInput, coroutine=list_files_tool),
+            make_tool(name="read_skill", description="Read a reference doc about generators, optimizer options, or configuration.", args_schema=ReadSkillInput, coroutine=read_skill_tool),
+        ]
+
+        if DEBUG_LOG:
+            schemas = []
+            for t in tools:
+                schemas.append(f"\n{t.name}: {t.description}")
+                if t.args_schema:
+                    schemas.append(f"  Schema: {t.args_schema.model_json_schema()}")
+            DEBUG_LOG.section("TOOL SCHEMAS", "\n".join(schemas))
+
+        base_url = os.environ.get("OPENAI_BASE_URL")
+        llm = create_llm(MODEL, base_url=base_url, cache=open_llm_cache(args, MODEL, base_url))
+        agent = create_agent(llm, tools, system_prompt=system_prompt)
+        print("✓ Agent initialized\n")
+
+        from langchain_core.messages import HumanMessage
+
+        # Build initial user message
+        messages = []
+
+        if args.scripts:
+            scripts_dir = Path(args.scripts)
+            for f in sorted(scripts_dir.glob("*.py")):
+                shutil.copy(f, WORKSPACE.path)
+                print(f"Copied: {f.name}")
+            start_new_archive("copied_scripts")
+            archive_current_scripts()
+            run_scripts = list(WORKSPACE.path.glob("run_*.py"))
+            run_name = run_scripts[0].name if run_scripts else "run_libe.py"
+            initial_msg = f"I have libEnsemble scripts. The main script is '{run_name}'. Please review them and highlight the key configuration."
+        elif args.prompt:
+            initial_msg = args.prompt
+        elif args.prompt_file:
+            initial_msg = Path(args.prompt_file).read_text()
+        elif interactive:
+            print("Describe the scripts you want to generate (or press Enter for default demo):", flush=True)
+            print(INPUT_MARKER, flush=True)
+            user_input = input().strip()
+            initial_msg = user_input if user_input else DEFAULT_PROMPT
+            if not user_input:
+                print("Using default demo prompt")
+        else:
+            initial_msg = DEFAULT_PROMPT
+
+        USER_PROMPT = initial_msg
+
+        if not interactive:
+            # Autonomous: single invocation
+            goal = f"{initial_msg}\n\nAfter generating/loading scripts: review them, run them, fix errors and retry (max 3 attempts). Report the result."
+            messages.append(HumanMessage(content=goal))
+            if SHOW_PROMPTS:
+                print(f"Goal: {goal}\n")
+            print("Starting agent...\n")
+            with TRACE.stage("agent"):
                 result = await agent.ainvoke({"messages": messages})
-                dump_messages(result["messages"], "Autonomous run complete")
-                print(f"\n{'='*60}")
-                print("✓ Agent completed")
-                print(f"{'='*60}")
-                print(result["messages"][-1].content)
-            else:
-                # Interactive: chat loop
-                messages.append(HumanMessage(content=initial_msg))
-                print("Starting agent...\n")
-
-                turn = 0
-                while True:
-                    try:
+            dump_messages(result["messages"], "Autonomous run complete")
+            print(f"\n{'='*60}")
+            print("✓ Agent completed")
+            print(f"{'='*60}")
+            print(result["messages"][-1].content)
+        else:
+            # Interactive: chat loop
+            messages.append(HumanMessage(content=initial_msg))
+            print("Starting agent...\n")
+
+            turn = 0
+            while True:
+                try:
+                    messages = compact_history(messages, WORKSPACE.path, CONTEXT_BUDGET, WORKSPACE.current)
+                    with TRACE.stage("turn", turn=turn + 1):
                         result = await agent.ainvoke({"messages": messages})
-                        messages = result["messages"]
-                        turn += 1
-                        dump_messages(messages, f"Interactive turn {turn}")
-                        response = messages[-1].content
-                        if response:
-                            print(f"\n{response}", flush=True)
-                    except Exception as e:
-                        print(f"\n⚠️ Agent error: {e}", flush=True)
+                    messages = result["messages"]
+                    turn += 1
+                    dump_messages(messages, f"Interactive turn {turn}")
+                    response = messages[-1].content
+                    if response:
+                        print(f"\n{response}", flush=True)
+                except Exception as e:
+                    print(f"\n⚠️ Agent error: {e}", flush=True)
 
-                    print(INPUT_MARKER, flush=True)
-                    user_input = input().strip()
+                print(INPUT_MARKER, flush=True)
+                user_input = input().strip()
 
-                    if not user_input or user_input.lower() in ('quit', 'exit', 'done'):
-                        print("\n✓ Session ended")
-                        break
+                if not user_input or user_input.lower() in ('quit', 'exit', 'done'):
+                    print("\n✓ Session ended")
+                    break
 
-                    messages.append(HumanMessage(content=user_input))
+                messages.append(HumanMessage(content=user_input))
 
 
 if __name__ == "__main__":
@@ -513,3 +496,6 @@ if __name__ == "__main__":
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if COMPRESSOR:
+            COMPRESSOR.close()
@@ -0,0 +1,33 @@
+"""Bundle directories of agent_core.batch (run from agentic/: python -m pytest tests)"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_core.batch import bundle_dir_name, render_batch  # noqa: E402
+
+
+@pytest.mark.parametrize("app_ref, name", [
+    ("six_hump_camel", "0007_six_hump_camel"),
+    ("x/../../../escaped", "0007_x_.._.._.._escaped"),
+    ("/etc/passwd", "0007__etc_passwd"),
+    ("..", "0007_.."),
+    (None, "0007"),
+])
+def test_bundle_dir_name_is_one_component(app_ref, name):
+    assert bundle_dir_name(7, {"app_ref": app_ref}) == name
+
+
+def test_app_ref_cannot_escape_output_dir(tmp_path):
+    output_dir = tmp_path / "out"
+    manifest = render_batch([{"app_ref": "x/../../../escaped"}], output_dir, workers=1)
+    assert not (tmp_path / "escaped").exists()
+    assert [p.name for p in output_dir.iterdir() if p.is_dir()] == [manifest[0]["directory"]]
+    assert "error" not in manifest[0]
+    bundle_dir = output_dir / manifest[0]["directory"]
+    assert json.loads((bundle_dir / "params.json").read_text()) == {"app_ref": "x/../../../escaped"}
+    assert sorted(manifest[0]["files"]) == sorted(p.name for p in bundle_dir.iterdir() if p.name != "params.json")
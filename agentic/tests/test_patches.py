@@ -0,0 +1,177 @@
+"""Edits from LLM replies in agent_core.patches (run from agentic/: python -m pytest tests)"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_core.bundle import make_file  # noqa: E402
+from agent_core.patches import apply_reply, merge_full_files, parse_reply, request_edits  # noqa: E402
+
+SIMF = """import numpy as np
+
+
+def sim_f(H, persis_info, sim_specs, libE_info):
+    x = H["x"][0]
+    out = np.zeros(1, dtype=sim_specs["out"])
+    out["f"] = x[0] ** 2
+    return out, persis_info
+"""
+
+RUN = """from simf import sim_f
+
+nworkers = 4
+sim_max = 100
+"""
+
+BUNDLE = [make_file("run_libe.py", RUN), make_file("simf.py", SIMF)]
+
+
+def contents(bundle):
+    return {entry["filename"]: entry["content"] for entry in bundle}
+
+
+def test_parse_reply_kinds():
+    text = """=== simf.py ===
+<<<<<<< SEARCH
+    out["f"] = x[0] ** 2
+=======
+    out["f"] = x[0] ** 2 + x[1] ** 2
+>>>>>>> REPLACE
+
+--- a/run_libe.py
++++ b/run_libe.py
+@@ -3,2 +3,2 @@
+-nworkers = 4
++nworkers = 8
+ sim_max = 100
+
+=== extra.py ===
+print("new")
+"""
+    edits = parse_reply(text)
+    assert [(e.filename, e.kind) for e in edits] == [("simf.py", "blocks"), ("run_libe.py", "diff"), ("extra.py", "full")]
+    assert edits[0].blocks == [(['    out["f"] = x[0] ** 2'], ['    out["f"] = x[0] ** 2 + x[1] ** 2'])]
+    assert edits[1].hunks[0].old == ["nworkers = 4", "sim_max = 100"]
+    assert edits[2].content == 'print("new")\n'
+
+    result = apply_reply(BUNDLE, text)
+    assert result.changed == ["simf.py", "run_libe.py", "extra.py"] and not result.conflicts
+    assert [entry["filename"] for entry in result.bundle] == ["run_libe.py", "simf.py", "extra.py"]
+
+
+def test_search_replace():
+    result = apply_reply(BUNDLE, """=== simf.py ===
+<<<<<<< SEARCH
+    out["f"] = x[0] ** 2
+=======
+    out["f"] = x[0] ** 2 + x[1] ** 2
+>>>>>>> REPLACE
+""")
+    assert result.changed == ["simf.py"] and not result.conflicts
+    assert contents(result.bundle)["simf.py"] == SIMF.replace('x[0] ** 2\n', 'x[0] ** 2 + x[1] ** 2\n')
+    assert contents(result.bundle)["run_libe.py"] == RUN
+    assert [entry["filename"] for entry in result.bundle] == ["run_libe.py", "simf.py"]
+
+
+def test_unified_diff_with_shifted_line_numbers():
+    result = apply_reply(BUNDLE, """--- a/run_libe.py
++++ b/run_libe.py
+@@ -10,2 +10,2 @@
+-nworkers = 4
++nworkers = 8
+ sim_max = 100
+""")
+    assert result.changed == ["run_libe.py"] and result.kinds == {"diff"}
+    assert contents(result.bundle)["run_libe.py"] == RUN.replace("nworkers = 4", "nworkers = 8")
+
+
+def test_context_mismatch_is_a_conflict():
+    result = apply_reply(BUNDLE, """--- a/simf.py
++++ b/simf.py
+@@ -7,1 +7,1 @@
+-    out["f"] = x[1] ** 2
++    out["f"] = x[1] ** 3
+=== run_libe.py ===
+<<<<<<< SEARCH
+sim_max = 100
+=======
+sim_max = 10
+>>>>>>> REPLACE
+""")
+    assert result.changed == ["run_libe.py"]
+    assert [name for name, _ in result.conflicts] == ["simf.py"]
+    assert "context does not match" in result.conflicts[0][1]
+    assert contents(result.bundle)["simf.py"] == SIMF
+
+
+def test_ambiguous_search_is_a_conflict():
+    result = apply_reply([make_file("a.py", "x = 1\nx = 1\n")], """=== a.py ===
+<<<<<<< SEARCH
+x = 1
+=======
+x = 2
+>>>>>>> REPLACE
+""")
+    assert not result.changed
+    assert "ambiguous" in result.conflicts[0][1]
+
+
+def test_fallback_merge_resolves_returned_files_only():
+    result = apply_reply(BUNDLE + [make_file("gen.py", "g = 1\n")], """=== simf.py ===
+<<<<<<< SEARCH
+not in the file
+=======
+x
+>>>>>>> REPLACE
+=== gen.py ===
+<<<<<<< SEARCH
+not in the file either
+=======
+y
+>>>>>>> REPLACE
+""")
+    assert [name for name, _ in result.conflicts] == ["simf.py", "gen.py"]
+    merge_full_files(result, "=== simf.py ===\n" + SIMF.replace("** 2", "** 4"))
+    assert result.changed == ["simf.py"] and result.kinds == {"fallback"}
+    assert contents(result.bundle)["simf.py"] == SIMF.replace("** 2", "** 4")
+    assert [name for name, _ in result.conflicts] == ["gen.py"]
+
+
+class ScriptedAgent:
+    """Agent replying with the given texts in turn"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    async def ainvoke(self, state):
+        reply = SimpleNamespace(type="ai", content=self.replies.pop(0), usage_metadata={"output_tokens": 10})
+        return {"messages": list(state["messages"]) + [reply]}
+
+
+def test_request_edits_falls_back_to_full_files():
+    agent = ScriptedAgent("""=== simf.py ===
+<<<<<<< SEARCH
+not in the file
+=======
+x
+>>>>>>> REPLACE
+""", "=== simf.py ===\n" + SIMF.replace("** 2", "** 4"))
+    result = asyncio.run(request_edits(agent, BUNDLE, "fix it"))
+    assert result.changed == ["simf.py"] and not result.conflicts
+    assert result.output_tokens == 20
+
+
+def test_request_edits_keeps_conflicts_the_fallback_leaves_out():
+    agent = ScriptedAgent("""=== simf.py ===
+<<<<<<< SEARCH
+not in the file
+=======
+x
+>>>>>>> REPLACE
+""", "=== run_libe.py ===\n" + RUN)
+    result = asyncio.run(request_edits(agent, BUNDLE, "fix it"))
+    assert not result.changed
+    assert [name for name, _ in result.conflicts] == ["simf.py"]
@@ -0,0 +1,83 @@
+"""Bounds handling of agent_core.prompt_params (run from agentic/: python -m pytest tests)"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_core.prompt_params import bounds_in_order, parse_prompt, prompt_to_arguments  # noqa: E402
+
+DEFAULT_STYLE_PROMPT = """Create six_hump_camel APOSMM scripts:
+- Executable: /path/to/six_hump_camel.x
+- Input: /path/to/input.txt
+- Template vars: X0, X1
+- 4 workers, 100 sims.
+- The output file for each simulation is output.txt
+- The bounds should be 0,1 and -1,2 for X0 and X1 respectively
+"""
+
+
+def test_default_style_prompt_is_complete():
+    params = parse_prompt(DEFAULT_STYLE_PROMPT)
+    assert params.complete
+    assert params.values["lb"] == [0, -1]
+    assert params.values["ub"] == [1, 2]
+
+
+@pytest.mark.parametrize("line, lb, ub", [
+    ("- The bounds should be 0,1 and -1,2 for X0 and X1 respectively", [0, -1], [1, 2]),
+    ("- Bounds: [0, 1], [-1.5, 2e1]", [0, -1.5], [1, 20.0]),
+    ("- bounds [-2, -1] and [3, 3]", [-2, 3], [-1, 3]),
+])
+def test_bound_pairs(line, lb, ub):
+    params = parse_prompt(line)
+    assert params.complete
+    assert params.values == {"lb": lb, "ub": ub}
+
+
+@pytest.mark.parametrize("line", [
+    "- Lower bounds are 0, -1 and upper bounds are 1, 2",
+    "- bounds: lb=[0,-1], ub=[1,2]",
+    "- The upper bounds are 1, 2 and the lower bounds 0, -1",
+    "- Bounds: min 0, -1; max 1, 2",
+])
+def test_bounds_per_side_are_left_to_the_llm(line):
+    params = parse_prompt(line)
+    assert not params.complete
+    assert "lb" not in params.values and "ub" not in params.values
+    assert params.unparsed == [line]
+
+
+@pytest.mark.parametrize("line", [
+    "- The bounds should be 1,0 and -1,2 for X0 and X1 respectively",
+    "- bounds: [0, 1], [2, -1]",
+])
+def test_inverted_bounds_are_rejected(line):
+    params = parse_prompt(line)
+    assert not params.complete
+    assert "lb" not in params.values
+
+
+def test_prompt_with_rejected_bounds_is_incomplete():
+    prompt = DEFAULT_STYLE_PROMPT.replace("The bounds should be 0,1 and -1,2 for X0 and X1 respectively",
+                                          "Lower bounds are 0, -1 and upper bounds are 1, 2")
+    params = parse_prompt(prompt)
+    assert not params.complete
+    assert params.values["num_workers"] == 4
+
+
+def test_inverted_bounds_are_not_rendered_without_the_llm():
+    params = parse_prompt(DEFAULT_STYLE_PROMPT)
+    params.values["lb"], params.values["ub"] = [0, 1], [-1, 2]
+    arguments, problems = prompt_to_arguments(params)
+    assert arguments is None
+    assert "lower bounds must not exceed the upper bounds" in problems
+
+
+def test_bounds_in_order():
+    assert bounds_in_order({})
+    assert bounds_in_order({"lb": [0, -1], "ub": [1, 2]})
+    assert not bounds_in_order({"lb": [0, 1], "ub": [-1, 2]})
+    assert not bounds_in_order({"lb": [0], "ub": [1, 2]})
@@ -0,0 +1,108 @@
+"""Script runs in agent_core.runner (run from agentic/: python -m pytest tests)"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_core import runner  # noqa: E402
+from agent_core.runner import run_script  # noqa: E402
+
+MEMORY_SCRIPT = """import subprocess, sys, time
+child = subprocess.Popen([sys.executable, "-c", "import time; block = bytearray(64 * 2**20); time.sleep(1.5)"])
+child.wait()
+"""
+
+
+def write_script(tmp_path, source, name="run_test.py"):
+    (tmp_path / name).write_text(source)
+    return name
+
+
+@pytest.mark.parametrize("has_children", [False, True])
+def test_peak_rss_includes_child_processes(tmp_path, monkeypatch, has_children):
+    if has_children and not runner._HAS_CHILDREN:
+        pytest.skip("kernel does not list /proc/<pid>/task/<tid>/children")
+    monkeypatch.setattr(runner, "_HAS_CHILDREN", has_children)
+    name = write_script(tmp_path, MEMORY_SCRIPT)
+    result = asyncio.run(run_script(name, tmp_path, timeout=30, echo=False, python=sys.executable))
+    assert result.ok
+    assert result.peak_rss >= 64 * 2**20
+
+
+def test_memory_sampling_does_not_block_the_loop(tmp_path, monkeypatch):
+    def slow_rss(pgid):
+        time.sleep(0.5)
+        return 0
+
+    monkeypatch.setattr(runner, "group_rss", slow_rss)
+    name = write_script(tmp_path, "import time; time.sleep(1.5)\n")
+    gaps = []
+
+    async def main():
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.05)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        tick = asyncio.ensure_future(ticker())
+        result = await run_script(name, tmp_path, timeout=30, echo=False, python=sys.executable)
+        tick.cancel()
+        return result
+
+    assert asyncio.run(main()).ok
+    assert max(gaps) < 0.3
+
+
+HANDLED_TRACEBACK_SCRIPT = """import time, traceback
+try:
+    {}["missing"]
+except KeyError:
+    traceback.print_exc()  # Handled: the run goes on
+time.sleep(2)
+print("done")
+"""
+
+WORKER_FAILURE_SCRIPT = """import sys, time
+print("Traceback (most recent call last):", file=sys.stderr)
+print("NameError: name 'sim_f' is not defined", file=sys.stderr, flush=True)
+time.sleep(30)  # The manager keeps waiting
+"""
+
+
+def test_handled_traceback_does_not_stop_the_run(tmp_path):
+    name = write_script(tmp_path, HANDLED_TRACEBACK_SCRIPT)
+    watcher = runner.FailFastWatcher(log_file=tmp_path / "ensemble.log", settle=0.1)
+    result = asyncio.run(run_script(name, tmp_path, timeout=30, echo=False, python=sys.executable, watcher=watcher))
+    assert result.ok
+    assert "KeyError" in result.stderr and "done" in result.stdout
+
+
+def test_worker_failure_stops_the_run(tmp_path):
+    name = write_script(tmp_path, WORKER_FAILURE_SCRIPT)
+    watcher = runner.FailFastWatcher(log_file=tmp_path / "ensemble.log", settle=0.1)
+    result = asyncio.run(run_script(name, tmp_path, timeout=30, echo=False, python=sys.executable, watcher=watcher))
+    assert not result.ok
+    assert "NameError" in result.stopped_reason
+    assert result.duration < 10
+
+
+@pytest.mark.parametrize("line, fatal", [
+    ("ModuleNotFoundError: No module named 'six_hump_camel'", True),
+    ("ImportError: cannot import name 'sim_f' from 'simf'", True),
+    ("libensemble.manager (ERROR): ---- Received error message from worker 2 ----", True),
+    ("Exception: Application not found: six_hump_camel", True),
+    ("Traceback (most recent call last):", False),
+    ("AttributeError: 'NoneType' object has no attribute 'x'", False),
+    ("KeyError: 'missing'", False),
+    ("No ImportError here, falling back to numpy", False),
+])
+def test_default_fatal_patterns(line, fatal):
+    assert bool(runner.FailFastWatcher().regex.search(line)) == fatal
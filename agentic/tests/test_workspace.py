@@ -0,0 +1,66 @@
+"""Workspace lookup by pid in agent_core.workspace (run from agentic/: python -m pytest tests)"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AGENT_DIR))
+
+from agent_core.workspace import Workspace, find_workspace  # noqa: E402
+
+OPEN_WORKSPACE = "from agent_core.workspace import Workspace; Workspace.open({path!r})"
+
+
+def test_find_workspace_of_this_process(tmp_path):
+    workspace = Workspace.open(tmp_path / "generated_scripts")
+    try:
+        assert find_workspace(os.getpid(), tmp_path / "generated_scripts") == workspace.path
+    finally:
+        workspace.close()
+
+
+def test_find_workspace_after_fallback(tmp_path):
+    base = tmp_path / "generated_scripts"
+    workspace = Workspace.open(base)
+    try:
+        env = {**os.environ, "PYTHONPATH": str(AGENT_DIR)}
+        child = subprocess.Popen([sys.executable, "-c", OPEN_WORKSPACE.format(path=str(base))],
+                                 env=env, stdout=subprocess.DEVNULL)
+        assert child.wait() == 0
+        assert find_workspace(child.pid, base) == tmp_path / "generated_scripts_2"
+        assert find_workspace(os.getpid(), base) == base
+    finally:
+        workspace.close()
+
+
+def test_find_workspace_unknown_pid(tmp_path):
+    assert find_workspace(os.getpid(), tmp_path / "generated_scripts") is None
+
+
+HOLD_WORKSPACE = """
+import sys, time
+from agent_core.workspace import Workspace
+workspace = Workspace.open({path!r}, archive_parent={archive!r})
+(workspace.path / "owner").write_text(sys.argv[1])
+print(workspace.path, flush=True)
+time.sleep(2)
+print((workspace.path / "owner").read_text() == sys.argv[1], flush=True)
+"""
+
+
+def test_concurrent_opens_get_their_own_workspace(tmp_path):
+    base = tmp_path / "generated_scripts"
+    base.mkdir()
+    (base / "old_run.txt").write_text("previous run")  # Unlocked: moved aside by whoever comes first
+    code = HOLD_WORKSPACE.format(path=str(base), archive=str(tmp_path / "archive_runs"))
+    env = {**os.environ, "PYTHONPATH": str(AGENT_DIR)}
+    agents = [subprocess.Popen([sys.executable, "-c", code, str(i)], env=env, stdout=subprocess.PIPE, text=True)
+              for i in range(6)]
+    outputs = [agent.communicate()[0].splitlines()[-2:] for agent in agents]
+    assert all(agent.returncode == 0 for agent in agents)
+    paths = [path for path, _ in outputs]
+    assert len(set(paths)) == len(agents)
+    assert all(kept == "True" for _, kept in outputs)
+    assert len(list((tmp_path / "archive_runs").iterdir())) == 1
@@ -12,13 +12,19 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 app = FastAPI()
 
 AGENT_DIR = Path(__file__).parent.parent
-GENERATED_SCRIPTS_DIR = AGENT_DIR / "generated_scripts"
+
+sys.path.insert(0, str(AGENT_DIR))
+from agent_core.debug_log import DEBUG_LOG_FILE, format_entry, read_since  # noqa: E402
+from agent_core.workspace import DEFAULT_WORK_DIR, find_workspace  # noqa: E402
 
 
 class Session:
     def __init__(self):
         self.output_queue = Queue()
         self.process = None
+        self.pid = None
+        self.run_dir = AGENT_DIR
+        self.work_dir = None
 
     async def _send(self, ws, msg):
         await ws.send_text(json.dumps(msg))
@@ -26,10 +32,17 @@ class Session:
     async def _log(self, ws, text):
         await self._send(ws, {"type": "log", "text": text})
 
+    def _resolve_work_dir(self):
+        """The agent's workspace: generated_scripts/, or generated_scripts_<n>/ if that was in use"""
+        if self.work_dir is None and self.pid is not None:
+            self.work_dir = find_workspace(self.pid, self.run_dir / DEFAULT_WORK_DIR)
+        return self.work_dir
+
     async def _send_scripts(self, ws):
-        if not GENERATED_SCRIPTS_DIR.exists():
+        work_dir = self._resolve_work_dir()
+        if work_dir is None or not work_dir.exists():
             return
-        for f in sorted(GENERATED_SCRIPTS_DIR.glob("*.py")):
+        for f in sorted(work_dir.glob("*.py")):
             await self._send(ws, {
                 "type": "script",
                 "filename": f.name,
@@ -61,6 +74,8 @@ class Session:
                 bufsize=1,
                 env=env,
             )
+            self.pid = self.process.pid
+            self.output_queue.put(("pid", self.pid))
             for line in self.process.stdout:
                 self.output_queue.put(("line", line.rstrip()))
             self.process.wait()
@@ -74,6 +89,7 @@ class Session:
                         llm_model=None, openai_base_url=None):
         run_dir = Path(agent_dir) if agent_dir else AGENT_DIR
         cmd = [sys.executable, agent_script]
+        self.pid, self.run_dir, self.work_dir = None, run_dir, None
 
         # Add --interactive if the script supports it
         if "interactive" in agent_script.lower():
@@ -109,7 +125,9 @@ class Session:
         while not done:
             try:
                 msg_type, data = self.output_queue.get_nowait()
-                if msg_type == "line":
+                if msg_type == "pid":
+                    await self._send(ws, {"type": "agent", "pid": data})
+                elif msg_type == "line":
                     await self._log(ws, data)
                     if "Saved:" in data:
                         await self._send_scripts(ws)
@@ -130,12 +148,21 @@ sessions: dict[str, Session] = {}
 
 
 @app.get("/debug-log")
-async def get_debug_log(agent_dir: str = ""):
+async def get_debug_log(agent_dir: str = "", since: int = None):
+    """Readable debug log; with since=N only the entries from JSONL offset N on.
+
+    "offset" is where the next request should start; "reset" means the log was
+    restarted (new session) and content starts from the beginning.
+    """
     run_dir = Path(agent_dir) if agent_dir else AGENT_DIR
-    log_file = run_dir / "debug_log.txt"
-    if log_file.exists():
-        return {"content": log_file.read_text()}
-    return {"content": ""}
+    log_file = run_dir / DEBUG_LOG_FILE
+    if since is None:
+        entries, offset, _ = read_since(log_file, 0)
+        if not entries and log_file.exists():
+            return {"content": log_file.read_text(), "offset": 0, "reset": True}
+        return {"content": "".join(format_entry(e) for e in entries), "offset": offset, "reset": True}
+    entries, offset, reset = await asyncio.to_thread(read_since, log_file, since)
+    return {"content": "".join(format_entry(e) for e in entries), "offset": offset, "reset": reset}
 
 
 @app.websocket("/ws/{session_id}")
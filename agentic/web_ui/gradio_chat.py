@@ -13,6 +13,9 @@ import gradio as gr
 import requests
 import websockets
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from agent_core.workspace import DEFAULT_WORK_DIR, find_workspace  # noqa: E402
+
 WS_URL = "ws://127.0.0.1:8000/ws/test"
 DEFAULT_AGENT_DIR = Path(__file__).parent.parent
 ALCF_API_BASE = "https://inference-api.alcf.anl.gov"
@@ -203,6 +206,7 @@ output_queue = Queue()
 ws_thread = None
 stop_event = threading.Event()
 uvicorn_process = None
+agent_pid = None  # pid of the agent app.py runs (sent in its "agent" message)
 
 
 def scan_agent_scripts(agent_dir_path, pattern=None):
@@ -233,12 +237,21 @@ def scan_script_dirs(scripts_dir_path):
         return [NONE_OPTION]
 
 
+def work_dir(agent_dir):
+    """The agent's workspace: generated_scripts/, or generated_scripts_<n>/ if that was in use (None if not found)"""
+    base = Path(agent_dir) / DEFAULT_WORK_DIR
+    if agent_pid is None:
+        return base
+    return find_workspace(agent_pid, base)
+
+
 def scan_versions(agent_dir_path):
     try:
         if not agent_dir_path:
             return ["latest"]
-        versions_dir = Path(agent_dir_path) / "generated_scripts" / "versions"
-        if not versions_dir.exists():
+        workspace = work_dir(agent_dir_path)
+        versions_dir = workspace / "versions" if workspace else None
+        if versions_dir is None or not versions_dir.exists():
             return ["latest"]
         return ["latest"] + [d.name for d in sorted(versions_dir.iterdir(), reverse=True)
                              if d.is_dir() and not d.name.startswith("_")]
@@ -247,7 +260,7 @@ def scan_versions(agent_dir_path):
 
 
 def websocket_worker():
-    global ws_conn
+    global ws_conn, agent_pid
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
@@ -264,6 +277,10 @@ def websocket_worker():
                     pass
                 try:
                     raw = await asyncio.wait_for(ws_conn.recv(), timeout=0.1)
+                    msg = json.loads(raw)
+                    if msg.get("type") == "agent":
+                        agent_pid = msg["pid"]
+                        continue
                     output_queue.put(("message", raw))
                 except asyncio.TimeoutError:
                     continue
@@ -324,6 +341,7 @@ with gr.Blocks() as demo:
     agent_pattern_state = gr.State(value=DEFAULT_AGENT_PATTERN)
     model_map_state = gr.State(value=_init_model_map)
     settings_visible = gr.State(value=False)
+    debug_log_state = gr.State(value=("", 0))
 
     with gr.Column(visible=False) as settings_modal:
         with gr.Column(elem_classes="modal-content"):
@@ -392,6 +410,7 @@ with gr.Blocks() as demo:
     def start_run(agent_script, scripts_dir, history, agent_dir_val, scripts_dir_val,
                   model_label, model_map):
         """Send run command and add user message to chat"""
+        global agent_pid
         if not agent_script:
             history = history + [{"role": "assistant", "content": "⚠️ No agent script selected"}]
             return history
@@ -428,6 +447,7 @@ with gr.Blocks() as demo:
             history = history + [{"role": "assistant", "content": "⚠️ Websocket not connected. Try refreshing."}]
             return history
 
+        agent_pid = None  # Until app.py reports the new agent
         message_queue.put(json.dumps({
             "type": "run",
             "agent_script": agent_script,
@@ -511,14 +531,14 @@ with gr.Blocks() as demo:
     # --- Scripts panel handlers ---
 
     def load_version_scripts(version, agent_dir_val):
-        agent_dir = Path(agent_dir_val) if agent_dir_val else DEFAULT_AGENT_DIR
-        if version and version != "latest":
-            scripts_dir = agent_dir / "generated_scripts" / "versions" / version
+        workspace = work_dir(agent_dir_val or DEFAULT_AGENT_DIR)
+        if workspace and version and version != "latest":
+            scripts_dir = workspace / "versions" / version
         else:
-            scripts_dir = agent_dir / "generated_scripts"
+            scripts_dir = workspace
 
         scripts = {}
-        if scripts_dir.exists():
+        if scripts_dir and scripts_dir.exists():
             for f in sorted(scripts_dir.glob("*.py")):
                 scripts[f.name] = f.read_text()
 
@@ -534,18 +554,26 @@ with gr.Blocks() as demo:
     def refresh_versions(agent_dir_val):
         return gr.update(choices=scan_versions(agent_dir_val))
 
-    def fetch_debug_log(agent_dir_val):
+    def fetch_debug_log(agent_dir_val, log_state, current):
+        """Append what the debug log gained since the last fetch (log_state: (agent_dir, offset))"""
+        agent_dir_val = agent_dir_val or str(DEFAULT_AGENT_DIR)
+        last_dir, offset = log_state or ("", 0)
+        if last_dir != agent_dir_val:
+            offset, current = 0, ""
         try:
             resp = requests.get(
                 "http://127.0.0.1:8000/debug-log",
-                params={"agent_dir": agent_dir_val or str(DEFAULT_AGENT_DIR)},
+                params={"agent_dir": agent_dir_val, "since": offset},
                 timeout=3,
             )
             if resp.ok:
-                return resp.json().get("content", "")
+                data = resp.json()
+                if data.get("reset"):
+                    current = ""
+                return current + data.get("content", ""), (agent_dir_val, data.get("offset", 0))
         except Exception:
             pass
-        return "(no debug log available)"
+        return current or "(no debug log available)", log_state
 
     def reset_ui():
         _drain_queue(output_queue)
@@ -583,7 +611,8 @@ with gr.Blocks() as demo:
         load_version_scripts, inputs=[version_dropdown, agent_dir_state],
         outputs=[scripts_dict, script_file_dropdown, output_script]
     ).then(
-        fetch_debug_log, inputs=[agent_dir_state], outputs=[debug_log_box]
+        fetch_debug_log, inputs=[agent_dir_state, debug_log_state, debug_log_box],
+        outputs=[debug_log_box, debug_log_state]
     )
 
     # Chat input: send to stdin → stream continued output
@@ -597,7 +626,8 @@ with gr.Blocks() as demo:
         load_version_scripts, inputs=[version_dropdown, agent_dir_state],
         outputs=[scripts_dict, script_file_dropdown, output_script]
     ).then(
-        fetch_debug_log, inputs=[agent_dir_state], outputs=[debug_log_box]
+        fetch_debug_log, inputs=[agent_dir_state, debug_log_state, debug_log_box],
+        outputs=[debug_log_box, debug_log_state]
     )
     chat_input.submit(
         send_user_input, inputs=[chat_input, chatbot], outputs=[chat_input, chatbot]
@@ -609,7 +639,8 @@ with gr.Blocks() as demo:
         load_version_scripts, inputs=[version_dropdown, agent_dir_state],
         outputs=[scripts_dict, script_file_dropdown, output_script]
     ).then(
-        fetch_debug_log, inputs=[agent_dir_state], outputs=[debug_log_box]
+        fetch_debug_log, inputs=[agent_dir_state, debug_log_state, debug_log_box],
+        outputs=[debug_log_box, debug_log_state]
     )
 
     # Reset
@@ -620,7 +651,8 @@ with gr.Blocks() as demo:
     version_dropdown.change(load_version_scripts, inputs=[version_dropdown, agent_dir_state], outputs=[scripts_dict, script_file_dropdown, output_script])
 
     # Debug log
-    debug_refresh_btn.click(fetch_debug_log, inputs=[agent_dir_state], outputs=[debug_log_box])
+    debug_refresh_btn.click(fetch_debug_log, inputs=[agent_dir_state, debug_log_state, debug_log_box],
+                            outputs=[debug_log_box, debug_log_state])
 
 
 def start_uvicorn_server():
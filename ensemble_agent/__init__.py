@@ -0,0 +1,17 @@
+"""
+ensemble_agent: the async runtime behind ensemble_agent.py and the agent presets in agentic/.
+
+- config: AgentConfig, read from the command line, the environment and a JSON/TOML file
+- stages: the pluggable stages (generate, refine, validate, run, fix) and their registry
+- agent: the engine running one or more sessions concurrently (run_agent)
+
+The shared helpers live in agentic/agent_core, which is put on sys.path here.
+"""
+
+import sys
+from pathlib import Path
+
+AGENTIC_DIR = Path(__file__).resolve().parent.parent / "agentic"
+
+if str(AGENTIC_DIR) not in sys.path:
+    sys.path.insert(0, str(AGENTIC_DIR))
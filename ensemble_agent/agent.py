@@ -0,0 +1,199 @@
+"""
+The ensemble_agent engine.
+
+run_agent(config) runs one session per config.session_configs(), concurrently
+(at most max_concurrent at a time), each in its own workspace
+(generated_scripts/, generated_scripts_2/, ...). A session runs its pipeline:
+the build stages once, then the check stages, and on a failed check the fix
+stage followed by the checks again, up to max_retries times (see stages.py).
+
+With several sessions, run output is not streamed and each status line is
+prefixed with the session's workspace name; a summary table is printed at
+the end.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+
+from agent_core.bundle import bundle_from_tool_result
+from agent_core.generator_session import find_mcp_server, needs_mcp_server, open_generator_session
+from agent_core.llm import create_agent, create_llm, generator_tool
+from agent_core.llm_cache import open_llm_cache
+from agent_core.race import candidate_temperatures
+from agent_core.renderer import TOOL_NAME
+from agent_core.trace import TRACE, start_trace
+from agent_core.workspace import Workspace
+
+from .stages import load_plugins, pipeline
+
+# Generator arguments removed before rendering - the LLM always gets them wrong
+BLOCKED_ARGUMENTS = ("custom_set_objective", "set_objective_code")
+
+
+class Session:
+    """One agent session: its config, workspace, scripts and LLM agents"""
+
+    def __init__(self, config, workspace, label="", quiet=False):
+        self.config = config
+        self.workspace = workspace
+        self.label = label
+        self.quiet = quiet  # Other sessions share the terminal
+        self.build, self.checks, self.fix = pipeline(config.stages)
+        self.bundle = None
+        self.run_script_name = None
+        self.generator = None  # Session providing CreateLibEnsembleScripts
+        self.tool = None       # Its tool schema (with the generator enums)
+        self.last_bundle = None
+        self.agent = None
+        self.fix_agents = []
+        self.attempts = 0
+        self.ok = False
+        self.error_msg = None
+
+    @property
+    def trace_attrs(self):
+        return {"session": self.label} if self.quiet else {}
+
+    def log(self, message):
+        if self.quiet:
+            message = "\n".join(f"[{self.label}] {line}" for line in message.strip("\n").splitlines())
+        print(message)
+
+    def print_prompt(self, stage_name, prompt_text):
+        """Print a prompt with formatting if show_prompts is enabled"""
+        slen = 15
+        if self.config.show_prompts:
+            print(f"\n{'='*slen} PROMPT TO AI ({stage_name}) {'='*slen}")
+            print(prompt_text)
+            print(f"{'='*slen} END AI PROMPT ({stage_name}) {'='*slen}\n")
+
+    async def call_generator(self, **kwargs):
+        """CreateLibEnsembleScripts for the LLM (keeps the structured bundle, returns text for the LLM)"""
+        for name in BLOCKED_ARGUMENTS:
+            kwargs.pop(name, None)
+        result = await self.generator.call_tool(TOOL_NAME, kwargs)
+        self.last_bundle = bundle_from_tool_result(result)
+        return result.content[0].text if result.content else "Scripts created"
+
+    async def check(self, workspace=None, echo=None, **attrs):
+        """Run the check stages on workspace (default: the session's) until one fails. Returns (ok, error_msg)."""
+        workspace = workspace or self.workspace
+        echo = not self.quiet if echo is None else echo
+        for check in self.checks:
+            with TRACE.stage(check.name, **attrs, **self.trace_attrs):
+                ok, error_msg = await check.function(self, workspace, echo)
+            if not ok:
+                return False, error_msg
+        return True, None
+
+    def needs_generator(self):
+        return not self.config.scripts and any(s.name == "generate" for s in self.build)
+
+
+def make_agents(session, llm_caches):
+    """The session's LLM agent, and its fix agents (several to race candidates)"""
+    config = session.config
+    tools = [generator_tool(session.tool, session.call_generator)] if session.tool else []
+
+    def agent(model, temperature=0):
+        if (model, config.base_url) not in llm_caches:
+            llm_caches[model, config.base_url] = open_llm_cache(config, model, config.base_url)
+        llm = create_llm(model, temperature=temperature, base_url=config.base_url,
+                         cache=llm_caches[model, config.base_url])
+        return create_agent(llm, tools)
+
+    session.agent = agent(config.model)
+    session.fix_agents = [(config.model, session.agent)]
+    if config.candidates > 1:
+        # Different models, or the model at spread temperatures
+        if config.candidate_models:
+            models = config.candidate_models
+            settings = [(models[i % len(models)], 0) for i in range(config.candidates)]
+        else:
+            settings = [(config.model, t) for t in candidate_temperatures(config.candidates)]
+        session.fix_agents = [(f"{model} t={t}", agent(model, t)) for model, t in settings]
+
+
+async def run_session(session, llm_caches):
+    """Run the session's pipeline. Sets session.ok, attempts and error_msg."""
+    config = session.config
+    async with AsyncExitStack() as stack:
+        if session.needs_generator():
+            # Connect to script generator (in-process renderer or MCP server)
+            mcp_server_path = find_mcp_server(config.mcp_server) if needs_mcp_server(config.renderer) else None
+            session.generator = await stack.enter_async_context(
+                open_generator_session(config.renderer, mcp_server_path))
+            tools = await session.generator.list_tools()
+            session.tool = tools.tools[0]  # CreateLibEnsembleScripts
+        make_agents(session, llm_caches)
+
+        for build in session.build:
+            with TRACE.stage(build.name, **session.trace_attrs):
+                session.bundle = await build.function(session)
+            if session.bundle is None:
+                session.error_msg = f"{build.name} produced no scripts"
+                return session
+
+        result = None
+        for attempt in range(config.max_retries + 1):
+            session.attempts = attempt + 1
+            if result is None:
+                session.ok, session.error_msg = await session.check(attempt=attempt)
+                if not session.ok:
+                    # Archive the failed run outputs to current archive's run_output/
+                    session.workspace.archive_outputs(config.archive_items, session.error_msg)
+            else:
+                session.ok, session.error_msg = result  # Raced candidates have already run
+            if session.ok or session.fix is None:
+                break
+
+            if attempt < config.max_retries:
+                session.log(f"\nRetry attempt {attempt + 1}/{config.max_retries}")
+                stage_name = "race" if len(session.fix_agents) > 1 else session.fix.name
+                with TRACE.stage(stage_name, attempt=attempt + 1, **session.trace_attrs):
+                    session.bundle, result = await session.fix.function(session, session.error_msg, attempt + 1)
+            else:
+                session.log(f"\nFailed after {config.max_retries} retry attempts")
+    return session
+
+
+def print_summary(sessions):
+    header = f"{'Session':<24} {'Result':<10} {'Attempts':>8}  Error"
+    print(f"\n{header}\n{'-' * len(header)}")
+    for s in sessions:
+        error = (s.error_msg or "").strip().splitlines()
+        print(f"{s.label[:24]:<24} {'succeeded' if s.ok else 'failed':<10} {s.attempts:>8}  "
+              f"{error[0][:60] if error and not s.ok else ''}")
+
+
+async def run_agent(config):
+    """Run the sessions of config concurrently. Returns the finished Session objects."""
+    configs = config.session_configs()
+    load_plugins(dict.fromkeys(p for c in configs for p in c.plugins))
+    for c in configs:
+        pipeline(c.stages)  # Unknown stages fail before any workspace is created
+    workspaces = [Workspace.open(c.work_dir) for c in configs]
+    start_trace(config, config.agent, workspaces[0].path)
+
+    quiet = len(configs) > 1
+    sessions = [Session(c, w, label=w.path.name, quiet=quiet) for c, w in zip(configs, workspaces)]
+    llm_caches = {}
+    limit = asyncio.Semaphore(max(1, config.max_concurrent))
+
+    async def limited(session):
+        async with limit:
+            return await run_session(session, llm_caches)
+
+    try:
+        results = await asyncio.gather(*(limited(s) for s in sessions), return_exceptions=True)
+    finally:
+        for workspace in workspaces:
+            workspace.close()
+    for session, result in zip(sessions, results):
+        if isinstance(result, BaseException):
+            if not quiet or not isinstance(result, Exception):
+                raise result
+            session.ok, session.error_msg = False, f"{type(result).__name__}: {result}"
+    if quiet:
+        print_summary(sessions)
+    return sessions
@@ -0,0 +1,269 @@
+"""
+Configuration of an ensemble_agent run.
+
+Values are taken from, in increasing precedence:
+1. the AgentConfig defaults, and the preset of the calling script (PRESETS);
+2. a JSON or TOML file (--config FILE, or ENSEMBLE_AGENT_CONFIG);
+3. environment variables ENSEMBLE_AGENT_<FIELD>, e.g. ENSEMBLE_AGENT_MAX_RETRIES=4
+   (lists comma-separated; LLM_MODEL and OPENAI_BASE_URL are still read as before);
+4. command line options.
+
+A config file may list "sessions": each entry is a table of overrides
+(prompt, scripts, work_dir, model, ...) run as its own session, concurrently
+with the others, at most max_concurrent at a time. On the command line,
+several --scripts directories or --prompt/--prompt-file values start one
+session each.
+"""
+
+import argparse
+import json
+import os
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+
+from agent_core.generator_session import DEFAULT_RENDERER, RENDERERS
+from agent_core.llm import default_model
+from agent_core.runner import DEFAULT_TIMEOUT, FATAL_PATTERNS, timeout_arg
+from agent_core.workspace import DEFAULT_WORK_DIR
+
+ENV_PREFIX = "ENSEMBLE_AGENT_"
+CONFIG_ENV = "ENSEMBLE_AGENT_CONFIG"
+
+DEFAULT_STAGES = ["generate", "refine", "validate", "run", "fix"]
+
+# Files and directories to archive after each run
+# Can include directory names and glob patterns (e.g., "*.npy", "ensemble/", "*.log")
+ARCHIVE_ITEMS = [
+    "ensemble",           # libEnsemble output directory
+    "ensemble.log",       # libEnsemble log file
+    "libE_stats.txt",     # libEnsemble stats file
+    "*.npy",              # NumPy arrays
+    "*.pickle",           # Pickle files
+]
+
+# Default prompt if none provided
+DEFAULT_PROMPT = """Create six_hump_camel APOSMM scripts:
+- Executable: /home/shudson/test_mcp/script-creator/six_hump_camel/six_hump_camel.x
+- Input: /home/shudson/test_mcp/script-creator/six_hump_camel/input.txt
+- Template vars: X0, X1
+- 4 workers, 100 sims.
+- The output file for each simulation is output.txt
+- The bounds should be 0,1 and -1,2 for X0 and X1 respectively
+"""
+
+# Scripts built on the runtime: their name (for the trace), description, stages
+# and whether they only work on existing scripts
+PRESETS = {
+    "ensemble_agent": {
+        "description": "Generate, run and fix libEnsemble scripts",
+        "stages": DEFAULT_STAGES,
+    },
+    "libe_agent_basic": {
+        "description": "Run and fix libEnsemble scripts",
+        "stages": ["generate", "validate", "run", "fix"],
+        "scripts_only": True,
+    },
+    "libe_agent_with_script_generator": {
+        "description": "Generate and run libEnsemble scripts",
+        "stages": DEFAULT_STAGES,
+    },
+}
+
+
+@dataclass
+class AgentConfig:
+    agent: str = "ensemble_agent"           # Name recorded in the trace
+    stages: list = field(default_factory=lambda: list(DEFAULT_STAGES))
+    plugins: list = field(default_factory=list)  # Modules registering more stages
+    prompt: str = None
+    prompt_file: str = None
+    scripts: str = None                     # Existing scripts (skips generation)
+    work_dir: str = DEFAULT_WORK_DIR
+    model: str = field(default_factory=default_model)
+    base_url: str = field(default_factory=lambda: os.environ.get("OPENAI_BASE_URL"))
+    renderer: str = DEFAULT_RENDERER
+    mcp_server: str = None
+    max_retries: int = 2
+    run_timeout: float = DEFAULT_TIMEOUT    # None for no limit
+    fail_fast: bool = True
+    fatal_patterns: list = field(default_factory=list)  # Added to runner.FATAL_PATTERNS
+    preflight: bool = True
+    smoke: bool = False
+    compact_errors: bool = True
+    patch_edits: bool = True
+    parse_prompt: bool = True
+    candidates: int = 1
+    candidate_models: list = field(default_factory=list)
+    show_prompts: bool = False
+    archive_items: list = field(default_factory=lambda: list(ARCHIVE_ITEMS))
+    llm_cache: bool = False
+    no_llm_cache: bool = False
+    trace: str = None                       # "" for <work dir>/trace.jsonl
+    sessions: list = field(default_factory=list)
+    max_concurrent: int = 4
+
+    def user_prompt(self):
+        """Prompt for script generation: prompt_file, else prompt, else DEFAULT_PROMPT"""
+        if self.prompt_file:
+            return Path(self.prompt_file).read_text()
+        return self.prompt or DEFAULT_PROMPT
+
+    def fail_fast_patterns(self):
+        """Output regexes that stop a run early, or None"""
+        return FATAL_PATTERNS + self.fatal_patterns if self.fail_fast else None
+
+    def session_configs(self):
+        """One config per session (the sessions' overrides applied to this one)"""
+        if not self.sessions:
+            return [self]
+        return [replace(self, sessions=[], **coerce(entry, "session")) for entry in self.sessions]
+
+
+_FIELDS = {f.name: f for f in fields(AgentConfig)}
+
+
+def _split(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return list(value)
+
+
+def _bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _convert(name, value):
+    if name == "run_timeout":
+        return timeout_arg(value) if value is not None else None
+    if name == "sessions":
+        return list(value)
+    kind = _FIELDS[name].type
+    if value is None:
+        return None
+    if kind is bool:
+        return _bool(value)
+    if kind is list:
+        return _split(value)
+    return kind(value)
+
+
+def coerce(values, source):
+    """values (a dict from a file, the environment or a session entry) converted to the field types"""
+    unknown = sorted(set(values) - set(_FIELDS))
+    if unknown:
+        raise SystemExit(f"Error: unknown setting(s) in {source}: {', '.join(unknown)}")
+    try:
+        return {name: _convert(name, value) for name, value in values.items()}
+    except (TypeError, ValueError) as e:
+        raise SystemExit(f"Error: invalid setting in {source}: {e}")
+
+
+def load_file(path):
+    """Settings from a JSON or TOML config file"""
+    path = Path(path)
+    if path.suffix == ".toml":
+        import tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    return json.loads(path.read_text())
+
+
+def from_env(environ=os.environ):
+    """Settings given as ENSEMBLE_AGENT_<FIELD> environment variables"""
+    values = {}
+    for name in _FIELDS:
+        key = ENV_PREFIX + name.upper()
+        if key in environ and name != "sessions":
+            values[name] = environ[key]
+    return values
+
+
+def build_parser(preset):
+    """Argument parser; only the options given end up in the namespace"""
+    spec = PRESETS[preset]
+    parser = argparse.ArgumentParser(description=spec["description"], argument_default=argparse.SUPPRESS)
+    parser.add_argument("--config", help=f"JSON or TOML file with settings (or {CONFIG_ENV})")
+    parser.add_argument("--scripts", nargs="+",
+                        help="Directory containing scripts to run (skips generation); several start one session each")
+    if not spec.get("scripts_only"):
+        parser.add_argument("--prompt", action="append",
+                            help="Prompt for script generation (default: use DEFAULT_PROMPT); repeat for more sessions")
+        parser.add_argument("--prompt-file", nargs="+", help="Read prompt from file; several start one session each")
+        parser.add_argument("--mcp-server", help="Path to mcp_server.mjs file (overrides MCP_SERVER env var)")
+        parser.add_argument("--renderer", choices=RENDERERS,
+                            help="Render scripts in-process (python), via mcp_server.mjs (node) or via the "
+                                 f"shared renderer daemon (daemon). Default: {DEFAULT_RENDERER}")
+        parser.add_argument("--llm-generate", dest="parse_prompt", action="store_false",
+                            help="Always let the LLM choose the generator arguments, even for prompts that parse locally")
+    parser.add_argument("--stages", type=_split,
+                        help=f"Comma-separated stages to run (default: {','.join(spec['stages'])})")
+    parser.add_argument("--plugin", dest="plugins", action="append",
+                        help="Module registering extra stages (repeatable)")
+    parser.add_argument("--show-prompts", action="store_true", help="Print prompts sent to AI")
+    parser.add_argument("--work-dir",
+                        help=f"Working directory (default: {DEFAULT_WORK_DIR}; a free {DEFAULT_WORK_DIR}_<n> if in use)")
+    parser.add_argument("--model", help="LLM model (default: LLM_MODEL, else by available API key)")
+    parser.add_argument("--max-retries", type=int, help="Fix attempts after a failed run (default: 2)")
+    parser.add_argument("--run-timeout", type=timeout_arg,
+                        help=f"Timeout for each script run in seconds, 0 for none (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--no-fail-fast", dest="fail_fast", action="store_false",
+                        help="Let runs continue after fatal output in stderr/ensemble.log")
+    parser.add_argument("--fatal-pattern", dest="fatal_patterns", action="append",
+                        help="Extra regex that stops a run early (repeatable)")
+    parser.add_argument("--no-preflight", dest="preflight", action="store_false",
+                        help="Skip the static check of the scripts before each run")
+    parser.add_argument("--full-errors", dest="compact_errors", action="store_false",
+                        help="Give the LLM full stderr/stdout instead of a compacted error")
+    parser.add_argument("--smoke", action="store_true",
+                        help="Check each attempt with a shrunk run (few sims/workers) before the full run")
+    parser.add_argument("--full-rewrites", dest="patch_edits", action="store_false",
+                        help="Have the LLM return whole files instead of edits when fixing or refining scripts")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Cache LLM responses on disk and reuse them for identical requests")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Bypass the LLM response cache (even if LIBE_AGENT_LLM_CACHE is set)")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="Record stage timings, tokens and run memory to a JSONL trace "
+                             "(default file: <work dir>/trace.jsonl) and print a summary at exit")
+    parser.add_argument("--candidates", type=int,
+                        help="Fix candidates to request and run in parallel per retry; the first success wins")
+    parser.add_argument("--candidate-models", type=_split,
+                        help="Comma-separated models for the fix candidates (default: model at spread temperatures)")
+    parser.add_argument("--max-concurrent", type=int, help="Sessions running at the same time (default: 4)")
+    return parser
+
+
+def _cli_sessions(cli):
+    """Move several --scripts/--prompt/--prompt-file values into sessions"""
+    entries = [{"scripts": d} for d in cli.pop("scripts", [])]
+    entries += [{"prompt": p} for p in cli.pop("prompt", [])]
+    entries += [{"prompt_file": f} for f in cli.pop("prompt_file", [])]
+    if len(entries) == 1:
+        cli.update(entries[0])
+    elif entries:
+        cli["sessions"] = entries
+
+
+def parse_args(argv=None, preset="ensemble_agent"):
+    """AgentConfig from the preset, config file, environment and command line"""
+    spec = PRESETS[preset]
+    parser = build_parser(preset)
+    cli = vars(parser.parse_args(argv))
+    config_file = cli.pop("config", None) or os.environ.get(CONFIG_ENV)
+    _cli_sessions(cli)
+
+    values = {"agent": preset, "stages": list(spec["stages"])}
+    if config_file:
+        values.update(coerce(load_file(config_file), config_file))
+    values.update(coerce(from_env(), "environment"))
+    values.update(cli)
+    config = AgentConfig(**values)
+
+    if spec.get("scripts_only") and not all(c.scripts for c in config.session_configs()):
+        parser.error("--scripts is required")
+    if config.renderer not in RENDERERS:
+        parser.error(f"renderer must be one of: {', '.join(RENDERERS)}")
+    config.candidates = max(1, config.candidates)
+    return config
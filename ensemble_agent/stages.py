@@ -0,0 +1,304 @@
+"""
+The stages of an ensemble_agent session, and the registry the engine runs them from.
+
+A stage is an async function of the session, registered with @stage(name, kind):
+- "build" stages produce the scripts (generate, refine). They run once, in
+  pipeline order, and return the session's new bundle (None ends the session).
+- "check" stages test the scripts in a workspace (validate, run) and return
+  (ok, error_msg). They run in pipeline order after the build stages, until
+  one fails.
+- the "fix" stage gets the failed check's error and returns (bundle, result):
+  the fixed bundle, and (ok, error_msg) if it already ran the checks on it
+  (racing candidates do), else None. The checks then run again, up to
+  max_retries times.
+
+Plugin modules (--plugin, config "plugins") register more stages the same
+way, or replace a built-in one under its name.
+"""
+
+import importlib
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from agent_core.bundle import format_bundle_text, make_bundle
+from agent_core.fix import fix_prompt
+from agent_core.patches import FULL_REPLY_FORMAT, PATCH_REPLY_FORMAT, request_edits
+from agent_core.preflight import preflight
+from agent_core.prompt_params import bounds_in_order, compare_parameters, parse_prompt, render_from_prompt
+from agent_core.race import Candidate, archive_candidates, print_race_summary, race, write_candidate
+from agent_core.runner import FailFastWatcher, detect_run_script, run_script
+from agent_core.smoke import smoke_run
+from agent_core.trace import TRACE
+
+KINDS = ("build", "check", "fix")
+
+# Name of the run script rendered by CreateLibEnsembleScripts
+GENERATED_RUN_SCRIPT = "run_libe.py"
+
+# Template for second-pass refinement
+REFINE_PROMPT_TEMPLATE = """Here are the generated scripts:
+
+{scripts_text}
+
+Review the scripts against the requirements in: {user_prompt}
+
+Only modify if the user prompt specifies something clearly different from what is currently in the scripts.
+Modifications should only be to configuration values, bounds, parameters, and options within the existing code structure.
+Do NOT add new variables, functions, or executable code outside the existing structure.
+
+If nothing needs to change, reply with NO CHANGES.
+
+{reply_format}"""
+
+# Template for refinement limited to the parameters that differ from the prompt
+REFINE_FIELDS_PROMPT_TEMPLATE = """Here are the generated scripts:
+
+{scripts_text}
+
+These values in the scripts differ from what the user requested:
+
+{differences}
+
+Change ONLY these values to the requested ones, within the existing code structure.
+Do NOT make any other changes.
+
+{reply_format}"""
+
+
+@dataclass
+class Stage:
+    name: str
+    kind: str
+    function: object
+
+
+STAGES = {}
+
+
+def stage(name, kind):
+    """Decorator registering an async stage function under name"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown stage kind: {kind} (choose from {', '.join(KINDS)})")
+
+    def register(function):
+        STAGES[name] = Stage(name, kind, function)
+        return function
+    return register
+
+
+def load_plugins(modules):
+    """Import the plugin modules (they register their stages on import)"""
+    for module in modules:
+        importlib.import_module(module)
+
+
+def pipeline(names):
+    """(build stages, check stages, fix stage or None) for the stage names, in order"""
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise SystemExit(f"Error: unknown stage(s): {', '.join(unknown)} (available: {', '.join(STAGES)})")
+    chosen = [STAGES[name] for name in names]
+    fixes = [s for s in chosen if s.kind == "fix"]
+    if len(fixes) > 1:
+        raise SystemExit(f"Error: more than one fix stage: {', '.join(s.name for s in fixes)}")
+    return ([s for s in chosen if s.kind == "build"], [s for s in chosen if s.kind == "check"],
+            fixes[0] if fixes else None)
+
+
+# ── Build stages ──
+
+def copy_existing_scripts(session):
+    """Copy scripts from the --scripts directory into the workspace and return them as a bundle"""
+    scripts_dir = Path(session.config.scripts)
+    session.log(f"Using existing scripts from: {scripts_dir}")
+    files = []
+    for script_file in sorted(scripts_dir.glob("*.py")):
+        shutil.copy(script_file, session.workspace.path)
+        session.log(f"Copied: {script_file.name}")
+        files.append((script_file.name, script_file.read_text()))
+    return make_bundle(files)
+
+
+@stage("generate", "build")
+async def generate(session):
+    """Render the scripts from the prompt, or copy them from --scripts"""
+    if session.config.scripts:
+        bundle = copy_existing_scripts(session)
+        session.run_script_name = detect_run_script(session.workspace.path)
+        if not session.run_script_name:
+            session.log("Error: No run_*.py script found in directory")
+            return None
+        session.workspace.save(bundle, "copied_scripts")
+        return bundle
+
+    session.log("Running MCP script generator...")
+    session.run_script_name = GENERATED_RUN_SCRIPT
+    user_prompt = session.config.user_prompt()
+
+    # Prompts in the DEFAULT_PROMPT style are mapped to the tool arguments directly
+    bundle = None
+    if session.config.parse_prompt:
+        start = time.perf_counter()
+        bundle, problems = await render_from_prompt(session.generator, user_prompt, session.tool.inputSchema)
+        if bundle:
+            session.log(f"✓ Prompt parsed locally - rendered without the LLM in "
+                        f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        else:
+            session.log(f"Prompt not fully parsed locally ({'; '.join(problems)}) - asking the LLM")
+
+    if not bundle:
+        session.print_prompt("MCP Generator", user_prompt)
+        session.last_bundle = None
+        await session.agent.ainvoke({"messages": [("user", user_prompt)]})
+        bundle = session.last_bundle  # Structured bundle captured from the tool call
+
+    if not bundle:
+        session.log("No scripts generated")
+        return None
+    session.workspace.save(bundle, "mcp_output")
+    return bundle
+
+
+@stage("refine", "build")
+async def refine(session):
+    """Second pass updating the generated scripts to the prompt (skipped for --scripts)"""
+    bundle = session.bundle
+    if session.config.scripts:
+        return bundle
+    user_prompt = session.config.user_prompt()
+    reply_format = PATCH_REPLY_FORMAT if session.config.patch_edits else FULL_REPLY_FORMAT
+
+    # Compare the prompt's parameters with the rendered scripts; the LLM is only
+    # needed for the fields that differ (or for prompts that cannot be fully parsed,
+    # or whose bounds are not (lower, upper) pairs)
+    requested = parse_prompt(user_prompt)
+    trusted = requested.complete and bounds_in_order(requested.values)
+    differences = compare_parameters(requested.values, bundle) if trusted else None
+    if differences == []:
+        session.log("✓ Scripts match the requested parameters - skipping refinement")
+        session.workspace.save(bundle, "after_update")
+        return bundle
+
+    session.log("Refining script details...")
+    if differences:
+        session.log("Parameters differing from the request:\n" + "\n".join(str(d) for d in differences))
+        refine_prompt = REFINE_FIELDS_PROMPT_TEMPLATE.format(
+            scripts_text=format_bundle_text(bundle),
+            differences="\n".join(str(d) for d in differences),
+            reply_format=reply_format
+        )
+    else:
+        refine_prompt = REFINE_PROMPT_TEMPLATE.format(
+            scripts_text=format_bundle_text(bundle),
+            user_prompt=user_prompt,
+            reply_format=reply_format
+        )
+    session.print_prompt("Update Scripts", refine_prompt)
+
+    # Apply the edits (or whole files) from the AI response to the generated scripts
+    refine_result = await request_edits(session.agent, bundle, refine_prompt, session.print_prompt)
+    if not refine_result.changed:
+        session.log("No changes in refinement response - keeping generated scripts")
+    elif differences:
+        remaining = compare_parameters(requested.values, refine_result.bundle)
+        if remaining:
+            session.log("Warning: parameters still differing after refinement:\n"
+                        + "\n".join(str(d) for d in remaining))
+
+    session.workspace.save(refine_result.bundle, "after_update")
+    return refine_result.bundle
+
+
+# ── Check stages ──
+
+@stage("validate", "check")
+async def validate(session, workspace, echo=True):
+    """Check that the run script exists, then the static pre-flight check"""
+    run_script_name = session.run_script_name
+    if not (workspace.path / run_script_name).exists():
+        session.log(f"Error: {run_script_name} not found")
+        return False, f"{run_script_name} not found"
+    if not session.config.preflight:
+        return True, None
+    ok, report = preflight(workspace.path)
+    return ok, report or None
+
+
+@stage("run", "check")
+async def run(session, workspace, echo=True):
+    """Run the scripts (after a smoke run with --smoke)"""
+    session.log("\nRunning scripts...")
+    run_script_name = session.run_script_name
+    session.log(f"Using run script: {run_script_name}")
+    patterns = session.config.fail_fast_patterns()
+
+    # Iterate on a shrunk copy; the full-size run only happens once it passes
+    if session.config.smoke:
+        ok, error_msg = await smoke_run(workspace, run_script_name, patterns)
+        if not ok:
+            return False, error_msg
+
+    # Run the script, streaming its output, without blocking the event loop
+    watcher = FailFastWatcher(patterns, workspace.path / "ensemble.log") if patterns else None
+    result = await run_script(run_script_name, workspace.path, timeout=session.config.run_timeout,
+                              echo=echo, watcher=watcher)
+    if result.ok:
+        session.log("✓ Scripts ran successfully")
+        return True, None
+    session.log(f"✗ Scripts {result.summary()}")
+    return False, result.error_message()
+
+
+# ── Fix stage ──
+
+async def fix_scripts(session, agent, bundle, error_msg):
+    """Fix scripts based on error message"""
+    session.log("Attempting to fix scripts based on error...")
+    config = session.config
+    prompt = fix_prompt(bundle, error_msg, session.run_script_name, config.compact_errors, config.patch_edits)
+    session.print_prompt("Fix Scripts", prompt)
+
+    fix_result = await request_edits(agent, bundle, prompt, session.print_prompt)
+    if not fix_result.changed:
+        session.log("No script changes found in fix response - keeping current scripts")
+    return fix_result.bundle
+
+
+async def race_fixes(session, error_msg, attempt):
+    """Get a fix from each fix agent and check them all at once in attempt workspaces; the first success wins.
+
+    Continues from the winner, or from the first candidate if none succeeded.
+    """
+    workspace = session.workspace
+    candidates = [Candidate(i + 1, label, agent=fix_agent) for i, (label, fix_agent) in enumerate(session.fix_agents)]
+    session.log(f"Racing {len(candidates)} fix candidates: {', '.join(c.label for c in candidates)}")
+
+    async def try_candidate(candidate):
+        candidate.bundle = session.bundle
+        with TRACE.stage("fix", candidate=candidate.index, **session.trace_attrs):
+            fixed = await fix_scripts(session, candidate.agent, session.bundle, error_msg)
+        await write_candidate(candidate, workspace, fixed)
+        candidate.ok, candidate.error_msg = await session.check(candidate.workspace, echo=False,
+                                                                candidate=candidate.index)
+        session.log(f"Candidate {candidate.index} ({candidate.label}): {'succeeded' if candidate.ok else 'failed'}")
+
+    winner = await race(candidates, try_candidate)
+    archive_candidates(workspace, candidates, f"fix_attempt_{attempt}", session.config.archive_items, winner)
+    print_race_summary(candidates, winner)
+
+    chosen = winner or candidates[0]
+    workspace.save(chosen.bundle)
+    workspace.current = chosen.version
+    return chosen.bundle, (chosen.ok, chosen.error_msg or None)
+
+
+@stage("fix", "fix")
+async def fix(session, error_msg, attempt):
+    """Ask the LLM to fix the scripts (racing several candidates with --candidates)"""
+    if len(session.fix_agents) > 1:
+        return await race_fixes(session, error_msg, attempt)
+    bundle = await fix_scripts(session, session.agent, session.bundle, error_msg)
+    session.workspace.save(bundle, f"fix_attempt_{attempt}")
+    return bundle, None
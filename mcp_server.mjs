@@ -7,6 +7,7 @@ import {
   ListToolsRequestSchema,
 } from "@modelcontextprotocol/sdk/types.js";
 import { readFileSync } from "fs";
+import { createHash } from "crypto";
 import path from "path";
 import { fileURLToPath } from "url";
 import { createRequire } from "module";
@@ -144,7 +145,10 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
     const runRendered = Mustache.render(runTpl, data);
     const simfRendered = Mustache.render(simfTpl, data);
     
-    let output = `=== run_libe.py ===\n${runRendered}\n\n=== simf.py ===\n${simfRendered}`;
+    const files = [
+      { filename: "run_libe.py", content: runRendered },
+      { filename: "simf.py", content: simfRendered },
+    ];
     
     // Render batch script if cluster is enabled
     if (data.cluster_enabled) {
@@ -154,7 +158,13 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
       const batchTpl = readFileSync(path.join(__dirname, batchPath), 'utf8');
       const batchRendered = Mustache.render(batchTpl, data);
       const batchFilename = data.scheduler_type === 'slurm' ? 'submit_slurm.sh' : 'submit_pbs.sh';
-      output += `\n\n=== ${batchFilename} ===\n${batchRendered}`;
+      files.push({ filename: batchFilename, content: batchRendered });
+    }
+    
+    // Text for display; structured bundle (with checksums) for programmatic clients
+    const output = files.map(f => `=== ${f.filename} ===\n${f.content}`).join("\n\n");
+    for (const f of files) {
+      f.sha256 = createHash("sha256").update(f.content, "utf8").digest("hex");
     }
     
     return {
@@ -164,6 +174,7 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
           text: output,
         },
       ],
+      structuredContent: { files },
     };
   } catch (error) {
     return {